@@ -0,0 +1,109 @@
+"""
+End-to-end benchmark of the command line modes on synthetic trajectories: read/parse, compute and write
+are timed with the --profile report of each run, for text, gzip compressed and binary dumps, so
+optimisations of the I/O paths are measured on the data shape the package is run on.
+
+    python benchmarking/end_to_end_benchmark.py --atoms 2000 --frames 500 --modes t f t+f+a
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from generate_trajectory import STRUCTURES, write
+
+from lindemann.main import app
+
+# the names of the modes are the flags without the dash, so argparse does not take them for options
+MODES = {
+    "t": ["-t"],
+    "ot": ["-ot"],
+    "pt": ["-pt"],
+    "f": ["-f"],
+    "of": ["-of"],
+    "a": ["-a"],
+    "oa": ["-oa"],
+    "l": ["-l"],
+    "p": ["-p"],
+    "t+f+a": ["-t", "-f", "-a"],
+}
+FORMATS = {"text": ".lammpstrj", "gzip": ".lammpstrj.gz", "binary": ".bin"}
+READ_STAGES = ("open", "read", "parse")
+
+
+def run(trjfile, flags, profile="profile.json"):
+    """Runs the command line in this process and returns the wall time and the --profile report."""
+    args = [str(trjfile), *flags, "--profile", profile]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        app(args, standalone_mode=False)
+    seconds = time.perf_counter() - start
+    with open(profile) as infile:
+        return seconds, json.load(infile)
+
+
+def stage_seconds(report, names):
+    return sum(report["stages"].get(name, {}).get("seconds", 0.0) for name in names)
+
+
+def benchmark(trjfile, flags, iterations=3):
+    """The mean wall, read, compute and write seconds of a mode, after a warm up run."""
+    run(trjfile, flags)  # warm up, compiles the kernels of the mode
+    timings = []
+    for _ in range(iterations):
+        seconds, report = run(trjfile, flags)
+        timings.append(
+            (
+                seconds,
+                stage_seconds(report, READ_STAGES),
+                stage_seconds(report, ("compute", "reduction")),
+                stage_seconds(report, ("write",)),
+            )
+        )
+    return np.mean(timings, axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--structure", choices=STRUCTURES, default="fcc")
+    parser.add_argument("--atoms", type=int, default=1000)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--melt", action="store_true", help="Adds a melting ramp.")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # the outputs of the modes are written to the working directory
+        os.chdir(workdir)
+        try:
+            print(f"{args.structure} cluster, {args.atoms} atoms, {args.frames} frames")
+            print(
+                f"{'mode':<10}{'format':<8}{'MB':>8}{'wall s':>10}{'read s':>10}"
+                f"{'compute s':>11}{'write s':>10}{'read MB/s':>11}"
+            )
+            for fmt in args.formats:
+                trjfile = Path(workdir) / f"synthetic{FORMATS[fmt]}"
+                write(str(trjfile), args.structure, args.atoms, args.frames, args.melt)
+                megabytes = trjfile.stat().st_size / 1024**2
+                for mode in args.modes:
+                    wall, read, compute, written = benchmark(trjfile, MODES[mode], args.iterations)
+                    rate = megabytes / read if read else float("nan")
+                    print(
+                        f"{mode:<10}{fmt:<8}{megabytes:>8.1f}{wall:>10.3f}{read:>10.3f}"
+                        f"{compute:>11.3f}{written:>10.3f}{rate:>11.1f}"
+                    )
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
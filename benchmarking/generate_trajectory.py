@@ -0,0 +1,217 @@
+"""
+Writes synthetic LAMMPS trajectories of any size that look like the nanoclusters the package is run on:
+an FCC or a Mackay icosahedral cluster, thermal vibrations that are correlated in time and an optional
+melting ramp, after which the atoms start to diffuse.
+
+The dumps are written as text (`.lammpstrj`), compressed text (`.gz`, `.bz2`, `.xz`, `.zst`) or as a
+LAMMPS binary dump (`.bin`), all of which `lindemann.trajectory.read` opens.
+
+    python benchmarking/generate_trajectory.py cluster.lammpstrj.gz --atoms 5000 --frames 1000 --melt
+"""
+
+import argparse
+import bz2
+import gzip
+import io
+import itertools
+import lzma
+import struct
+
+import numpy as np
+
+# nearest neighbour distance of gold in Å, the clusters are built with it
+NEIGHBOUR_DISTANCE = 2.88
+STRUCTURES = ("fcc", "icosahedral")
+
+
+def fcc_cluster(num_atoms, spacing=NEIGHBOUR_DISTANCE):
+    """The num_atoms sites of an FCC lattice closest to its centre, a roughly spherical cluster."""
+    lattice = spacing * np.sqrt(2.0)
+    cells = int(np.ceil((num_atoms / 4) ** (1 / 3))) + 2
+    basis = np.array([[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]])
+    grid = np.array(list(itertools.product(range(-cells, cells), repeat=3)), dtype=np.float64)
+    sites = (grid[:, None, :] + basis[None, :, :]).reshape(-1, 3) * lattice
+    order = np.argsort(np.linalg.norm(sites, axis=1), kind="stable")
+    return sites[order[:num_atoms]]
+
+
+def _icosahedron():
+    """The vertices and faces of the icosahedron with edge length 1."""
+    phi = (1 + np.sqrt(5)) / 2
+    vertices = []
+    for a, b in itertools.product((-1, 1), repeat=2):
+        vertices += [(0, a, b * phi), (a, b * phi, 0), (b * phi, 0, a)]
+    vertices = np.array(vertices, dtype=np.float64) / 2
+    distances = np.linalg.norm(vertices[:, None] - vertices[None], axis=2)
+    neighbours = np.isclose(distances, 1.0)
+    faces = [
+        (i, j, k)
+        for i, j, k in itertools.combinations(range(12), 3)
+        if neighbours[i, j] and neighbours[j, k] and neighbours[i, k]
+    ]
+    return vertices, faces
+
+
+def icosahedral_cluster(num_atoms, spacing=NEIGHBOUR_DISTANCE):
+    """
+    A Mackay icosahedron of closed shells (1, 13, 55, 147, ... atoms), the outer shell cut to the num_atoms
+    sites closest to the centre.
+    """
+    vertices, faces = _icosahedron()
+    sites = [np.zeros((1, 3))]
+    count, shell = 1, 0
+    while count < num_atoms:
+        shell += 1
+        points = []
+        for i, j, k in faces:
+            for a in range(shell + 1):
+                for b in range(shell + 1 - a):
+                    c = shell - a - b
+                    points.append((a * vertices[i] + b * vertices[j] + c * vertices[k]))
+        points = np.unique(np.round(np.array(points) * spacing, 6), axis=0)
+        sites.append(points)
+        count += len(points)
+    sites = np.concatenate(sites)
+    order = np.argsort(np.linalg.norm(sites, axis=1), kind="stable")
+    return sites[order[:num_atoms]]
+
+
+def trajectory(
+    structure="fcc",
+    num_atoms=1000,
+    num_frames=100,
+    amplitude=(0.05, 0.15),
+    correlation=0.9,
+    melt=False,
+    seed=42,
+):
+    """
+    Generates the positions of a vibrating cluster.
+
+    Args:
+        structure (str): "fcc" or "icosahedral".
+        num_atoms (int): The number of atoms.
+        num_frames (int): The number of frames.
+        amplitude (tuple[float, float]): The rms vibration per coordinate in Å in the first and last frame,
+                                         ramped linearly like a temperature ramp.
+        correlation (float): The correlation of the displacements of neighbouring frames, 0 for
+                             independent frames.
+        melt (bool): If True, the atoms start to diffuse in the second half of the frames, with a step
+                     that grows with the ramp, so the Lindemann index jumps like at a phase transition.
+        seed (int): The seed of the random numbers.
+
+    Yields:
+        np.ndarray: The float32 positions of each frame, shape (num_atoms, 3).
+    """
+    if structure not in STRUCTURES:
+        raise ValueError(f"Unknown structure {structure}, choose one of {', '.join(STRUCTURES)}.")
+    rng = np.random.default_rng(seed)
+    sites = fcc_cluster(num_atoms) if structure == "fcc" else icosahedral_cluster(num_atoms)
+    displacement = rng.normal(0.0, amplitude[0], sites.shape)
+    drift = np.zeros_like(sites)
+    innovation = np.sqrt(1 - correlation**2)
+    for frame in range(num_frames):
+        progress = frame / max(num_frames - 1, 1)
+        sigma = amplitude[0] + (amplitude[1] - amplitude[0]) * progress
+        displacement = correlation * displacement + innovation * rng.normal(
+            0.0, sigma, sites.shape
+        )
+        if melt and progress > 0.5:
+            drift += rng.normal(0.0, 2 * sigma * (progress - 0.5), sites.shape)
+        yield (sites + drift + displacement).astype(np.float32)
+
+
+def _open_text(filename):
+    """Opens a text dump for writing, compressed by the suffix."""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "wt")
+    if filename.endswith(".bz2"):
+        return bz2.open(filename, "wt")
+    if filename.endswith(".xz"):
+        return lzma.open(filename, "wt")
+    if filename.endswith(".zst"):
+        import zstandard
+
+        raw = zstandard.ZstdCompressor().stream_writer(open(filename, "wb"))
+        return io.TextIOWrapper(raw)
+    return open(filename, "w")
+
+
+def _box(positions, margin=10.0):
+    """A cubic box around the first frame with some vacuum, like the cluster simulations."""
+    low = float(positions.min()) - margin
+    high = float(positions.max()) + margin
+    return low, high
+
+
+def write_text(filename, frames, types, box):
+    """Writes a LAMMPS text dump with the columns id type x y z."""
+    num_atoms = len(types)
+    ids = np.arange(1, num_atoms + 1)
+    with _open_text(filename) as outfile:
+        for timestep, positions in enumerate(frames):
+            outfile.write(f"ITEM: TIMESTEP\n{timestep}\nITEM: NUMBER OF ATOMS\n{num_atoms}\n")
+            outfile.write("ITEM: BOX BOUNDS pp pp pp\n" + f"{box[0]} {box[1]}\n" * 3)
+            outfile.write("ITEM: ATOMS id type x y z\n")
+            table = np.column_stack((ids, types, positions))
+            np.savetxt(outfile, table, fmt=("%d", "%d", "%.5f", "%.5f", "%.5f"))
+
+
+def write_binary(filename, frames, types, box):
+    """Writes a LAMMPS binary dump (revision 2, magic string and column names, one chunk per frame)."""
+    num_atoms = len(types)
+    columns = b"id type x y z"
+    ids = np.arange(1, num_atoms + 1)
+    with open(filename, "wb") as outfile:
+        for timestep, positions in enumerate(frames):
+            values = np.column_stack((ids, types, positions)).astype("<f8")
+            outfile.write(struct.pack("<q", -8) + b"DUMPATOM" + struct.pack("<ii", 1, 2))
+            outfile.write(
+                struct.pack("<qqi", timestep, num_atoms, 0) + struct.pack("<6i", *[0] * 6)
+            )
+            outfile.write(struct.pack("<6d", box[0], box[1], box[0], box[1], box[0], box[1]))
+            outfile.write(struct.pack("<ii", 5, 0) + struct.pack("<b", 0))
+            outfile.write(struct.pack("<i", len(columns)) + columns + struct.pack("<i", 1))
+            outfile.write(struct.pack("<i", values.size) + values.tobytes())
+
+
+def write(filename, structure="fcc", num_atoms=1000, num_frames=100, melt=False, seed=42):
+    """
+    Writes a synthetic trajectory, text, compressed text or binary by the suffix of the file name.
+
+    Returns:
+        str: The file name.
+    """
+    frames = trajectory(structure, num_atoms, num_frames, melt=melt, seed=seed)
+    first = next(frames)
+    box = _box(first)
+    # two types like the alloy test trajectories, the inner half of the cluster is type 1
+    radii = np.linalg.norm(first - first.mean(axis=0), axis=1)
+    types = np.where(radii < np.median(radii), 1, 2)
+    frames = itertools.chain([first], frames)
+    if filename.endswith(".bin"):
+        write_binary(filename, frames, types, box)
+    else:
+        write_text(filename, frames, types, box)
+    return filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "filename", help="The dump to write, .lammpstrj, .gz, .bz2, .xz, .zst or .bin."
+    )
+    parser.add_argument("--structure", choices=STRUCTURES, default="fcc")
+    parser.add_argument("--atoms", type=int, default=1000)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--melt", action="store_true", help="Adds a melting ramp.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    filename = write(args.filename, args.structure, args.atoms, args.frames, args.melt, args.seed)
+    print(
+        f"Saved {args.structure} cluster of {args.atoms} atoms, {args.frames} frames: {filename}"
+    )
+
+
+if __name__ == "__main__":
+    main()
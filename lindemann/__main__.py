@@ -1,3 +1,4 @@
-from .main import app  # type: ignore
+from .main import cli  # type: ignore
 
-app(prog_name="lindemann")
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,203 @@
+"""
+On-disk cache of results, keyed by a cheap fingerprint of the trajectory file and the parameters of the
+calculation, so repeated calls on the same dump return without recomputing. The least recently used
+results are evicted once the cache grows beyond its size limit.
+
+The cache directory is `$LINDEMANN_CACHE_DIR` or `~/.cache/lindemann`, the size limit in bytes is
+`$LINDEMANN_CACHE_SIZE` (default 1 GB).
+"""
+
+from typing import Any, Callable
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from lindemann import __version__
+
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 64 * 1024
+DEFAULT_SIZE = 1024**3
+
+
+def cache_dir() -> Path:
+    """
+    Returns the cache directory.
+
+    Returns:
+        Path: The directory the results are stored in.
+    """
+    return Path(os.environ.get("LINDEMANN_CACHE_DIR", Path.home() / ".cache" / "lindemann"))
+
+
+def max_size() -> int:
+    """
+    Returns the size limit of the cache.
+
+    Returns:
+        int: The size limit in bytes.
+    """
+    return int(os.environ.get("LINDEMANN_CACHE_SIZE", DEFAULT_SIZE))
+
+
+def fingerprint(trjfile: str) -> str:
+    """
+    Fingerprints a trajectory file from its size, modification time and hashes of blocks sampled evenly
+    over the file, without reading the whole file.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+
+    Returns:
+        str: The hex digest of the fingerprint.
+    """
+    stat = os.stat(trjfile)
+    digest = hashlib.sha256(f"{stat.st_size} {stat.st_mtime_ns}".encode())
+    with open(trjfile, "rb") as infile:
+        last_block = max(stat.st_size - SAMPLE_BLOCK_SIZE, 0)
+        for block in range(SAMPLE_BLOCKS):
+            infile.seek(last_block * block // (SAMPLE_BLOCKS - 1))
+            digest.update(infile.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def key(trjfile: str, mode: str, **params: Any) -> str:
+    """
+    Builds the cache key of a result.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+        mode (str): The calculation, e.g. "lindemann.index.per_trj.calculate".
+        **params (Any): Everything else the result depends on, e.g. the number of frames, the selected
+                        particle types and the precision.
+
+    Returns:
+        str: The cache key.
+    """
+    description = json.dumps(
+        {"file": fingerprint(trjfile), "mode": mode, "version": __version__, **params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def load(result_key: str) -> Any:
+    """
+    Loads a result from the cache and marks it as recently used.
+
+    Args:
+        result_key (str): The cache key, see `key`.
+
+    Returns:
+        Any: The cached result, or None if it is not in the cache.
+    """
+    path = cache_dir() / f"{result_key}.npy"
+    try:
+        values = np.load(path)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)
+    return values[()] if values.ndim == 0 else values
+
+
+def store(result_key: str, values: Any) -> None:
+    """
+    Stores a result in the cache and evicts the least recently used results above the size limit.
+
+    Args:
+        result_key (str): The cache key, see `key`.
+        values (Any): The result, a number or an array.
+    """
+    directory = cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{result_key}.npy"
+    partial = directory / f"{result_key}.{os.getpid()}.partial.npy"
+    np.save(partial, np.asarray(values))
+    os.replace(partial, path)
+    evict(max_size())
+
+
+def _entries() -> list[Path]:
+    """Returns the cached results, the least recently used first."""
+    directory = cache_dir()
+    if not directory.is_dir():
+        return []
+    entries = [path for path in directory.glob("*.npy") if not path.name.endswith(".partial.npy")]
+    return sorted(entries, key=lambda path: path.stat().st_mtime)
+
+
+def evict(limit: int) -> int:
+    """
+    Removes the least recently used results until the cache is not larger than `limit`.
+
+    Args:
+        limit (int): The size limit in bytes.
+
+    Returns:
+        int: The number of removed results.
+    """
+    entries = _entries()
+    total = sum(path.stat().st_size for path in entries)
+    removed = 0
+    for path in entries:
+        if total <= limit:
+            break
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def info() -> str:
+    """
+    Describes the content of the cache.
+
+    Returns:
+        str: The cache directory, the number of results and their size.
+    """
+    entries = _entries()
+    total = sum(path.stat().st_size for path in entries)
+    return (
+        f"{cache_dir()}: {len(entries)} results, {round(total / 1024**2, 4)} MB "
+        f"of {round(max_size() / 1024**2, 4)} MB"
+    )
+
+
+def clear() -> int:
+    """
+    Removes all results from the cache.
+
+    Returns:
+        int: The number of removed results.
+    """
+    return evict(-1)
+
+
+def cached(trjfile: str, mode: str, calc: Callable[[], Any], **params: Any) -> Any:
+    """
+    Returns the cached result of a calculation, or runs the calculation and caches its result.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+        mode (str): The calculation, e.g. "lindemann.index.per_trj.calculate".
+        calc (Callable[[], Any]): Runs the calculation.
+        **params (Any): Everything else the result depends on, see `key`.
+
+    Returns:
+        Any: The result of the calculation.
+
+    Example:
+        The Lindemann index of a trajectory, computed on the first call only::
+
+            linde = cached(trjfile, "per_trj", lambda: per_trj.calculate(read.frames(trjfile)))
+    """
+    result_key = key(trjfile, mode, **params)
+    values = load(result_key)
+    if values is None:
+        values = calc()
+        store(result_key, values)
+    return values
@@ -0,0 +1,469 @@
+"""
+Registry of compute backends for the pair distance statistics.
+
+Every backend implements one step, `update(positions, mean_distances, m2_distances, frame, num_atoms)`,
+which adds the pair distances of a frame to the running mean and second moment of the condensed pair
+array, like `online_trj.calculate_frame`. The index per frame and per atom is reduced from the moments by
+`reduce_frame`, which skips the zero and NaN ratios of each atom like `per_atoms`. The modes in this module
+(the index of the trajectory, per frame and per atom), the online modes (`online_trj`, `online_frames`,
+`online_atoms`) and the shared pass (`combined`) are written once on top of these two steps, so they work
+with every backend:
+
+- "numba-serial": the compiled pair loop of `online_trj`.
+- "numba-parallel": the compiled pair loop with the rows of the pair triangle spread over the threads.
+- "numpy": vectorised NumPy over blocks of pairs, no JIT compile.
+- "blas": the distances of blocks of rows from the Gram matrix (a matrix product), no JIT compile.
+
+"auto" picks the backend with the lowest predicted run time for the size of the problem, from the start up
+(the JIT compile) and the pair updates per second of each backend measured once per machine by `calibrate`.
+Until the machine is calibrated (`--calibrate`), a static rule is used instead, so a first small run does not
+pay for compiling and benchmarking every backend.
+
+The modes whose pair loop does more than update the moments of the whole pair triangle keep their own
+kernels: the types and blocks, which reduce the pairs in the same loop, the batch engine, the deterministic
+float64 blocks and the chunks of `parallel_trj`, which merge the moments of frame ranges. The groups, the
+quantized positions and the out of core row blocks keep their own update, but reduce the ratios per atom with
+`reduce_frame` and `reduce_rows` as well.
+"""
+
+from typing import Any, Callable, NamedTuple, Optional
+
+import json
+import time
+from collections.abc import Iterator
+from functools import lru_cache
+from pathlib import Path
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+from lindemann import cache
+from lindemann.index import online_trj, parallel_trj
+
+# fastmath without nnan and ninf, which let numba fold the NaN checks of the ratios to False
+NAN_SAFE_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+# pairs processed at once by the NumPy backends, bounds their temporary arrays to a few MB per array
+BLOCK_PAIRS = 1 << 18
+CALIBRATION_ATOMS = 1024
+CALIBRATION_FRAMES = 3
+# without a calibration, NumPy below this many pair updates (about a second), where the JIT compile of the
+# numba backends does not pay off yet, and the parallel numba backend above
+STATIC_PAIR_UPDATES = 10**8
+
+
+class Backend(NamedTuple):
+    """A compute backend, see the module docstring."""
+
+    update: Callable[..., None]
+    jit: bool
+
+
+@nb.njit(fastmath=True, parallel=True)
+def _update_parallel(
+    positions: npt.NDArray[np.float32],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    num_atoms: int,
+) -> None:
+    frame_count = frame + 1
+    for i in nb.prange(num_atoms - 1):
+        # first condensed index of row i
+        index = i * (2 * num_atoms - i - 1) // 2
+        for j in range(i + 1, num_atoms):
+            dist = 0.0
+            for k in range(3):
+                dist += (positions[i, k] - positions[j, k]) ** 2
+            dist = np.sqrt(dist)
+            delta = dist - mean_distances[index]
+            mean_distances[index] += delta / frame_count
+            delta2 = dist - mean_distances[index]
+            m2_distances[index] += delta * delta2
+            index += 1
+
+
+def _welford(
+    distances: npt.NDArray[Any],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+) -> None:
+    delta = distances - mean_distances
+    mean_distances += delta / (frame + 1)
+    m2_distances += delta * (distances - mean_distances)
+
+
+@lru_cache(maxsize=8)
+def _row_blocks(num_atoms: int) -> tuple[tuple[int, int, int], ...]:
+    """Splits the rows of the pair triangle into blocks of about BLOCK_PAIRS pairs: (first row, end row, first index)."""
+    blocks = []
+    start = index = 0
+    while start < num_atoms - 1:
+        end, pairs = start, 0
+        while end < num_atoms - 1 and (pairs == 0 or pairs + num_atoms - end - 1 <= BLOCK_PAIRS):
+            pairs += num_atoms - end - 1
+            end += 1
+        blocks.append((start, end, index))
+        start, index = end, index + pairs
+    return tuple(blocks)
+
+
+def _block_pairs(
+    num_atoms: int, start: int, end: int
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Returns the rows (relative to `start`) and columns (relative to `start + 1`) of the pairs of a row block,
+    in the order of the condensed array."""
+    return np.triu_indices(end - start, 0, num_atoms - start - 1)
+
+
+def _update_numpy(
+    positions: npt.NDArray[np.float32],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    num_atoms: int,
+) -> None:
+    for start, end, index in _row_blocks(num_atoms):
+        rows, cols = _block_pairs(num_atoms, start, end)
+        diff = positions[start + rows] - positions[start + 1 + cols]
+        distances = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+        stop = index + len(distances)
+        _welford(distances, mean_distances[index:stop], m2_distances[index:stop], frame)
+
+
+def _update_blas(
+    positions: npt.NDArray[np.float32],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    num_atoms: int,
+) -> None:
+    # centred and in float64, the squared distances from the Gram matrix cancel less
+    centred = positions.astype(np.float64) - positions.mean(axis=0)
+    norms = np.einsum("ij,ij->i", centred, centred)
+    for start, end, index in _row_blocks(num_atoms):
+        gram = centred[start:end] @ centred[start + 1 :].T
+        squared = norms[start:end, None] + norms[None, start + 1 :] - 2 * gram
+        rows, cols = _block_pairs(num_atoms, start, end)
+        distances = np.sqrt(np.maximum(squared[rows, cols], 0.0))
+        stop = index + len(distances)
+        _welford(distances, mean_distances[index:stop], m2_distances[index:stop], frame)
+
+
+BACKENDS = {
+    "numba-serial": Backend(online_trj.calculate_frame, jit=True),
+    "numba-parallel": Backend(_update_parallel, jit=True),
+    "numpy": Backend(_update_numpy, jit=False),
+    "blas": Backend(_update_blas, jit=False),
+}
+ENGINES = ("auto", *BACKENDS)
+
+
+@nb.njit(fastmath=NAN_SAFE_FASTMATH, parallel=False)
+def reduce_rows(
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    num_atoms: int,
+    start_row: int,
+    end_row: int,
+    per_atom: bool,
+    atom_sums: npt.NDArray[np.float64],
+    atom_counts: npt.NDArray[Any],
+) -> float:
+    """
+    Sums up the ratios of the pairs of a block of rows of the pair triangle after a frame and, if requested,
+    adds them to their atoms.
+
+    Args:
+        mean_distances (npt.NDArray[np.float32]): The mean distances of the pairs of the rows.
+        m2_distances (npt.NDArray[np.float32]): The squared differences of the distances of the pairs of the rows.
+        frame (int): The current frame index.
+        num_atoms (int): The number of atoms.
+        start_row (int): The first row of the block.
+        end_row (int): The end of the block.
+        per_atom (bool): If True, the non zero, non NaN ratios are added to atom_sums and counted in atom_counts,
+                         like per_atoms.
+        atom_sums (npt.NDArray[np.float64]): Array of shape (num_atoms,) the ratios are added to.
+        atom_counts (npt.NDArray[Any]): Array of shape (num_atoms,) the ratios are counted in.
+
+    Returns:
+        float: The sum of the ratios of the pairs of the rows.
+    """
+    frame_count = frame + 1
+    ratio_sum = 0.0
+    index = 0
+    for i in range(start_row, end_row):
+        for j in range(i + 1, num_atoms):
+            ratio = np.sqrt(m2_distances[index] / frame_count) / mean_distances[index]
+            ratio_sum += ratio
+            if per_atom and ratio != 0.0 and not np.isnan(ratio):
+                atom_sums[i] += ratio
+                atom_sums[j] += ratio
+                atom_counts[i] += 1
+                atom_counts[j] += 1
+            index += 1
+    return ratio_sum
+
+
+@nb.njit(fastmath=NAN_SAFE_FASTMATH, parallel=False)
+def reduce_frame(
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    num_atoms: int,
+    per_atom: bool,
+    atom_sums: npt.NDArray[np.float64],
+    atom_counts: npt.NDArray[np.int64],
+) -> float:
+    """
+    Reduces the moments of all pairs after a frame to the Lindemann index of the frame and, if requested,
+    sums up the ratios of the pairs per atom, see `reduce_rows`.
+
+    Args:
+        mean_distances (npt.NDArray[np.float32]): The mean distances of the pairs.
+        m2_distances (npt.NDArray[np.float32]): The squared differences of the distances of the pairs.
+        frame (int): The current frame index.
+        num_atoms (int): The number of atoms.
+        per_atom (bool): If True, the non zero, non NaN ratios are summed up per atom.
+        atom_sums (npt.NDArray[np.float64]): Array of shape (num_atoms,), reset and filled with the summed ratios.
+        atom_counts (npt.NDArray[np.int64]): Array of shape (num_atoms,), reset and filled with the number of
+                                             non zero, non NaN ratios.
+
+    Returns:
+        float: The Lindemann index of the frame, the mean ratio of all pairs.
+    """
+    if per_atom:
+        atom_sums[:] = 0.0
+        atom_counts[:] = 0
+    ratio_sum = reduce_rows(
+        mean_distances,
+        m2_distances,
+        frame,
+        num_atoms,
+        0,
+        num_atoms,
+        per_atom,
+        atom_sums,
+        atom_counts,
+    )
+    return ratio_sum / max(num_atoms * (num_atoms - 1) // 2, 1)
+
+
+def atom_indices(
+    atom_sums: npt.NDArray[np.float64], atom_counts: npt.NDArray[np.int64]
+) -> npt.NDArray[np.float32]:
+    """
+    Divides the summed ratios of each atom by the number of its non zero ratios, like per_atoms.
+
+    Args:
+        atom_sums (npt.NDArray[np.float64]): The summed ratios of each atom, see `reduce_frame`.
+        atom_counts (npt.NDArray[np.int64]): The number of non zero, non NaN ratios of each atom.
+
+    Returns:
+        npt.NDArray[np.float32]: The Lindemann index of each atom, NaN for atoms without ratios.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(atom_counts > 0, atom_sums / atom_counts, np.nan).astype(np.float32)
+
+
+def _calibration_file() -> Path:
+    """The file the calibrations of the machines are cached in."""
+    return cache.cache_dir() / "backends_calibration.json"
+
+
+def calibrate() -> dict[str, dict[str, float]]:
+    """
+    Measures the start up time and the pair updates per second of each backend on a random trajectory
+    and caches them for this machine. The start up is only measured for kernels that are not compiled yet,
+    so calibrate in a fresh process.
+
+    Returns:
+        dict[str, dict[str, float]]: The "startup" seconds and the "rate" in pair updates per second of each
+                                     backend.
+    """
+    positions = np.random.default_rng(0).random(
+        (CALIBRATION_FRAMES, CALIBRATION_ATOMS, 3), dtype=np.float32
+    )
+    num_distances = CALIBRATION_ATOMS * (CALIBRATION_ATOMS - 1) // 2
+    measured = {}
+    for name, backend in BACKENDS.items():
+        mean_distances = np.zeros(num_distances, dtype=np.float32)
+        m2_distances = np.zeros(num_distances, dtype=np.float32)
+        start = time.perf_counter()
+        backend.update(positions[0], mean_distances, m2_distances, 0, CALIBRATION_ATOMS)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        for frame in range(1, CALIBRATION_FRAMES):
+            backend.update(
+                positions[frame], mean_distances, m2_distances, frame, CALIBRATION_ATOMS
+            )
+        seconds = (time.perf_counter() - start) / (CALIBRATION_FRAMES - 1)
+        measured[name] = {
+            "startup": max(first - seconds, 0.0),
+            "rate": num_distances / max(seconds, 1e-9),
+        }
+
+    calibration_file = _calibration_file()
+    calibration_file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(calibration_file) as infile:
+            calibrated = json.load(infile)
+    except (OSError, ValueError):
+        calibrated = {}
+    calibrated[parallel_trj._machine()] = measured
+    with open(calibration_file, "w") as outfile:
+        json.dump(calibrated, outfile, indent=2)
+    return measured
+
+
+def calibration() -> Optional[dict[str, dict[str, float]]]:
+    """
+    Returns the cached calibration of this machine.
+
+    Returns:
+        Optional[dict[str, dict[str, float]]]: See `calibrate`, None if this machine is not calibrated yet.
+    """
+    try:
+        with open(_calibration_file()) as infile:
+            measured = json.load(infile)[parallel_trj._machine()]
+        if set(measured) == set(BACKENDS):
+            return measured  # type: ignore[no-any-return]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def select(num_frames: int, num_atoms: int) -> str:
+    """
+    Chooses the backend with the lowest predicted run time. The JIT start up only counts for backends that
+    are not compiled in this process yet, so small problems avoid the compile. Without a calibration of the
+    machine, NumPy is chosen below STATIC_PAIR_UPDATES pair updates unless a numba backend is compiled
+    already, and the parallel numba backend above.
+
+    Args:
+        num_frames (int): The number of frames.
+        num_atoms (int): The number of atoms.
+
+    Returns:
+        str: The name of the backend.
+    """
+    pair_updates = num_frames * num_atoms * (num_atoms - 1) // 2
+    measured = calibration()
+    if measured is None:
+        for name in ("numba-parallel", "numba-serial"):
+            if BACKENDS[name].update.signatures:
+                return name
+        return "numpy" if pair_updates < STATIC_PAIR_UPDATES else "numba-parallel"
+
+    def predicted(name: str) -> float:
+        backend = BACKENDS[name]
+        compiled = backend.jit and bool(backend.update.signatures)
+        startup = measured[name]["startup"] if backend.jit and not compiled else 0.0
+        return startup + pair_updates / measured[name]["rate"]
+
+    return min(BACKENDS, key=predicted)
+
+
+def resolve(engine: str, num_frames: int, num_atoms: int) -> Backend:
+    """
+    Returns the backend of an engine name.
+
+    Args:
+        engine (str): A name of `ENGINES`, "auto" selects the backend with `select`.
+        num_frames (int): The number of frames.
+        num_atoms (int): The number of atoms.
+
+    Returns:
+        Backend: The backend.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    if engine == "auto":
+        engine = select(num_frames, num_atoms)
+    if engine not in BACKENDS:
+        raise ValueError(f"Unknown engine {engine}, choose one of {', '.join(ENGINES)}.")
+    return BACKENDS[engine]
+
+
+def _moments(
+    positions: npt.NDArray[np.float32], engine: str
+) -> Iterator[tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]]:
+    """Yields the running mean and second moment of the pair distances after each frame."""
+    num_frames, num_atoms, _ = positions.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+    backend = resolve(engine, num_frames, num_atoms)
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    for frame in range(num_frames):
+        backend.update(positions[frame], mean_distances, m2_distances, frame, num_atoms)
+        yield mean_distances, m2_distances
+
+
+def calculate(positions: npt.NDArray[np.float32], engine: str = "auto") -> np.floating[Any]:
+    """
+    Calculates the Lindemann index of the trajectory with a backend, like `per_trj.calculate`.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        engine (str): The backend, see `ENGINES`.
+
+    Returns:
+        np.floating[Any]: The Lindemann index.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    # without frames the moments stay zero and the index is NaN, like per_trj
+    mean_distances = m2_distances = np.zeros(num_atoms * (num_atoms - 1) // 2, dtype=np.float32)
+    for mean_distances, m2_distances in _moments(positions, engine):
+        pass
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nanmean(np.sqrt(m2_distances / num_frames) / mean_distances)
+
+
+def calculate_frames(
+    positions: npt.NDArray[np.float32], engine: str = "auto"
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the Lindemann index for each frame with a backend, like `per_frames.calculate`.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        engine (str): The backend, see `ENGINES`.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of Lindemann indices for each frame.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    linde_per_frame = np.zeros(num_frames, dtype=np.float32)
+    atom_sums = np.zeros(0, dtype=np.float64)
+    atom_counts = np.zeros(0, dtype=np.int64)
+    for frame, (mean_distances, m2_distances) in enumerate(_moments(positions, engine)):
+        linde_per_frame[frame] = reduce_frame(
+            mean_distances, m2_distances, frame, num_atoms, False, atom_sums, atom_counts
+        )
+    return linde_per_frame
+
+
+def calculate_atoms(
+    positions: npt.NDArray[np.float32], engine: str = "auto"
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the Lindemann index of each atom for each frame with a backend, like `per_atoms.calculate`.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        engine (str): The backend, see `ENGINES`.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (frames, atoms) with the Lindemann index per atom and frame.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    atom_sums = np.zeros(num_atoms, dtype=np.float64)
+    atom_counts = np.zeros(num_atoms, dtype=np.int64)
+    lindex_array = np.zeros((num_frames, num_atoms), dtype=np.float32)
+    for frame, (mean_distances, m2_distances) in enumerate(_moments(positions, engine)):
+        reduce_frame(mean_distances, m2_distances, frame, num_atoms, True, atom_sums, atom_counts)
+        lindex_array[frame] = atom_indices(atom_sums, atom_counts)
+    return lindex_array
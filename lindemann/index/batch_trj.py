@@ -0,0 +1,123 @@
+from collections.abc import Iterable, Iterator
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+from lindemann.trajectory import read
+
+
+def pack(
+    trajectories: list[npt.NDArray[np.float32]],
+) -> tuple[
+    npt.NDArray[np.float32], npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.int64]
+]:
+    """
+    Packs trajectories of different sizes into one ragged buffer.
+
+    Args:
+        trajectories (list[npt.NDArray[np.float32]]): Arrays of shape (num_frames, num_atoms, 3), the number of
+                                                      frames and atoms may differ between the trajectories.
+
+    Returns:
+        tuple: The flat float32 buffer, the offsets of each trajectory in the buffer (length num_trajectories + 1),
+               and the number of frames and atoms of each trajectory.
+    """
+    nframes = np.array([len(positions) for positions in trajectories], dtype=np.int64)
+    natoms = np.array([positions.shape[1] for positions in trajectories], dtype=np.int64)
+    offsets = np.zeros(len(trajectories) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(nframes * natoms * 3)
+    buffer = np.empty(offsets[-1], dtype=np.float32)
+    for trajectory, positions in enumerate(trajectories):
+        buffer[offsets[trajectory] : offsets[trajectory + 1]] = positions.ravel()
+    return buffer, offsets, nframes, natoms
+
+
+@nb.njit(fastmath=True, parallel=True)
+def calculate(
+    buffer: npt.NDArray[np.float32],
+    offsets: npt.NDArray[np.int64],
+    nframes: npt.NDArray[np.int64],
+    natoms: npt.NDArray[np.int64],
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the Lindemann index of many trajectories in parallel, one trajectory per thread.
+
+    Args:
+        buffer (npt.NDArray[np.float32]): The packed positions of all trajectories, see `pack`.
+        offsets (npt.NDArray[np.int64]): The offset of each trajectory in the buffer.
+        nframes (npt.NDArray[np.int64]): The number of frames of each trajectory.
+        natoms (npt.NDArray[np.int64]): The number of atoms of each trajectory.
+
+    Returns:
+        npt.NDArray[np.float32]: The Lindemann index of each trajectory.
+    """
+    num_trajectories = nframes.shape[0]
+    linde = np.zeros(num_trajectories, dtype=np.float32)
+    for trajectory in nb.prange(num_trajectories):
+        num_frames = nframes[trajectory]
+        num_atoms = natoms[trajectory]
+        positions = buffer[offsets[trajectory] : offsets[trajectory + 1]].reshape(
+            (num_frames, num_atoms, 3)
+        )
+        num_distances = num_atoms * (num_atoms - 1) // 2
+
+        mean_distances = np.zeros(num_distances, dtype=np.float32)
+        m2_distances = np.zeros(num_distances, dtype=np.float32)
+        for frame in range(num_frames):
+            index = 0
+            frame_count = frame + 1
+            for i in range(num_atoms):
+                for j in range(i + 1, num_atoms):
+                    dist = 0.0
+                    for k in range(3):
+                        dist += (positions[frame, i, k] - positions[frame, j, k]) ** 2
+                    dist = np.sqrt(dist)
+                    delta = dist - mean_distances[index]
+                    mean_distances[index] += delta / frame_count
+                    delta2 = dist - mean_distances[index]
+                    m2_distances[index] += delta * delta2
+
+                    index += 1
+
+        linde[trajectory] = np.mean(np.sqrt(m2_distances / num_frames) / mean_distances)
+    return linde
+
+
+def calculate_files(trjfiles: Iterable[str], batch_size: int = 256) -> Iterator[tuple[str, float]]:
+    """
+    Calculates the Lindemann index of many trajectory files in the current process.
+
+    The files are read in batches of `batch_size`, each batch is packed into one buffer and evaluated
+    by a single parallel kernel, so there is no pickling and no per file process start or JIT compile.
+
+    Args:
+        trjfiles (Iterable[str]): Paths to the trajectory files.
+        batch_size (int): The number of files read and evaluated together.
+
+    Yields:
+        tuple[str, float]: The trajectory file and its Lindemann index, as soon as its batch is done.
+    """
+    batch: list[str] = []
+    for trjfile in trjfiles:
+        batch.append(trjfile)
+        if len(batch) == batch_size:
+            yield from _calculate_batch(batch)
+            batch = []
+    if batch:
+        yield from _calculate_batch(batch)
+
+
+def _calculate_batch(trjfiles: list[str]) -> Iterator[tuple[str, float]]:
+    """
+    Reads, packs and evaluates one batch of trajectory files.
+
+    Args:
+        trjfiles (list[str]): Paths to the trajectory files of the batch.
+
+    Yields:
+        tuple[str, float]: The trajectory file and its Lindemann index.
+    """
+    linde = calculate(*pack([read.frames(trjfile) for trjfile in trjfiles]))
+    for trjfile, value in zip(trjfiles, linde):
+        yield trjfile, float(value)
@@ -0,0 +1,234 @@
+"""
+Standard error of the Lindemann index from block averaging.
+
+The frames are split into consecutive blocks and the moments (count, mean and second moment of every pair
+distance) of each block are kept, which costs no extra pair loop. Merged with the combination of
+`parallel_variance`, the blocks give the index of the trajectory. The standard error follows from a
+jackknife over the blocks (the index of the trajectory without one block, from the merged moments minus the
+moments of that block), and with the blocking transformation of Flyvbjerg and Petersen (neighbouring blocks
+merged pairwise, doubling the block size) it is obtained for several block sizes at once. Once the block
+size exceeds the correlation time of the trajectory the standard error reaches a plateau.
+"""
+
+from typing import Any, NamedTuple, Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+from lindemann.index import online_trj, parallel_trj
+from lindemann.profiling import Profiler, stage
+
+# the smallest number of blocks the plateau estimate is taken from
+MIN_BLOCKS = 4
+
+
+class BlockError(NamedTuple):
+    """The standard error of the index for one block size."""
+
+    block_size: float
+    num_blocks: int
+    stderr: float
+
+
+class Moments(NamedTuple):
+    """The moments of the pair distances of each block."""
+
+    counts: npt.NDArray[np.int64]
+    means: npt.NDArray[np.float32]
+    m2s: npt.NDArray[np.float32]
+
+
+@nb.njit(fastmath=True, parallel=True)
+def block_moments(positions: npt.NDArray[np.float32], num_blocks: int) -> Moments:
+    """
+    Calculates the moments of the pair distances of each block of frames, the blocks in parallel.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        num_blocks (int): The number of blocks, at most the number of frames.
+
+    Returns:
+        Moments: The number of frames, the mean and the second moment of the pair distances of each block.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    bounds = parallel_trj.chunk_bounds(num_frames, num_blocks)
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    means = np.zeros((num_blocks, num_distances), dtype=np.float32)
+    m2s = np.zeros((num_blocks, num_distances), dtype=np.float32)
+    counts = np.zeros(num_blocks, dtype=np.int64)
+    for block in nb.prange(num_blocks):
+        counts[block] = parallel_trj._calculate_chunk_into(
+            positions, bounds[block], bounds[block + 1], means[block], m2s[block]
+        )
+    return Moments(counts, means, m2s)
+
+
+def _index(
+    count: Any, mean: npt.NDArray[np.float64], m2: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]:
+    """The Lindemann index of moments, over the last axis."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.mean(np.sqrt(np.maximum(m2, 0.0) / count) / mean, axis=-1)
+
+
+def _merge(moments: Moments) -> Moments:
+    """Merges neighbouring blocks pairwise, a last odd block is kept as it is."""
+    counts = moments.counts.copy()
+    means = moments.means.copy()
+    m2s = moments.m2s.copy()
+    num_blocks = len(counts)
+    for block in range(0, num_blocks - 1, 2):
+        counts[block] = parallel_trj._merge_into(
+            counts[block],
+            means[block],
+            m2s[block],
+            counts[block + 1],
+            means[block + 1],
+            m2s[block + 1],
+        )
+    keep = list(range(0, num_blocks, 2))
+    return Moments(counts[keep], means[keep], m2s[keep])
+
+
+def jackknife(moments: Moments) -> tuple[float, float]:
+    """
+    Calculates the index of all blocks and its jackknife standard error.
+
+    Args:
+        moments (Moments): The moments of each block, see `block_moments`.
+
+    Returns:
+        tuple[float, float]: The Lindemann index and its standard error.
+    """
+    counts = moments.counts.astype(np.float64)
+    means = moments.means.astype(np.float64)
+    m2s = moments.m2s.astype(np.float64)
+    total = counts.sum()
+    mean = (counts[:, None] * means).sum(axis=0) / total
+    m2 = m2s.sum(axis=0) + (counts[:, None] * (means - mean) ** 2).sum(axis=0)
+    linde = float(_index(total, mean, m2))
+
+    num_blocks = len(counts)
+    if num_blocks < 2:
+        return linde, float("nan")
+    leave_one_out = np.zeros(num_blocks)
+    for block in range(num_blocks):
+        # the moments of the other blocks: the merge of `parallel_variance` solved for one side
+        rest = total - counts[block]
+        rest_mean = (total * mean - counts[block] * means[block]) / rest
+        delta = means[block] - rest_mean
+        rest_m2 = m2 - m2s[block] - delta**2 * rest * counts[block] / total
+        leave_one_out[block] = _index(rest, rest_mean, rest_m2)
+    variance = (num_blocks - 1) / num_blocks * ((leave_one_out - leave_one_out.mean()) ** 2).sum()
+    return linde, float(np.sqrt(variance))
+
+
+def standard_errors(moments: Moments) -> tuple[float, list[BlockError]]:
+    """
+    Calculates the index and its standard error for every block size of the blocking transformation,
+    from the initial blocks until only two blocks are left.
+
+    Args:
+        moments (Moments): The moments of each block, see `block_moments`.
+
+    Returns:
+        tuple[float, list[BlockError]]: The Lindemann index and the standard error of each block size.
+    """
+    linde, _ = jackknife(moments)
+    errors = []
+    while len(moments.counts) >= 2:
+        _, stderr = jackknife(moments)
+        errors.append(BlockError(float(moments.counts.mean()), len(moments.counts), stderr))
+        moments = _merge(moments)
+    return linde, errors
+
+
+def plateau(errors: list[BlockError]) -> float:
+    """
+    Estimates the standard error from the block sizes with at least MIN_BLOCKS blocks, the largest of them,
+    so a plateau that is not reached yet is not underestimated.
+
+    Args:
+        errors (list[BlockError]): The standard errors of the block sizes, see `standard_errors`.
+
+    Returns:
+        float: The estimated standard error, NaN if there are too few blocks.
+    """
+    candidates = [error.stderr for error in errors if error.num_blocks >= MIN_BLOCKS]
+    return max(candidates) if candidates else float("nan")
+
+
+def calculate(
+    positions: npt.NDArray[np.float32], num_blocks: int = 16
+) -> tuple[float, list[BlockError]]:
+    """
+    Calculates the Lindemann index of the trajectory and its block averaged standard errors.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        num_blocks (int): The number of initial blocks, clamped to the number of frames.
+
+    Returns:
+        tuple[float, list[BlockError]]: The Lindemann index and the standard error of each block size.
+    """
+    num_blocks = max(1, min(num_blocks, len(positions)))
+    return standard_errors(block_moments(positions, num_blocks))
+
+
+def calculate_online(
+    pipeline: Pipeline,
+    data: DataCollection,
+    num_blocks: int = 16,
+    nframes: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
+) -> tuple[float, list[BlockError]]:
+    """
+    Calculates the Lindemann index of the trajectory and its block averaged standard errors from an OVITO
+    pipeline, one frame at a time.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        num_blocks (int): The number of initial blocks, clamped to the number of frames.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        profiler (Optional[Profiler]): Records the parse, compute and reduction stages and the throughput.
+
+    Returns:
+        tuple[float, list[BlockError]]: The Lindemann index and the standard error of each block size.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        nframes = num_frame
+    elif nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+
+    num_blocks = max(1, min(num_blocks, nframes))
+    bounds = parallel_trj.chunk_bounds(nframes, num_blocks)
+    num_distances = num_particle * (num_particle - 1) // 2
+    means = np.zeros((num_blocks, num_distances), dtype=np.float32)
+    m2s = np.zeros((num_blocks, num_distances), dtype=np.float32)
+    counts = np.diff(bounds)
+    block = 0
+    for frame in range(nframes):
+        while frame >= bounds[block + 1]:
+            block += 1
+        with stage(profiler, "parse", frames=1) as counters:
+            data = pipeline.compute(frame)
+            positions = data.particles["Position"].array
+            counters["bytes"] = positions.nbytes
+        with stage(profiler, "compute", frames=1):
+            online_trj.calculate_frame(
+                positions, means[block], m2s[block], frame - bounds[block], num_particle
+            )
+        if profiler is not None:
+            profiler.frame_done(frame, nframes, num_distances)
+    with stage(profiler, "reduction"):
+        return standard_errors(Moments(counts, means, m2s))
@@ -0,0 +1,143 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+from lindemann.index import backends
+from lindemann.profiling import Profiler, stage
+
+
+class Results(NamedTuple):
+    """The outputs of one shared pass, outputs that were not requested are None."""
+
+    trj: float
+    frames: Optional[npt.NDArray[np.float32]]
+    atoms: Optional[npt.NDArray[np.float32]]
+
+
+class _Pass:
+    """The shared state of one pass over the frames."""
+
+    def __init__(
+        self, nframes: int, num_atoms: int, per_frame: bool, per_atom: bool, engine: str
+    ) -> None:
+        num_distances = num_atoms * (num_atoms - 1) // 2
+        self.backend = backends.resolve(engine, nframes, num_atoms)
+        self.num_atoms = num_atoms
+        self.per_frame = per_frame
+        self.per_atom = per_atom
+        self.mean_distances = np.zeros(num_distances, dtype=np.float32)
+        self.m2_distances = np.zeros(num_distances, dtype=np.float32)
+        self.atom_sums = np.zeros(num_atoms, dtype=np.float64)
+        self.atom_counts = np.zeros(num_atoms, dtype=np.int64)
+        self.frames = np.zeros(nframes, dtype=np.float32) if per_frame else None
+        self.atoms = np.zeros((nframes, num_atoms), dtype=np.float32) if per_atom else None
+
+    def update(self, positions: npt.NDArray[np.float32], frame: int) -> None:
+        """Updates the moments with a frame and stores the requested outputs of the frame."""
+        self.backend.update(
+            positions, self.mean_distances, self.m2_distances, frame, self.num_atoms
+        )
+        if not (self.per_frame or self.per_atom):
+            return
+        linde = backends.reduce_frame(
+            self.mean_distances,
+            self.m2_distances,
+            frame,
+            self.num_atoms,
+            self.per_atom,
+            self.atom_sums,
+            self.atom_counts,
+        )
+        if self.frames is not None:
+            self.frames[frame] = linde
+        if self.atoms is not None:
+            self.atoms[frame] = backends.atom_indices(self.atom_sums, self.atom_counts)
+
+    def results(self, nframes: int) -> Results:
+        """Reduces the moments to the Lindemann index of the trajectory."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            linde = np.nanmean(np.sqrt(self.m2_distances / nframes) / self.mean_distances)
+        return Results(float(linde), self.frames, self.atoms)
+
+
+def calculate(
+    positions: npt.NDArray[np.float32],
+    per_frame: bool = False,
+    per_atom: bool = False,
+    engine: str = "numba-serial",
+) -> Results:
+    """
+    Calculates the Lindemann index of the trajectory and, from the same pass over the frames, the
+    Lindemann index per frame and per atom and frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        per_frame (bool): If True, the Lindemann index of each frame is calculated as well.
+        per_atom (bool): If True, the Lindemann index of each atom for each frame is calculated as well.
+        engine (str): The backend that updates the pair moments, see `backends.ENGINES`.
+
+    Returns:
+        Results: The Lindemann index of the trajectory, the array of shape (num_frames,) and the array of
+                 shape (num_frames, num_atoms), or None for outputs that were not requested.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    shared = _Pass(num_frames, num_atoms, per_frame, per_atom, engine)
+    for frame in range(num_frames):
+        shared.update(positions[frame], frame)
+    return shared.results(num_frames)
+
+
+def calculate_online(
+    pipeline: Pipeline,
+    data: DataCollection,
+    per_frame: bool = False,
+    per_atom: bool = False,
+    nframes: Optional[int] = None,
+    stride: int = 1,
+    profiler: Optional[Profiler] = None,
+    engine: str = "numba-serial",
+) -> Results:
+    """
+    Calculates all requested outputs from one pass over the frames of an OVITO pipeline.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        per_frame (bool): If True, the Lindemann index of each frame is calculated as well.
+        per_atom (bool): If True, the Lindemann index of each atom for each frame is calculated as well.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        stride (int): Only every stride-th of the frames is processed, see `index.stride`.
+        profiler (Optional[Profiler]): Records the parse, compute and reduction stages and the throughput.
+        engine (str): The backend that updates the pair moments, see `backends.ENGINES`.
+
+    Returns:
+        Results: The Lindemann index of the trajectory, per processed frame and per atom and processed frame.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        nframes = num_frame
+    elif nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+
+    num_distances = num_particle * (num_particle - 1) // 2
+    selected = range(0, nframes, stride)
+    shared = _Pass(len(selected), num_particle, per_frame, per_atom, engine)
+    for step, frame in enumerate(selected):
+        with stage(profiler, "parse", frames=1) as counters:
+            data = pipeline.compute(frame)
+            # same precision as read.frames, so the online pass matches the in memory pass
+            positions = np.asarray(data.particles["Position"], dtype=np.float32)
+            counters["bytes"] = positions.nbytes
+        with stage(profiler, "compute", frames=1):
+            shared.update(positions, step)
+        if profiler is not None:
+            profiler.frame_done(step, len(selected), num_distances)
+    with stage(profiler, "reduction"):
+        return shared.results(len(selected))
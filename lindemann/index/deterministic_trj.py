@@ -0,0 +1,129 @@
+"""
+Lindemann index of the trajectory that is bit for bit the same for any number of threads.
+
+`parallel_trj.calculate` splits the frames over the threads, so the float32 moments are merged in an order
+that depends on the thread count, and fastmath and the final np.mean reorder the sums further. Here the
+pair triangle is split into a fixed number of row blocks whose boundaries only depend on the number of
+atoms. Each block runs the Welford update of its pairs over all frames in float64 and sums the ratios of its
+pairs with Neumaier's compensated summation, and the block sums are added in a fixed pairwise tree. Which
+thread calculates a block does not change its result, and no kernel uses fastmath.
+"""
+
+from typing import Any
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+# the number of row blocks, fixed so the boundaries and the summation tree never depend on the machine
+NUM_BLOCKS = 256
+
+
+@nb.njit(fastmath=False, parallel=False)
+def row_bounds(num_atoms: int, num_blocks: int) -> npt.NDArray[np.int64]:
+    """
+    Splits the rows of the pair triangle into blocks of about the same number of pairs.
+
+    Args:
+        num_atoms (int): The number of atoms.
+        num_blocks (int): The number of blocks, empty blocks are allowed.
+
+    Returns:
+        npt.NDArray[np.int64]: The first row of each block and the end of the last block (num_blocks + 1 values).
+    """
+    num_distances = num_atoms * (num_atoms - 1) // 2
+    bounds = np.full(num_blocks + 1, num_atoms, dtype=np.int64)
+    bounds[0] = 0
+    block = 1
+    pairs = 0
+    for row in range(num_atoms):
+        while block < num_blocks and pairs >= block * num_distances // num_blocks:
+            bounds[block] = row
+            block += 1
+        pairs += num_atoms - row - 1
+    return bounds
+
+
+@nb.njit(fastmath=False, parallel=False)
+def _block_sum(
+    positions: npt.NDArray[np.float32], start_row: int, end_row: int
+) -> tuple[float, float]:
+    """
+    Calculates the moments of the pair distances of a row block over all frames in float64 and sums the
+    ratios of the pairs with compensated summation.
+
+    Returns:
+        tuple[float, float]: The sum and its compensation.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    num_pairs = 0
+    for i in range(start_row, end_row):
+        num_pairs += num_atoms - i - 1
+
+    mean_distances = np.zeros(num_pairs, dtype=np.float64)
+    m2_distances = np.zeros(num_pairs, dtype=np.float64)
+    for frame in range(num_frames):
+        frame_count = frame + 1
+        index = 0
+        for i in range(start_row, end_row):
+            for j in range(i + 1, num_atoms):
+                dist = 0.0
+                for k in range(3):
+                    dist += (np.float64(positions[frame, i, k]) - positions[frame, j, k]) ** 2
+                dist = np.sqrt(dist)
+                delta = dist - mean_distances[index]
+                mean_distances[index] += delta / frame_count
+                delta2 = dist - mean_distances[index]
+                m2_distances[index] += delta * delta2
+                index += 1
+
+    total = 0.0
+    compensation = 0.0
+    for index in range(num_pairs):
+        linde = np.sqrt(m2_distances[index] / num_frames) / mean_distances[index]
+        summed = total + linde
+        if abs(total) >= abs(linde):
+            compensation += (total - summed) + linde
+        else:
+            compensation += (linde - summed) + total
+        total = summed
+    return total, compensation
+
+
+@nb.njit(fastmath=False, parallel=False)
+def _tree_sum(values: npt.NDArray[np.float64]) -> float:
+    """Adds the values pairwise in a tree of fixed shape."""
+    values = values.copy()
+    count = values.shape[0]
+    step = 1
+    while step < count:
+        for index in range(0, count - step, 2 * step):
+            values[index] += values[index + step]
+        step *= 2
+    return values[0]
+
+
+@nb.njit(fastmath=False, parallel=True)
+def calculate(positions: npt.NDArray[np.float32]) -> np.floating[Any]:
+    """
+    Calculates the Lindemann index of the trajectory in parallel, independent of the number of threads.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of shape (num_frames, num_atoms, 3) containing the positions.
+
+    Returns:
+        float: The calculated Lindemann index.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+    bounds = row_bounds(num_atoms, NUM_BLOCKS)
+
+    sums = np.zeros(NUM_BLOCKS, dtype=np.float64)
+    compensations = np.zeros(NUM_BLOCKS, dtype=np.float64)
+    for block in nb.prange(NUM_BLOCKS):
+        if bounds[block] < bounds[block + 1]:
+            sums[block], compensations[block] = _block_sum(
+                positions, bounds[block], bounds[block + 1]
+            )
+
+    return np.float64((_tree_sum(sums) + _tree_sum(compensations)) / num_distances)
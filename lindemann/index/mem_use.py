@@ -16,6 +16,7 @@ def in_gb(nframes: int, natoms: int) -> str:
              - per_trj: Memory required when the `-t` flag is used.
              - per_frames: Memory required when the `-f` flag is used.
              - per_atoms: Memory required when the `-a` flag is used.
+             - quantized: Memory required when the `-t` flag is used with `-q`.
 
     This function assumes memory calculations based on numpy's float32 data type.
     """
@@ -36,5 +37,8 @@ def in_gb(nframes: int, natoms: int) -> str:
     per_frames = f"Flag -f (per_frames) will use {np.round((trj+(num_distances*2*float_size)+(nframes*float_size))/1024**3,4)} GB\n"
     online_per_frames = f"Flag -of (per_frames) will use {np.round(((num_distances*2*float_size)+(nframes*float_size))/1024**3,4)} GB\n"
     per_atoms = f"Flag -a (per_atoms) will use {np.round((sum_bytes)/1024**3,4)} GB\n"
-    online_per_atoms = f"Flag -oa (per_atoms) will use {np.round((sum_bytes-trj)/1024**3,4)} GB"
-    return f"{per_trj}{online_per_trj}{per_frames}{online_per_frames}{per_atoms}{online_per_atoms}"
+    online_per_atoms = f"Flag -oa (per_atoms) will use {np.round((sum_bytes-trj)/1024**3,4)} GB\n"
+    # uint16 codes plus the origin and step of each axis and frame
+    quantized_trj = nframes * natoms * 3 * 2 + nframes * 3 * 2 * float_size
+    quantized = f"Flag -t -q (per_trj) will use {np.round((quantized_trj+num_distances*2*float_size)/1024**3,4)} GB"
+    return f"{per_trj}{online_per_trj}{per_frames}{online_per_frames}{per_atoms}{online_per_atoms}{quantized}"
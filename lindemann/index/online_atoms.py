@@ -1,64 +1,22 @@
-from typing import Optional
+from typing import Any, Optional
 
-import numba as nb
 import numpy as np
 import numpy.typing as npt
 from ovito.data import DataCollection
 from ovito.pipeline import Pipeline
 
-
-@nb.njit(fastmath=True, parallel=False)
-def calculate_frame(
-    positions: npt.NDArray[np.float32],
-    array_mean: npt.NDArray[np.float32],
-    array_var: npt.NDArray[np.float32],
-    frame: int,
-    natoms: int,
-) -> npt.NDArray[np.float32]:
-    """
-    Calculates the contribution of the individual atomic positions to the Lindemann Index for a specific frame.
-
-    Args:
-        positions (npt.NDArray[np.float32]): Array of atomic positions for the current frame.
-        array_mean (npt.NDArray[np.float32]): Array to store the mean distances.
-        array_var (npt.NDArray[np.float32]): Array to store the variance of distances.
-        frame (int): The current frame index.
-        natoms (int): The number of atoms.
-
-    Returns:
-        npt.NDArray[np.float32]: Array of the individual atomic contributions to the Lindemann indices for the current frame.
-    """
-    frame_count = frame + 1
-    for i in range(natoms):
-        for j in range(i + 1, natoms):
-            dist = 0.0
-            for k in range(3):
-                dist += (positions[i, k] - positions[j, k]) ** 2
-            dist = np.sqrt(dist)
-            mean = array_mean[i, j]
-            var = array_var[i, j]
-            delta = dist - mean
-            update_mean = mean + delta / frame_count
-            array_mean[i, j] = update_mean
-            array_mean[j, i] = update_mean
-            delta2 = dist - array_mean[i, j]
-            update_var = var + delta * delta2
-            array_var[i, j] = update_var
-            array_var[j, i] = update_var
-
-    np.fill_diagonal(array_mean, 1.0)
-    lindemann_indices = np.divide(np.sqrt(np.divide(array_var, frame_count)), array_mean).astype(
-        np.float32
-    )
-    lindemann_indices = np.asarray(
-        [np.nanmean(lin[lin != 0]) for lin in lindemann_indices]
-    ).astype(np.float32)
-
-    return lindemann_indices
+from lindemann.index import backends
+from lindemann.profiling import Profiler, stage
 
 
 def calculate(
-    pipeline: Pipeline, data: DataCollection, nframes: Optional[int] = None
+    pipeline: Pipeline,
+    data: DataCollection,
+    nframes: Optional[int] = None,
+    out: Any = None,
+    profiler: Optional[Profiler] = None,
+    stride: int = 1,
+    engine: str = "numba-serial",
 ) -> npt.NDArray[np.float32]:
     """
     Calculates the contribution of the individual atomic positions to the Lindemann Index for a series of frames from an OVITO pipeline.
@@ -67,9 +25,15 @@ def calculate(
         pipeline (Pipeline): The OVITO pipeline object.
         data (DataCollection): The data collection object from OVITO.
         nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        out (Any): Output of shape (ceil(nframes / stride), num_atoms) the rows are written to as soon as a
+                   frame is done, e.g. a memory map or a dataset from `save.rows`. If None, an array is allocated.
+        profiler (Optional[Profiler]): Records the parse, compute and write stages and the throughput.
+        stride (int): Only every stride-th of the frames is processed, see `index.stride`.
+        engine (str): The backend that updates the pair moments, see `backends.ENGINES`.
 
     Returns:
-        npt.NDArray[np.float32]: Array of the individual atomic contributions to the Lindemann indices for each frame.
+        npt.NDArray[np.float32]: Array of the individual atomic contributions to the Lindemann indices for each
+                                 frame, or `out` if it was given.
 
     Raises:
         ValueError: If the requested number of frames exceeds the available frames in the pipeline.
@@ -81,12 +45,29 @@ def calculate(
     elif nframes > num_frame:
         raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
 
-    array_mean = np.zeros((num_particle, num_particle), dtype=np.float32)
-    array_var = np.zeros((num_particle, num_particle), dtype=np.float32)
-    lindex_array = np.zeros((nframes, num_particle), dtype=np.float32)
-    for frame in range(nframes):
-        data = pipeline.compute(frame)
-        lindex_array[frame] = calculate_frame(
-            data.particles["Position"].array, array_mean, array_var, frame, num_particle
-        )
+    num_distances = num_particle * (num_particle - 1) // 2
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    atom_sums = np.zeros(num_particle, dtype=np.float64)
+    atom_counts = np.zeros(num_particle, dtype=np.int64)
+    selected = range(0, nframes, stride)
+    backend = backends.resolve(engine, len(selected), num_particle)
+    lindex_array = (
+        np.zeros((len(selected), num_particle), dtype=np.float32) if out is None else out
+    )
+    for step, frame in enumerate(selected):
+        with stage(profiler, "parse", frames=1) as counters:
+            data = pipeline.compute(frame)
+            positions = data.particles["Position"].array
+            counters["bytes"] = positions.nbytes
+        with stage(profiler, "compute", frames=1):
+            backend.update(positions, mean_distances, m2_distances, step, num_particle)
+            backends.reduce_frame(
+                mean_distances, m2_distances, step, num_particle, True, atom_sums, atom_counts
+            )
+            lindemann_indices = backends.atom_indices(atom_sums, atom_counts)
+        with stage(profiler, "write", nbytes=lindemann_indices.nbytes, frames=1):
+            lindex_array[step] = lindemann_indices
+        if profiler is not None:
+            profiler.frame_done(step, len(selected), num_distances)
     return lindex_array
@@ -1,11 +1,16 @@
 from typing import Any, Optional
 
+from collections.abc import Iterable, Iterator
+
 import numba as nb
 import numpy as np
 import numpy.typing as npt
 from ovito.data import DataCollection
 from ovito.pipeline import Pipeline
 
+from lindemann.index import backends
+from lindemann.profiling import Profiler, stage
+
 
 @nb.njit(fastmath=True, parallel=False)
 def calculate_frame(
@@ -47,7 +52,12 @@ def calculate_frame(
 
 
 def calculate(
-    pipeline: Pipeline, data: DataCollection, nframes: Optional[int] = None
+    pipeline: Pipeline,
+    data: DataCollection,
+    nframes: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
+    stride: int = 1,
+    engine: str = "numba-serial",
 ) -> npt.NDArray[np.float32]:
     """
     Calculates the Lindemann indices for a series of frames from an OVITO pipeline.
@@ -56,9 +66,12 @@ def calculate(
         pipeline (Pipeline): The OVITO pipeline object.
         data (DataCollection): The data collection object from OVITO.
         nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        profiler (Optional[Profiler]): Records the parse and compute stages and the throughput.
+        stride (int): Only every stride-th of the frames is processed, see `index.stride`.
+        engine (str): The backend that updates the pair moments, see `backends.ENGINES`.
 
     Returns:
-        npt.NDArray[np.float32]: Array of Lindemann indices for each frame.
+        npt.NDArray[np.float32]: Array of Lindemann indices for each processed frame.
 
     Raises:
         ValueError: If the requested number of frames exceeds the available frames in the pipeline.
@@ -73,10 +86,52 @@ def calculate(
     num_distances = num_particle * (num_particle - 1) // 2
     mean_distances = np.zeros(num_distances, dtype=np.float32)
     m2_distances = np.zeros(num_distances, dtype=np.float32)
-    lindemann_index_array = np.zeros(nframes, dtype=np.float32)
-    for frame in range(nframes):
-        data = pipeline.compute(frame)
-        lindemann_index_array[frame] = calculate_frame(
-            data.particles["Position"].array, mean_distances, m2_distances, frame, num_particle
-        )
+    selected = range(0, nframes, stride)
+    backend = backends.resolve(engine, len(selected), num_particle)
+    # the per atom sums of reduce_frame are not needed
+    no_sums = np.zeros(0, dtype=np.float64)
+    no_counts = np.zeros(0, dtype=np.int64)
+    lindemann_index_array = np.zeros(len(selected), dtype=np.float32)
+    for step, frame in enumerate(selected):
+        with stage(profiler, "parse", frames=1) as counters:
+            data = pipeline.compute(frame)
+            positions = data.particles["Position"].array
+            counters["bytes"] = positions.nbytes
+        with stage(profiler, "compute", frames=1):
+            backend.update(positions, mean_distances, m2_distances, step, num_particle)
+            lindemann_index_array[step] = backends.reduce_frame(
+                mean_distances, m2_distances, step, num_particle, False, no_sums, no_counts
+            )
+        if profiler is not None:
+            profiler.frame_done(step, len(selected), num_distances)
     return lindemann_index_array
+
+
+def calculate_running(frames: Iterable[DataCollection]) -> Iterator[tuple[int, float]]:
+    """
+    Calculates the Lindemann index for each frame of a stream of frames whose length is not known up
+    front, e.g. the frames of a dump that is still being written (see `follow.iter_frames`).
+
+    Args:
+        frames (Iterable[DataCollection]): The frames, each with particle positions.
+
+    Yields:
+        tuple[int, float]: The timestep of the frame and the Lindemann index up to this frame.
+    """
+    mean_distances = np.zeros(0, dtype=np.float32)
+    m2_distances = np.zeros(0, dtype=np.float32)
+    num_particle = 0
+    for frame, data in enumerate(frames):
+        if frame == 0:
+            num_particle = data.particles.count
+            num_distances = num_particle * (num_particle - 1) // 2
+            mean_distances = np.zeros(num_distances, dtype=np.float32)
+            m2_distances = np.zeros(num_distances, dtype=np.float32)
+        linde = calculate_frame(
+            np.asarray(data.particles["Position"], dtype=np.float32),
+            mean_distances,
+            m2_distances,
+            frame,
+            num_particle,
+        )
+        yield getattr(data, "timestep", frame), float(linde)
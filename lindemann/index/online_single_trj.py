@@ -0,0 +1,113 @@
+from typing import Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+from lindemann.index import single_trj
+from lindemann.trajectory import read
+
+
+@nb.njit(fastmath=True, parallel=False)
+def calculate_frame(
+    positions: npt.NDArray[np.float32],
+    mean_positions: npt.NDArray[np.float64],
+    m2_positions: npt.NDArray[np.float64],
+    frame: int,
+    remove_drift: bool,
+) -> None:
+    """
+    Updates the mean position and the displacement variance of each atom for a specific frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions for the current frame.
+        mean_positions (npt.NDArray[np.float64]): Array of shape (num_atoms, 3) to store the mean positions.
+        m2_positions (npt.NDArray[np.float64]): Array of shape (num_atoms,) to store the squared differences of the positions.
+        frame (int): The current frame index.
+        remove_drift (bool): If True, the centre of the frame is removed before the update.
+
+    Returns:
+        None
+    """
+    num_atoms = positions.shape[0]
+    frame_count = frame + 1
+    center = np.zeros(3, dtype=np.float64)
+    if remove_drift:
+        for k in range(3):
+            center[k] = np.mean(positions[:, k])
+    for i in range(num_atoms):
+        for k in range(3):
+            position = positions[i, k] - center[k]
+            delta = position - mean_positions[i, k]
+            mean_positions[i, k] += delta / frame_count
+            m2_positions[i] += delta * (position - mean_positions[i, k])
+
+
+def calculate_atoms(
+    pipeline: Pipeline,
+    data: DataCollection,
+    nn_distance: Optional[float] = None,
+    remove_drift: bool = True,
+    nframes: Optional[int] = None,
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the single particle Lindemann index of each atom for a series of frames from an OVITO pipeline.
+
+    Only O(num_atoms) memory is needed, the positions are unwrapped frame by frame with `read.unwrap`.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        nn_distance (Optional[float]): The nearest neighbour distance. If None, it is estimated from the mean positions.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_atoms,) with the single particle Lindemann index of each atom.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        nframes = num_frame
+    elif nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+
+    mean_positions = np.zeros((num_particle, 3), dtype=np.float64)
+    m2_positions = np.zeros(num_particle, dtype=np.float64)
+    positions = None
+    for frame in range(nframes):
+        data = pipeline.compute(frame)
+        positions = read.unwrap(data, positions)
+        calculate_frame(positions, mean_positions, m2_positions, frame, remove_drift)
+
+    if not nn_distance:
+        nn_distance = single_trj.nearest_neighbor_distance(mean_positions)
+    return (np.sqrt(m2_positions / nframes) / nn_distance).astype(np.float32)
+
+
+def calculate(
+    pipeline: Pipeline,
+    data: DataCollection,
+    nn_distance: Optional[float] = None,
+    remove_drift: bool = True,
+    nframes: Optional[int] = None,
+) -> float:
+    """
+    Calculates the single particle Lindemann index for a series of frames from an OVITO pipeline.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        nn_distance (Optional[float]): The nearest neighbour distance. If None, it is estimated from the mean positions.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+
+    Returns:
+        float: The single particle Lindemann index.
+    """
+    return float(np.mean(calculate_atoms(pipeline, data, nn_distance, remove_drift, nframes)))
@@ -6,6 +6,7 @@ import numpy.typing as npt
 from ovito.data import DataCollection
 from ovito.pipeline import Pipeline
 
+from lindemann.profiling import Profiler, stage
 from lindemann.trajectory import read
 
 
@@ -48,7 +49,12 @@ def calculate_frame(
 
 
 def calculate(
-    pipeline: Pipeline, data: DataCollection, nframes: Optional[int] = None
+    pipeline: Pipeline,
+    data: DataCollection,
+    nframes: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
+    stride: int = 1,
+    engine: str = "numba-serial",
 ) -> np.floating[Any]:
     """
     Calculates the overall Lindemann index for a series of frames from an OVITO pipeline.
@@ -57,6 +63,9 @@ def calculate(
         pipeline (Pipeline): The OVITO pipeline object.
         data (DataCollection): The data collection object from OVITO.
         nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        profiler (Optional[Profiler]): Records the parse, compute and reduction stages and the throughput.
+        stride (int): Only every stride-th of the frames is processed, see `index.stride`.
+        engine (str): The backend that updates the pair moments, see `backends.ENGINES`.
 
     Returns:
         float: The overall Lindemann index.
@@ -71,13 +80,91 @@ def calculate(
     elif nframes > num_frame:
         raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
 
+    # backends builds its numba-serial backend on calculate_frame of this module
+    from lindemann.index import backends
+
+    num_distances = num_particle * (num_particle - 1) // 2
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    selected = range(0, nframes, stride)
+    backend = backends.resolve(engine, len(selected), num_particle)
+    for step, frame in enumerate(selected):
+        with stage(profiler, "parse", frames=1) as counters:
+            data = pipeline.compute(frame)
+            positions = data.particles["Position"].array
+            counters["bytes"] = positions.nbytes
+        with stage(profiler, "compute", frames=1):
+            backend.update(positions, mean_distances, m2_distances, step, num_particle)
+        if profiler is not None:
+            profiler.frame_done(step, len(selected), num_distances)
+
+    with stage(profiler, "reduction"):
+        return np.mean(np.sqrt(m2_distances / len(selected)) / mean_distances)
+
+
+def converged(previous: float, current: float, tolerance: float) -> bool:
+    """
+    Checks if the running Lindemann index stopped changing.
+
+    Args:
+        previous (float): The running Lindemann index at the previous check.
+        current (float): The running Lindemann index at the current check.
+        tolerance (float): The accepted relative change between two checks.
+
+    Returns:
+        bool: True if the relative change between the two checks is below the tolerance.
+    """
+    return bool(abs(current - previous) <= tolerance * abs(current))
+
+
+def calculate_until_converged(
+    pipeline: Pipeline,
+    data: DataCollection,
+    tolerance: float,
+    interval: int = 100,
+    nframes: Optional[int] = None,
+) -> tuple[np.floating[Any], int]:
+    """
+    Calculates the overall Lindemann index, but stops reading frames once the index has converged.
+
+    Every `interval` frames the running index is compared to the one of the previous check, the
+    calculation stops as soon as the relative change is below `tolerance`.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        tolerance (float): The accepted relative change of the index between two checks.
+        interval (int): The number of frames between two checks.
+        nframes (Optional[int]): The maximum number of frames to process. If None, all frames can be processed.
+
+    Returns:
+        tuple[float, int]: The overall Lindemann index and the number of frames used for it.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        nframes = num_frame
+    elif nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+
     num_distances = num_particle * (num_particle - 1) // 2
     mean_distances = np.zeros(num_distances, dtype=np.float32)
     m2_distances = np.zeros(num_distances, dtype=np.float32)
+    previous = None
+    frames_used = nframes
     for frame in range(nframes):
         data = pipeline.compute(frame)
         calculate_frame(
             data.particles["Position"].array, mean_distances, m2_distances, frame, num_particle
         )
+        if (frame + 1) % interval == 0 and frame + 1 < nframes:
+            current = np.mean(np.sqrt(m2_distances / (frame + 1)) / mean_distances)
+            if previous is not None and converged(previous, current, tolerance):
+                frames_used = frame + 1
+                break
+            previous = current
 
-    return np.mean(np.sqrt(m2_distances / nframes) / mean_distances)
+    return np.mean(np.sqrt(m2_distances / frames_used) / mean_distances), frames_used
@@ -0,0 +1,322 @@
+"""
+Lindemann index of systems whose pair moments do not fit in memory.
+
+The mean and second moment of all N (N - 1) / 2 pair distances need 4 N^2 bytes, about 14 GB at 60000 atoms.
+Here the pair triangle is split into blocks of rows whose moments fit the memory budget, and the trajectory
+is swept once per block. The positions are parsed once and cached as a binary float32 memory map, so the
+later sweeps only read them back. Every pair runs the same Welford update as in `online_trj`, so only the
+order in which the ratios of the pairs are summed changes: the sums of the blocks give the exact index of
+the trajectory, per frame (the ratios of every frame summed over the blocks) and per atom and frame (the
+ratios and their count summed per atom). The per atom sums are spilled to memory mapped files next to the
+position cache if they take more than half of the budget.
+"""
+
+from typing import Any, Optional
+
+import tempfile
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+from lindemann.index import backends, combined
+from lindemann.profiling import Profiler, stage
+
+FLOAT_SIZE = np.float32().nbytes
+# the mean and second moment of a pair distance
+MOMENT_BYTES = 2 * FLOAT_SIZE
+# the float64 sum and the int32 count of the ratios of an atom in a frame
+ATOM_BYTES = 8 + 4
+
+
+def spills(max_memory: int, nframes: int, natoms: int) -> bool:
+    """
+    Decides if the per atom sums are kept in memory mapped files instead of memory.
+
+    Args:
+        max_memory (int): The memory budget in bytes.
+        nframes (int): The number of frames.
+        natoms (int): The number of atoms.
+
+    Returns:
+        bool: True if the per atom sums take more than half of the budget.
+    """
+    return nframes * natoms * ATOM_BYTES > max_memory // 2
+
+
+def block_pairs(
+    max_memory: int, nframes: int, natoms: int, per_frame: bool = False, per_atom: bool = False
+) -> int:
+    """
+    Calculates how many pair moments fit the memory budget next to a frame and the per frame and per atom
+    sums that stay in memory.
+
+    Args:
+        max_memory (int): The memory budget in bytes.
+        nframes (int): The number of frames.
+        natoms (int): The number of atoms.
+        per_frame (bool): If True, the sums of the ratios of each frame are kept.
+        per_atom (bool): If True, the sums of the ratios of each atom and frame are kept.
+
+    Returns:
+        int: The largest number of pairs of a block, at least the pairs of the first row so every row fits
+             and at most all pairs.
+    """
+    num_distances = natoms * (natoms - 1) // 2
+    fixed = natoms * 3 * FLOAT_SIZE
+    if per_frame:
+        fixed += nframes * 8
+    if per_atom and not spills(max_memory, nframes, natoms):
+        fixed += nframes * natoms * ATOM_BYTES
+    pairs = (max_memory - fixed) // MOMENT_BYTES
+    return int(min(max(pairs, natoms - 1), num_distances))
+
+
+@nb.njit(fastmath=True, parallel=False)
+def row_blocks(num_atoms: int, max_pairs: int) -> npt.NDArray[np.int64]:
+    """
+    Splits the rows of the pair triangle into consecutive blocks of at most max_pairs pairs.
+
+    Args:
+        num_atoms (int): The number of atoms.
+        max_pairs (int): The largest number of pairs of a block, a row is never split.
+
+    Returns:
+        npt.NDArray[np.int64]: The first row of each block and the end of the last block.
+    """
+    bounds = [0]
+    pairs = 0
+    for row in range(num_atoms - 1):
+        row_pairs = num_atoms - row - 1
+        if pairs > 0 and pairs + row_pairs > max_pairs:
+            bounds.append(row)
+            pairs = 0
+        pairs += row_pairs
+    bounds.append(num_atoms)
+    return np.array(bounds, dtype=np.int64)
+
+
+@nb.njit(fastmath=backends.NAN_SAFE_FASTMATH, parallel=False)
+def update_block(
+    positions: npt.NDArray[np.float32],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    start_row: int,
+    end_row: int,
+    per_frame: bool,
+    per_atom: bool,
+    atom_sums: npt.NDArray[np.float64],
+    atom_counts: npt.NDArray[np.int32],
+) -> float:
+    """
+    Updates the moments of the pairs of a row block with a frame and, if requested, adds their ratios up.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions for the current frame.
+        mean_distances (npt.NDArray[np.float32]): The mean distances of the pairs of the block.
+        m2_distances (npt.NDArray[np.float32]): The squared differences of the distances of the pairs of the block.
+        frame (int): The current frame index.
+        start_row (int): The first row of the block.
+        end_row (int): The end of the block.
+        per_frame (bool): If True, the sum of the ratios of the pairs is returned.
+        per_atom (bool): If True, the non zero, non NaN ratios are added to atom_sums and counted in atom_counts.
+        atom_sums (npt.NDArray[np.float64]): Array of shape (num_atoms,) of the frame the ratios are added to.
+        atom_counts (npt.NDArray[np.int32]): Array of shape (num_atoms,) of the frame the ratios are counted in.
+
+    Returns:
+        float: The sum of the ratios of the pairs of the block in this frame, 0.0 if per_frame is False.
+    """
+    num_atoms = positions.shape[0]
+    index = 0
+    frame_count = frame + 1
+    for i in range(start_row, end_row):
+        for j in range(i + 1, num_atoms):
+            dist = 0.0
+            for k in range(3):
+                dist += (positions[i, k] - positions[j, k]) ** 2
+
+            dist = np.sqrt(dist)
+            delta = dist - mean_distances[index]
+            mean_distances[index] += delta / frame_count
+            delta2 = dist - mean_distances[index]
+            m2_distances[index] += delta * delta2
+
+            index += 1
+    if not (per_frame or per_atom):
+        return 0.0
+    return backends.reduce_rows(
+        mean_distances,
+        m2_distances,
+        frame,
+        num_atoms,
+        start_row,
+        end_row,
+        per_atom,
+        atom_sums,
+        atom_counts,
+    )
+
+
+def cache_positions(
+    pipeline: Pipeline,
+    nframes: int,
+    num_atoms: int,
+    filename: str,
+    profiler: Optional[Profiler] = None,
+) -> npt.NDArray[np.float32]:
+    """
+    Parses the frames once and writes their positions to a binary memory map, which the sweeps over the
+    blocks read instead of the trajectory.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        nframes (int): The number of frames to cache.
+        num_atoms (int): The number of atoms.
+        filename (str): The .npy file of the cache.
+        profiler (Optional[Profiler]): Records the parse stage.
+
+    Returns:
+        npt.NDArray[np.float32]: The memory map of shape (nframes, num_atoms, 3).
+    """
+    cache = np.lib.format.open_memmap(
+        filename, mode="w+", dtype=np.float32, shape=(nframes, num_atoms, 3)
+    )
+    for frame in range(nframes):
+        with stage(profiler, "parse", frames=1) as counters:
+            positions = pipeline.compute(frame).particles["Position"]
+            cache[frame] = np.asarray(positions, dtype=np.float32)
+            counters["bytes"] = cache[frame].nbytes
+    cache.flush()
+    return cache
+
+
+def _sums(
+    shape: tuple[int, int], spill: bool, spill_dir: str
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.int32]]:
+    """The per atom sums and counts, in memory or in memory mapped files of the spill directory."""
+    if not spill:
+        return np.zeros(shape, dtype=np.float64), np.zeros(shape, dtype=np.int32)
+    atom_sums = np.lib.format.open_memmap(
+        f"{spill_dir}/atom_sums.npy", mode="w+", dtype=np.float64, shape=shape
+    )
+    atom_counts = np.lib.format.open_memmap(
+        f"{spill_dir}/atom_counts.npy", mode="w+", dtype=np.int32, shape=shape
+    )
+    return atom_sums, atom_counts
+
+
+@nb.njit(fastmath=True, parallel=False)
+def _ratio_sum(
+    mean_distances: npt.NDArray[np.float32], m2_distances: npt.NDArray[np.float32], nframes: int
+) -> float:
+    """Sums the ratios of the pairs of a block after the last frame."""
+    total = 0.0
+    for index in range(mean_distances.shape[0]):
+        total += np.sqrt(m2_distances[index] / nframes) / mean_distances[index]
+    return total
+
+
+def calculate(
+    pipeline: Pipeline,
+    data: DataCollection,
+    max_memory: int,
+    per_frame: bool = False,
+    per_atom: bool = False,
+    nframes: Optional[int] = None,
+    out: Any = None,
+    spill_dir: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+) -> combined.Results:
+    """
+    Calculates the Lindemann index of the trajectory and, if requested, per frame and per atom and frame,
+    with the pair moments of one block of rows in memory at a time.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        max_memory (int): The memory budget of the moments and sums in bytes, see `block_pairs`.
+        per_frame (bool): If True, the Lindemann index of each frame is calculated as well.
+        per_atom (bool): If True, the Lindemann index of each atom for each frame is calculated as well.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        out (Any): Output of shape (nframes, num_atoms) the per atom rows are written to, e.g. a memory map or
+                   a dataset from `save.rows`. If None, an array is allocated.
+        spill_dir (Optional[str]): Directory of the position cache and the spilled sums, removed afterwards.
+                                   If None, the temporary directory of the system.
+        profiler (Optional[Profiler]): Records the parse, compute and write stages.
+
+    Returns:
+        Results: The Lindemann index of the trajectory, the array of shape (nframes,) and the per atom rows,
+                 or None for outputs that were not requested.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        nframes = num_frame
+    elif nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+
+    num_distances = num_particle * (num_particle - 1) // 2
+    max_pairs = block_pairs(max_memory, nframes, num_particle, per_frame, per_atom)
+    bounds = row_blocks(num_particle, max_pairs)
+    frame_sums = np.zeros(nframes, dtype=np.float64)
+    # empty per atom sums of a frame, if they are not requested
+    no_sums = np.zeros(0, dtype=np.float64)
+    no_counts = np.zeros(0, dtype=np.int32)
+    total = 0.0
+    with tempfile.TemporaryDirectory(dir=spill_dir) as workdir:
+        if len(bounds) > 2:
+            positions = cache_positions(
+                pipeline, nframes, num_particle, f"{workdir}/positions.npy", profiler
+            )
+        else:
+            positions = None
+        if per_atom:
+            spill = spills(max_memory, nframes, num_particle)
+            atom_sums, atom_counts = _sums((nframes, num_particle), spill, workdir)
+
+        coords = None
+        for start_row, end_row in zip(bounds[:-1], bounds[1:]):
+            num_pairs = (end_row - start_row) * (2 * num_particle - start_row - end_row - 1) // 2
+            mean_distances = np.zeros(num_pairs, dtype=np.float32)
+            m2_distances = np.zeros(num_pairs, dtype=np.float32)
+            for frame in range(nframes):
+                if positions is None:
+                    with stage(profiler, "parse", frames=1):
+                        coords = np.asarray(
+                            pipeline.compute(frame).particles["Position"], dtype=np.float32
+                        )
+                else:
+                    coords = np.asarray(positions[frame])
+                with stage(profiler, "compute", frames=1):
+                    frame_sums[frame] += update_block(
+                        coords,
+                        mean_distances,
+                        m2_distances,
+                        frame,
+                        start_row,
+                        end_row,
+                        per_frame,
+                        per_atom,
+                        np.asarray(atom_sums[frame]) if per_atom else no_sums,
+                        np.asarray(atom_counts[frame]) if per_atom else no_counts,
+                    )
+            total += _ratio_sum(mean_distances, m2_distances, nframes)
+            del mean_distances, m2_distances
+
+        frames = (frame_sums / num_distances).astype(np.float32) if per_frame else None
+        atoms = None
+        if per_atom:
+            atoms = np.zeros((nframes, num_particle), dtype=np.float32) if out is None else out
+            for frame in range(nframes):
+                with stage(profiler, "write", frames=1):
+                    atoms[frame] = backends.atom_indices(atom_sums[frame], atom_counts[frame])
+            # the memory maps have to be closed before the spill directory is removed
+            del atom_sums, atom_counts
+        del positions, coords
+    return combined.Results(total / num_distances, frames, atoms)
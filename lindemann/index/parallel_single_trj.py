@@ -0,0 +1,84 @@
+from typing import Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+from lindemann.index import single_trj
+
+
+@nb.njit(fastmath=True, parallel=True)
+def _calculate_atoms(
+    positions: npt.NDArray[np.float32], nn_distance: float, remove_drift: bool
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the single particle Lindemann index of each atom in parallel over the atoms.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions with shape (num_frames, num_atoms, 3).
+        nn_distance (float): The nearest neighbour distance, estimated from the mean positions if <= 0.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_atoms,) with the single particle Lindemann index of each atom.
+    """
+    num_frames, num_atoms, _ = positions.shape
+
+    centers = np.zeros((num_frames, 3), dtype=np.float64)
+    if remove_drift:
+        for frame in nb.prange(num_frames):
+            for k in range(3):
+                centers[frame, k] = np.mean(positions[frame, :, k])
+
+    mean_positions = np.zeros((num_atoms, 3), dtype=np.float64)
+    m2_positions = np.zeros(num_atoms, dtype=np.float64)
+    for i in nb.prange(num_atoms):
+        for frame in range(num_frames):
+            frame_count = frame + 1
+            for k in range(3):
+                position = positions[frame, i, k] - centers[frame, k]
+                delta = position - mean_positions[i, k]
+                mean_positions[i, k] += delta / frame_count
+                m2_positions[i] += delta * (position - mean_positions[i, k])
+
+    if nn_distance <= 0.0:
+        nn_distance = single_trj.nearest_neighbor_distance(mean_positions)
+    return (np.sqrt(m2_positions / num_frames) / nn_distance).astype(np.float32)
+
+
+def calculate_atoms(
+    positions: npt.NDArray[np.float32],
+    nn_distance: Optional[float] = None,
+    remove_drift: bool = True,
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the single particle Lindemann index of each atom in parallel.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions with shape (num_frames, num_atoms, 3).
+        nn_distance (Optional[float]): The nearest neighbour distance. If None, it is estimated from the mean positions.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_atoms,) with the single particle Lindemann index of each atom.
+    """
+    return _calculate_atoms(positions, nn_distance or 0.0, remove_drift)
+
+
+def calculate(
+    positions: npt.NDArray[np.float32],
+    nn_distance: Optional[float] = None,
+    remove_drift: bool = True,
+) -> float:
+    """
+    Calculates the single particle Lindemann index of the trajectory in parallel.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions with shape (num_frames, num_atoms, 3).
+        nn_distance (Optional[float]): The nearest neighbour distance. If None, it is estimated from the mean positions.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+
+    Returns:
+        float: The single particle Lindemann index.
+    """
+    return float(np.mean(calculate_atoms(positions, nn_distance, remove_drift)))
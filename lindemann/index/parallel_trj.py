@@ -1,8 +1,16 @@
-from typing import Any
+from typing import Any, Optional
+
+import json
+import platform
+import time
+from pathlib import Path
 
 import numba as nb
 import numpy as np
 import numpy.typing as npt
+from psutil import cpu_count, virtual_memory
+
+from lindemann import cache
 
 
 @nb.njit(fastmath=True, parallel=False)
@@ -36,26 +44,27 @@ def parallel_variance(
 
 
 @nb.njit(fastmath=True, parallel=False)
-def calculate_chunk(
-    positions: npt.NDArray[np.float32], start_frame: int, end_frame: int
-) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float32], int]:
+def _calculate_chunk_into(
+    positions: npt.NDArray[np.float32],
+    start_frame: int,
+    end_frame: int,
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+) -> int:
     """
-    Calculate the mean and variance for a chunk of frames.
+    Accumulates the mean and second moment of the pair distances of a chunk of frames into the given arrays.
 
     Args:
         positions (npt.NDArray[np.float32]): Array of shape (num_frames, num_atoms, 3) containing the positions.
         start_frame (int): The starting frame index for the chunk.
         end_frame (int): The ending frame index for the chunk.
+        mean_distances (npt.NDArray[np.float32]): Zeroed array for the mean distances of the chunk.
+        m2_distances (npt.NDArray[np.float32]): Zeroed array for the second moment distances of the chunk.
 
     Returns:
-        Tuple[npt.NDArray[np.float32], npt.NDArray[np.float32], int]: Mean distances, second moment distances, and count of frames processed.
+        int: The count of frames processed.
     """
-    num_frames, num_atoms, _ = positions.shape
-    num_distances = num_atoms * (num_atoms - 1) // 2
-
-    mean_distances = np.zeros(num_distances, dtype=np.float32)
-    m2_distances = np.zeros(num_distances, dtype=np.float32)
-
+    num_atoms = positions.shape[1]
     for frame in range(start_frame, end_frame):
         index = 0
         frame_count = frame + 1 - start_frame
@@ -72,48 +81,241 @@ def calculate_chunk(
 
                 index += 1
 
+    return end_frame - start_frame
+
+
+@nb.njit(fastmath=True, parallel=False)
+def calculate_chunk(
+    positions: npt.NDArray[np.float32], start_frame: int, end_frame: int
+) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float32], int]:
+    """
+    Calculate the mean and variance for a chunk of frames.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of shape (num_frames, num_atoms, 3) containing the positions.
+        start_frame (int): The starting frame index for the chunk.
+        end_frame (int): The ending frame index for the chunk.
+
+    Returns:
+        Tuple[npt.NDArray[np.float32], npt.NDArray[np.float32], int]: Mean distances, second moment distances, and count of frames processed.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    frame_count = _calculate_chunk_into(
+        positions, start_frame, end_frame, mean_distances, m2_distances
+    )
+
     return mean_distances, m2_distances, frame_count
 
 
+@nb.njit(fastmath=True, parallel=False)
+def _merge_into(
+    n_a: int,
+    avg_a: npt.NDArray[np.float32],
+    m2_a: npt.NDArray[np.float32],
+    n_b: int,
+    avg_b: npt.NDArray[np.float32],
+    m2_b: npt.NDArray[np.float32],
+) -> int:
+    """
+    Merges the moments of chunk b into the moments of chunk a in place, like `parallel_variance`.
+
+    Args:
+        n_a (int): The number of frames of chunk a.
+        avg_a (npt.NDArray[np.float32]): The mean distances of chunk a, updated in place.
+        m2_a (npt.NDArray[np.float32]): The second moment distances of chunk a, updated in place.
+        n_b (int): The number of frames of chunk b.
+        avg_b (npt.NDArray[np.float32]): The mean distances of chunk b.
+        m2_b (npt.NDArray[np.float32]): The second moment distances of chunk b.
+
+    Returns:
+        int: The combined count.
+    """
+    n_ab = n_a + n_b
+    if n_b == 0:
+        return n_a
+    for index in range(avg_a.shape[0]):
+        delta = avg_b[index] - avg_a[index]
+        avg_a[index] += delta * n_b / n_ab
+        m2_a[index] += m2_b[index] + delta**2 * n_a * n_b / n_ab
+    return n_ab
+
+
+@nb.njit(fastmath=True, parallel=False)
+def chunk_bounds(num_frames: int, num_chunks: int) -> npt.NDArray[np.int64]:
+    """
+    Splits the frames into chunks whose sizes differ by at most one frame.
+
+    Args:
+        num_frames (int): The number of frames.
+        num_chunks (int): The number of chunks, at most num_frames.
+
+    Returns:
+        npt.NDArray[np.int64]: The first frame of each chunk and the end of the last chunk (num_chunks + 1 values).
+    """
+    bounds = np.zeros(num_chunks + 1, dtype=np.int64)
+    for chunk in range(num_chunks + 1):
+        bounds[chunk] = chunk * num_frames // num_chunks
+    return bounds
+
+
 @nb.njit(fastmath=True, parallel=True)
 def calculate(positions: npt.NDArray[np.float32], num_chunks: int) -> np.floating[Any]:
     """
     Calculate the Lindemann index in parallel using multiple chunks.
 
+    The chunk count is clamped to the number of frames, the frames are spread evenly over the chunks and
+    the moments of the chunks are merged pairwise in a tree, each level in parallel.
+
     Args:
         positions (npt.NDArray[np.float32]): Array of shape (num_frames, num_atoms, 3) containing the positions.
-        num_chunks (int): Number of chunks to divide the frames into for parallel processing.
+        num_chunks (int): Number of chunks to divide the frames into for parallel processing, see `schedule`.
 
     Returns:
         float: The calculated Lindemann index.
     """
     num_frames, num_atoms, _ = positions.shape
-    chunk_size = num_frames // num_chunks
+    num_chunks = max(1, min(num_chunks, num_frames))
+    bounds = chunk_bounds(num_frames, num_chunks)
+    num_distances = num_atoms * (num_atoms - 1) // 2
 
-    all_mean_distances = np.zeros((num_chunks, num_atoms * (num_atoms - 1) // 2), dtype=np.float32)
-    all_m2_distances = np.zeros((num_chunks, num_atoms * (num_atoms - 1) // 2), dtype=np.float32)
-    all_counts = np.zeros(num_chunks, dtype=np.int32)
+    all_mean_distances = np.zeros((num_chunks, num_distances), dtype=np.float32)
+    all_m2_distances = np.zeros((num_chunks, num_distances), dtype=np.float32)
+    all_counts = np.zeros(num_chunks, dtype=np.int64)
 
     for chunk in nb.prange(num_chunks):
-        start_frame = chunk * chunk_size
-        end_frame = (chunk + 1) * chunk_size if chunk < num_chunks - 1 else num_frames
-        mean_distances, m2_distances, count = calculate_chunk(positions, start_frame, end_frame)
-        all_mean_distances[chunk] = mean_distances
-        all_m2_distances[chunk] = m2_distances
-        all_counts[chunk] = count
-
-    final_mean_distances = all_mean_distances[0]
-    final_m2_distances = all_m2_distances[0]
-    final_count = all_counts[0]
-
-    for chunk in range(1, num_chunks):
-        final_count, final_mean_distances, final_m2_distances = parallel_variance(
-            final_count,
-            final_mean_distances,
-            final_m2_distances,
-            all_counts[chunk],
+        all_counts[chunk] = _calculate_chunk_into(
+            positions,
+            bounds[chunk],
+            bounds[chunk + 1],
             all_mean_distances[chunk],
             all_m2_distances[chunk],
         )
 
-    return np.mean(np.sqrt(final_m2_distances / final_count) / final_mean_distances)
+    step = 1
+    while step < num_chunks:
+        num_merges = (num_chunks + 2 * step - 1) // (2 * step)
+        for merge in nb.prange(num_merges):
+            chunk_a = merge * 2 * step
+            chunk_b = chunk_a + step
+            if chunk_b < num_chunks:
+                all_counts[chunk_a] = _merge_into(
+                    all_counts[chunk_a],
+                    all_mean_distances[chunk_a],
+                    all_m2_distances[chunk_a],
+                    all_counts[chunk_b],
+                    all_mean_distances[chunk_b],
+                    all_m2_distances[chunk_b],
+                )
+        step *= 2
+
+    return np.mean(np.sqrt(all_m2_distances[0] / all_counts[0]) / all_mean_distances[0])
+
+
+def _machine() -> str:
+    """Identifies the machine and thread count the tuned parameters belong to."""
+    return f"{platform.node()}-{platform.machine()}-{cpu_count()}-{nb.get_num_threads()}"
+
+
+def _tuning_file() -> Path:
+    return cache.cache_dir() / "parallel_trj_tuning.json"
+
+
+def chunks_per_thread() -> int:
+    """
+    Returns the tuned number of chunks per thread of this machine, 1 if it was not tuned yet.
+
+    Returns:
+        int: The number of chunks per thread.
+    """
+    try:
+        with open(_tuning_file()) as infile:
+            return int(json.load(infile).get(_machine(), 1))
+    except (OSError, ValueError):
+        return 1
+
+
+def tune(
+    num_frames: int = 64, num_atoms: int = 500, candidates: tuple[int, ...] = (1, 2, 4)
+) -> int:
+    """
+    Measures the run time with different numbers of chunks per thread on a random trajectory and caches the
+    fastest for this machine, more chunks than threads balance uneven threads at the cost of memory.
+
+    Args:
+        num_frames (int): The number of frames of the test trajectory.
+        num_atoms (int): The number of atoms of the test trajectory.
+        candidates (tuple[int, ...]): The numbers of chunks per thread to try.
+
+    Returns:
+        int: The fastest number of chunks per thread.
+    """
+    positions = np.random.default_rng(0).random((num_frames, num_atoms, 3), dtype=np.float32)
+    threads = nb.get_num_threads()
+    calculate(positions[:2], 2)  # compile
+    timings = {}
+    for candidate in candidates:
+        start = time.perf_counter()
+        calculate(positions, threads * candidate)
+        timings[candidate] = time.perf_counter() - start
+    best = min(timings, key=timings.__getitem__)
+
+    tuning_file = _tuning_file()
+    tuning_file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(tuning_file) as infile:
+            tuned = json.load(infile)
+    except (OSError, ValueError):
+        tuned = {}
+    tuned[_machine()] = best
+    with open(tuning_file, "w") as outfile:
+        json.dump(tuned, outfile, indent=2)
+    return best
+
+
+def schedule(
+    num_frames: int,
+    num_atoms: int,
+    threads: Optional[int] = None,
+    max_memory: Optional[int] = None,
+) -> int:
+    """
+    Chooses the number of chunks: the tuned number of chunks per thread, at most one chunk per frame and
+    no more chunks than the moments of which fit into the memory budget.
+
+    Args:
+        num_frames (int): The number of frames.
+        num_atoms (int): The number of atoms.
+        threads (Optional[int]): The number of threads. If None, the numba thread count.
+        max_memory (Optional[int]): The memory budget for the chunk moments in bytes. If None, 90 % of the
+                                    available memory.
+
+    Returns:
+        int: The number of chunks.
+    """
+    threads = threads or nb.get_num_threads()
+    if max_memory is None:
+        max_memory = int(virtual_memory().available * 0.9)
+    chunk_bytes = max(num_atoms * (num_atoms - 1) * np.float32().nbytes, 1)
+    num_chunks = min(threads * chunks_per_thread(), max_memory // chunk_bytes, num_frames)
+    return int(max(num_chunks, 1))
+
+
+def calculate_scheduled(
+    positions: npt.NDArray[np.float32], max_memory: Optional[int] = None
+) -> np.floating[Any]:
+    """
+    Calculate the Lindemann index in parallel with the number of chunks chosen by `schedule`.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of shape (num_frames, num_atoms, 3) containing the positions.
+        max_memory (Optional[int]): The memory budget for the chunk moments in bytes.
+
+    Returns:
+        float: The calculated Lindemann index.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    return calculate(positions, schedule(num_frames, num_atoms, max_memory=max_memory))
@@ -0,0 +1,220 @@
+from typing import Any, Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+from lindemann.index import backends, online_trj
+from lindemann.profiling import Profiler, stage
+
+AXES = {"x": 0, "y": 1, "z": 2}
+
+
+def shells(positions: npt.NDArray[np.float32], num_shells: int) -> npt.NDArray[np.int32]:
+    """
+    Groups the atoms into radial shells of equal width around the centre of the particles, e.g. the core
+    and the surface of a nanocluster.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of shape (num_atoms, 3) with the positions the groups are
+                                             taken from, usually the first frame.
+        num_shells (int): The number of shells.
+
+    Returns:
+        npt.NDArray[np.int32]: The shell (0 = innermost) of each atom.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    radii = np.linalg.norm(positions - positions.mean(axis=0), axis=1)
+    edges = np.linspace(0.0, radii.max(), num_shells + 1)[1:-1]
+    return np.searchsorted(edges, radii, side="right").astype(np.int32)
+
+
+def slabs(positions: npt.NDArray[np.float32], num_slabs: int, axis: int) -> npt.NDArray[np.int32]:
+    """
+    Groups the atoms into slabs of equal width along an axis.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of shape (num_atoms, 3) with the positions the groups are
+                                             taken from, usually the first frame.
+        num_slabs (int): The number of slabs.
+        axis (int): The axis perpendicular to the slabs, 0, 1 or 2.
+
+    Returns:
+        npt.NDArray[np.int32]: The slab (0 = lowest coordinate) of each atom.
+    """
+    coords = np.asarray(positions, dtype=np.float64)[:, axis]
+    edges = np.linspace(coords.min(), coords.max(), num_slabs + 1)[1:-1]
+    return np.searchsorted(edges, coords, side="right").astype(np.int32)
+
+
+def groups(
+    spec: str, positions: npt.NDArray[np.float32]
+) -> tuple[npt.NDArray[np.int32], npt.NDArray[Any]]:
+    """
+    Assigns the atoms to groups.
+
+    Args:
+        spec (str): "shells:N" for N radial shells, "slabs:N:AXIS" for N slabs along the axis x, y or z, or the
+                    path of a text file with one group id per atom (in the order of the particle identifiers).
+        positions (npt.NDArray[np.float32]): Array of shape (num_atoms, 3) with the positions the shells and
+                                             slabs are taken from, usually the first frame.
+
+    Returns:
+        tuple[npt.NDArray[np.int32], npt.NDArray[Any]]: The group code (0 .. number of groups - 1) of each atom
+                                                        and the label of each code.
+
+    Raises:
+        ValueError: If the specification is malformed or the group file does not have one id per atom.
+    """
+    kind, _, rest = spec.partition(":")
+    if kind == "shells" and rest.isdigit() and int(rest) > 0:
+        num_shells = int(rest)
+        return shells(positions, num_shells), np.arange(num_shells)
+    if kind == "slabs":
+        count, _, axis = rest.partition(":")
+        if count.isdigit() and int(count) > 0 and axis in AXES:
+            return slabs(positions, int(count), AXES[axis]), np.arange(int(count))
+    if kind in ("shells", "slabs"):
+        raise ValueError(f"Malformed groups {spec}, use shells:N or slabs:N:AXIS.")
+
+    ids = np.loadtxt(spec, dtype=np.int64, ndmin=1)
+    if len(ids) != len(positions):
+        raise ValueError(
+            f"The group file has {len(ids)} ids, but there are {len(positions)} atoms."
+        )
+    labels, group_codes = np.unique(ids, return_inverse=True)
+    return group_codes.astype(np.int32), labels
+
+
+@nb.njit(fastmath=backends.NAN_SAFE_FASTMATH, parallel=False)
+def calculate_frame(
+    positions: npt.NDArray[np.float32],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+    group_codes: npt.NDArray[np.int32],
+    num_groups: int,
+) -> npt.NDArray[np.float32]:
+    """
+    Updates the pair distance moments with a frame and reduces the Lindemann index of each atom to the mean of
+    its group, without the per atom index of more than the current frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions for the current frame.
+        mean_distances (npt.NDArray[np.float32]): Array to store the mean distances between pairs of atoms.
+        m2_distances (npt.NDArray[np.float32]): Array to store the second moment of the distances.
+        frame (int): The current frame index.
+        group_codes (npt.NDArray[np.int32]): Array of shape (num_atoms,) with the group code of each atom.
+        num_groups (int): The number of groups.
+
+    Returns:
+        npt.NDArray[np.float32]: The mean of the per atom Lindemann indices of each group, NaN for empty groups.
+    """
+    num_atoms = group_codes.shape[0]
+    online_trj.calculate_frame(positions, mean_distances, m2_distances, frame, num_atoms)
+    atom_sums = np.zeros(num_atoms, dtype=np.float64)
+    atom_counts = np.zeros(num_atoms, dtype=np.int64)
+    backends.reduce_frame(
+        mean_distances, m2_distances, frame, num_atoms, True, atom_sums, atom_counts
+    )
+
+    group_sums = np.zeros(num_groups, dtype=np.float64)
+    group_counts = np.zeros(num_groups, dtype=np.int64)
+    for i in range(num_atoms):
+        if atom_counts[i] > 0:
+            group_sums[group_codes[i]] += atom_sums[i] / atom_counts[i]
+            group_counts[group_codes[i]] += 1
+    linde_per_group = np.full(num_groups, np.nan, dtype=np.float32)
+    for group in range(num_groups):
+        if group_counts[group] > 0:
+            linde_per_group[group] = group_sums[group] / group_counts[group]
+    return linde_per_group
+
+
+@nb.njit(fastmath=True, parallel=False)
+def calculate_frames(
+    positions: npt.NDArray[np.float32], group_codes: npt.NDArray[np.int32], num_groups: int
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the mean Lindemann index of each group of atoms for each frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        group_codes (npt.NDArray[np.int32]): Array of shape (num_atoms,) with the group code (0 .. num_groups - 1)
+                                             of each atom.
+        num_groups (int): The number of groups.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_frames, num_groups) with the index of each group per frame.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    linde_per_frame = np.zeros((num_frames, num_groups), dtype=np.float32)
+    for frame in range(num_frames):
+        linde_per_frame[frame] = calculate_frame(
+            positions[frame], mean_distances, m2_distances, frame, group_codes, num_groups
+        )
+    return linde_per_frame
+
+
+def calculate(
+    pipeline: Pipeline,
+    data: DataCollection,
+    group_codes: npt.NDArray[np.int32],
+    num_groups: int,
+    nframes: Optional[int] = None,
+    out: Any = None,
+    profiler: Optional[Profiler] = None,
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the mean Lindemann index of each group of atoms for a series of frames from an OVITO pipeline,
+    one frame at a time.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        group_codes (npt.NDArray[np.int32]): Array of shape (num_atoms,) with the group code (0 .. num_groups - 1)
+                                             of each atom, see `groups`.
+        num_groups (int): The number of groups.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+        out (Any): Output of shape (nframes, num_groups) the rows are written to as soon as a frame is done,
+                   e.g. a dataset from `save.rows`. If None, an array is allocated.
+        profiler (Optional[Profiler]): Records the parse, compute and write stages and the throughput.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (nframes, num_groups) with the index of each group per frame,
+                                 or `out` if it was given.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        nframes = num_frame
+    elif nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+
+    num_distances = num_particle * (num_particle - 1) // 2
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    linde_per_frame = np.zeros((nframes, num_groups), dtype=np.float32) if out is None else out
+    for frame in range(nframes):
+        with stage(profiler, "parse", frames=1) as counters:
+            data = pipeline.compute(frame)
+            positions = data.particles["Position"].array
+            counters["bytes"] = positions.nbytes
+        with stage(profiler, "compute", frames=1):
+            linde_per_group = calculate_frame(
+                positions, mean_distances, m2_distances, frame, group_codes, num_groups
+            )
+        with stage(profiler, "write", nbytes=linde_per_group.nbytes, frames=1):
+            linde_per_frame[frame] = linde_per_group
+        if profiler is not None:
+            profiler.frame_done(frame, nframes, num_distances)
+    return linde_per_frame
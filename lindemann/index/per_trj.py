@@ -1,9 +1,11 @@
-from typing import Any
+from typing import Any, Iterable, Optional
 
 import numba as nb
 import numpy as np
 import numpy.typing as npt
 
+from lindemann.index import online_trj
+
 # @nb.njit(fastmath=True)
 # def calculate(positions: npt.NDArray[np.float32]) -> np.floating[Any]:
 #     """
@@ -96,3 +98,77 @@ def lindemann_per_atom(frames: npt.NDArray[np.float32]) -> Any:
 def calculate(frames: npt.NDArray[np.float64]) -> float:
 
     return np.mean(np.nanmean(lindemann_per_atom(frames), axis=1))  # type: ignore[no-any-return, no-untyped-call]
+
+
+def calculate_condensed(frames: npt.NDArray[np.float32]) -> float:
+    """
+    Calculates the overall Lindemann index like `calculate`, but keeps only the moments of the
+    N (N - 1) / 2 atom pairs instead of N x N matrices, see `online_trj.calculate_frame`.
+
+    Args:
+        frames (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+
+    Returns:
+        float: The overall Lindemann index, pairs without a ratio are skipped like in `calculate`.
+    """
+    num_frames, num_atoms, _ = frames.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    for frame in range(num_frames):
+        online_trj.calculate_frame(frames[frame], mean_distances, m2_distances, frame, num_atoms)
+    # the ratios overwrite the second moments and the NaN ratios are masked instead of copied like in
+    # nanmean, so the reduction needs only one byte per pair on top of the moments
+    ratios = np.divide(m2_distances, num_frames, out=m2_distances)
+    np.sqrt(ratios, out=ratios)
+    np.divide(ratios, mean_distances, out=ratios)
+    finite = np.isnan(ratios)
+    np.logical_not(finite, out=finite)
+    return float(np.mean(ratios, where=finite, dtype=np.float64))
+
+
+def calculate_until_converged(
+    frames: Iterable[npt.NDArray[np.float32]],
+    tolerance: float,
+    interval: int = 100,
+    num_frames: Optional[int] = None,
+) -> tuple[float, int]:
+    """
+    Calculates the overall Lindemann index, but stops once the index has converged.
+
+    Every `interval` frames the running index is compared to the one of the previous check, the
+    calculation stops as soon as the relative change is below `tolerance`. The frames are consumed one
+    at a time, so a generator that reads them from the trajectory stops reading once the index has
+    converged. Pairs without a ratio are skipped like in `calculate`.
+
+    Args:
+        frames (Iterable[npt.NDArray[np.float32]]): The atomic positions of each frame with shape (num_atoms, 3),
+                                                    e.g. an array of shape (num_frames, num_atoms, 3).
+        tolerance (float): The accepted relative change of the index between two checks.
+        interval (int): The number of frames between two checks.
+        num_frames (Optional[int]): The number of frames. If None, it is the length of `frames`.
+
+    Returns:
+        tuple[float, int]: The overall Lindemann index and the number of frames used for it.
+    """
+    if num_frames is None:
+        num_frames = len(frames)  # type: ignore[arg-type]
+    mean_distances = np.zeros(0, dtype=np.float32)
+    m2_distances = np.zeros(0, dtype=np.float32)
+    previous = None
+    frames_used = 0
+    for frame, positions in enumerate(frames):
+        num_atoms = positions.shape[0]
+        if frame == 0:
+            num_distances = num_atoms * (num_atoms - 1) // 2
+            mean_distances = np.zeros(num_distances, dtype=np.float32)
+            m2_distances = np.zeros(num_distances, dtype=np.float32)
+        online_trj.calculate_frame(positions, mean_distances, m2_distances, frame, num_atoms)
+        frames_used = frame + 1
+        if frames_used % interval == 0 and frames_used < num_frames:
+            current = np.nanmean(np.sqrt(m2_distances / frames_used) / mean_distances)
+            if previous is not None and online_trj.converged(previous, current, tolerance):
+                break
+            previous = current
+
+    return float(np.nanmean(np.sqrt(m2_distances / frames_used) / mean_distances)), frames_used
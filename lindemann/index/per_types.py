@@ -0,0 +1,157 @@
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+
+@nb.njit(fastmath=True, parallel=False)
+def pair_counts(type_codes: npt.NDArray[np.int32], num_types: int) -> npt.NDArray[np.int64]:
+    """
+    Counts the atom pairs for each combination of particle types.
+
+    Args:
+        type_codes (npt.NDArray[np.int32]): Array of shape (num_atoms,) with the type code (0 .. num_types - 1)
+                                            of each atom.
+        num_types (int): The number of different particle types.
+
+    Returns:
+        npt.NDArray[np.int64]: Symmetric array of shape (num_types, num_types) with the number of pairs per type pair.
+    """
+    num_atoms = type_codes.shape[0]
+    counts = np.zeros((num_types, num_types), dtype=np.int64)
+    for i in range(num_atoms):
+        for j in range(i + 1, num_atoms):
+            counts[type_codes[i], type_codes[j]] += 1
+    for a in range(num_types):
+        for b in range(a + 1, num_types):
+            total = counts[a, b] + counts[b, a]
+            counts[a, b] = total
+            counts[b, a] = total
+    return counts
+
+
+@nb.njit(fastmath=True, parallel=False)
+def _reduce(
+    sums: npt.NDArray[np.float64], counts: npt.NDArray[np.int64]
+) -> npt.NDArray[np.float32]:
+    """
+    Turns the accumulated per type pair sums into the partial Lindemann indices.
+
+    Args:
+        sums (npt.NDArray[np.float64]): Array of shape (num_types, num_types) with the summed pair contributions,
+                                        filled in the order the pairs were visited.
+        counts (npt.NDArray[np.int64]): Symmetric array with the number of pairs per type pair.
+
+    Returns:
+        npt.NDArray[np.float32]: Symmetric array of shape (num_types, num_types) with the partial Lindemann indices.
+                                 Type pairs without any atom pair are NaN.
+    """
+    num_types = sums.shape[0]
+    partial = np.full((num_types, num_types), np.nan, dtype=np.float32)
+    for a in range(num_types):
+        for b in range(a, num_types):
+            if counts[a, b] == 0:
+                continue
+            total = sums[a, b] if a == b else sums[a, b] + sums[b, a]
+            partial[a, b] = total / counts[a, b]
+            partial[b, a] = partial[a, b]
+    return partial
+
+
+@nb.njit(fastmath=True, parallel=False)
+def calculate(
+    positions: npt.NDArray[np.float32], type_codes: npt.NDArray[np.int32], num_types: int
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the partial (species resolved) Lindemann indices for the trajectory.
+
+    The contribution of each atom pair is accumulated into the entry of its type pair, so A-A, A-B and B-B
+    indices are obtained from a single pass over the pairs.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        type_codes (npt.NDArray[np.int32]): Array of shape (num_atoms,) with the type code (0 .. num_types - 1)
+                                            of each atom.
+        num_types (int): The number of different particle types.
+
+    Returns:
+        npt.NDArray[np.float32]: Symmetric array of shape (num_types, num_types) with the partial Lindemann indices.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+
+    for frame in range(num_frames):
+        index = 0
+        frame_count = frame + 1
+        for i in range(num_atoms):
+            for j in range(i + 1, num_atoms):
+                dist = 0.0
+                for k in range(3):
+                    dist += (positions[frame, i, k] - positions[frame, j, k]) ** 2
+                dist = np.sqrt(dist)
+                delta = dist - mean_distances[index]
+                mean_distances[index] += delta / frame_count
+                delta2 = dist - mean_distances[index]
+                m2_distances[index] += delta * delta2
+
+                index += 1
+
+    sums = np.zeros((num_types, num_types), dtype=np.float64)
+    index = 0
+    for i in range(num_atoms):
+        for j in range(i + 1, num_atoms):
+            sums[type_codes[i], type_codes[j]] += (
+                np.sqrt(m2_distances[index] / num_frames) / mean_distances[index]
+            )
+            index += 1
+    return _reduce(sums, pair_counts(type_codes, num_types))
+
+
+@nb.njit(fastmath=True, parallel=False)
+def calculate_frames(
+    positions: npt.NDArray[np.float32], type_codes: npt.NDArray[np.int32], num_types: int
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the partial (species resolved) Lindemann indices for each frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions with shape (num_frames, num_atoms, 3).
+        type_codes (npt.NDArray[np.int32]): Array of shape (num_atoms,) with the type code (0 .. num_types - 1)
+                                            of each atom.
+        num_types (int): The number of different particle types.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_frames, num_types, num_types) with the partial Lindemann
+                                 indices for each frame.
+    """
+    num_frames, num_atoms, _ = positions.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+    counts = pair_counts(type_codes, num_types)
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    linde_per_frame = np.zeros((num_frames, num_types, num_types), dtype=np.float32)
+    for frame in range(num_frames):
+        index = 0
+        frame_count = frame + 1
+        sums = np.zeros((num_types, num_types), dtype=np.float64)
+        for i in range(num_atoms):
+            for j in range(i + 1, num_atoms):
+                dist = 0.0
+                for k in range(3):
+                    dist += (positions[frame, i, k] - positions[frame, j, k]) ** 2
+                dist = np.sqrt(dist)
+                delta = dist - mean_distances[index]
+                mean_distances[index] += delta / frame_count
+                delta2 = dist - mean_distances[index]
+                m2_distances[index] += delta * delta2
+                sums[type_codes[i], type_codes[j]] += (
+                    np.sqrt(m2_distances[index] / frame_count) / mean_distances[index]
+                )
+
+                index += 1
+        linde_per_frame[frame] = _reduce(sums, counts)
+
+    return linde_per_frame
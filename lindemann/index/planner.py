@@ -0,0 +1,182 @@
+from typing import NamedTuple, Optional
+
+import sys
+
+import numba as nb
+import numpy as np
+from psutil import Process, cpu_count, virtual_memory
+
+from lindemann.index import online_trj, out_of_core, parallel_trj, per_trj, sampled_trj
+from lindemann.trajectory import read
+
+FLOAT_SIZE = np.float32().nbytes
+# pair indices, moments and the float64 temporaries of the condensed index inversion
+PAIR_BYTES = 64
+# share of the available memory used if no budget is given
+AVAILABLE_SHARE = 0.9
+
+
+class Probe(NamedTuple):
+    """The size of a trajectory."""
+
+    nframes: int
+    natoms: int
+
+
+class Plan(NamedTuple):
+    """The execution mode chosen for a trajectory and memory budget."""
+
+    mode: str
+    workers: int
+    num_pairs: Optional[int]
+    predicted_bytes: int
+
+
+def probe(trjfile: str) -> Probe:
+    """
+    Reads the number of frames and atoms of a trajectory from the frame index and the first frame,
+    without loading the positions of the whole trajectory.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+
+    Returns:
+        Probe: The number of frames and atoms.
+    """
+    pipeline = read.open_pipeline(trjfile)
+    data = pipeline.compute(0)
+    return Probe(pipeline.source.num_frames, data.particles.count)
+
+
+def memory_budget(max_memory: Optional[int] = None) -> int:
+    """
+    Returns the memory budget in bytes.
+
+    Args:
+        max_memory (Optional[int]): The memory budget in bytes. If None, 90 % of the available memory.
+
+    Returns:
+        int: The budget in bytes.
+    """
+    return int(virtual_memory().available * AVAILABLE_SHARE) if max_memory is None else max_memory
+
+
+def predicted_bytes(
+    mode: str, nframes: int, natoms: int, workers: int = 1, num_pairs: Optional[int] = None
+) -> int:
+    """
+    Predicts the memory the arrays of an execution mode need at their peak.
+
+    Args:
+        mode (str): "in_memory" (-t), "parallel" (-pt), "online" (-ot), "out_of_core" or "sampled" (--sample).
+        nframes (int): The number of frames.
+        natoms (int): The number of atoms.
+        workers (int): The number of chunks processed at the same time in the parallel mode.
+        num_pairs (Optional[int]): The number of sampled pairs in the sampled mode and the number of pairs
+                                   of a block in the out_of_core mode.
+
+    Returns:
+        int: The predicted memory in bytes.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    num_distances = natoms * (natoms - 1) // 2
+    positions = nframes * natoms * 3 * FLOAT_SIZE
+    moments = 2 * num_distances * FLOAT_SIZE
+    frame = natoms * 3 * 8
+    if mode == "in_memory":
+        # the condensed moments of per_trj.calculate_condensed and the NaN mask of the final reduction
+        return positions + moments + num_distances
+    if mode == "parallel":
+        # the moments of all chunks, merged in place
+        return positions + workers * moments
+    if mode == "online":
+        return 2 * moments + frame
+    if mode == "out_of_core":
+        # the moments of one block and a float32 frame of the position cache
+        block = num_distances if num_pairs is None else num_pairs
+        return block * out_of_core.MOMENT_BYTES + natoms * 3 * FLOAT_SIZE
+    if mode == "sampled":
+        return (num_distances if num_pairs is None else num_pairs) * PAIR_BYTES + frame
+    raise ValueError(f"Unknown mode {mode}.")
+
+
+def plan(
+    nframes: int, natoms: int, max_memory: Optional[int] = None, cores: Optional[int] = None
+) -> Plan:
+    """
+    Chooses the fastest execution mode for the Lindemann index of the trajectory that stays within the
+    memory budget: parallel chunks with as many workers as fit, all frames in memory, one frame at a
+    time, one block of pairs at a time (see `out_of_core`), or a random sample of as many pairs as fit if
+    not even the pairs of one atom do.
+
+    Args:
+        nframes (int): The number of frames.
+        natoms (int): The number of atoms.
+        max_memory (Optional[int]): The memory budget in bytes. If None, 90 % of the available memory.
+        cores (Optional[int]): The number of cores. If None, all cores.
+
+    Returns:
+        Plan: The mode, the number of parallel workers, the number of sampled pairs (pairs of a block in
+              the out_of_core mode) and the predicted memory in bytes.
+    """
+    budget = memory_budget(max_memory)
+    cores = cores or cpu_count()
+    for workers in range(min(cores, nframes), 1, -1):
+        needed = predicted_bytes("parallel", nframes, natoms, workers)
+        if needed <= budget:
+            return Plan("parallel", workers, None, needed)
+    for mode in ("in_memory", "online"):
+        needed = predicted_bytes(mode, nframes, natoms)
+        if needed <= budget:
+            return Plan(mode, 1, None, needed)
+    block = out_of_core.block_pairs(budget, nframes, natoms)
+    needed = predicted_bytes("out_of_core", nframes, natoms, 1, block)
+    if needed <= budget:
+        return Plan("out_of_core", 1, block, needed)
+    num_distances = natoms * (natoms - 1) // 2
+    num_pairs = int(min(max((budget - natoms * 3 * 8) // PAIR_BYTES, 1), num_distances))
+    return Plan("sampled", 1, num_pairs, predicted_bytes("sampled", nframes, natoms, 1, num_pairs))
+
+
+def run(trjfile: str, chosen: Plan) -> float:
+    """
+    Calculates the Lindemann index of the trajectory with the chosen plan.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+        chosen (Plan): The plan, see `plan`.
+
+    Returns:
+        float: The Lindemann index of the trajectory, an estimate in the sampled mode.
+    """
+    if chosen.mode == "parallel":
+        # one chunk per thread, so no more chunk moments are alive than planned
+        nb.set_num_threads(min(chosen.workers, nb.config.NUMBA_NUM_THREADS))
+        return float(parallel_trj.calculate(read.frames(trjfile), chosen.workers))
+    if chosen.mode == "in_memory":
+        return per_trj.calculate_condensed(read.frames(trjfile))
+    pipeline, data = read.trajectory(trjfile)
+    if chosen.mode == "online":
+        return float(online_trj.calculate(pipeline, data))
+    if chosen.mode == "out_of_core":
+        # the predicted memory is the budget that gives the planned block size
+        return float(out_of_core.calculate(pipeline, data, chosen.predicted_bytes).trj)
+    return float(sampled_trj.calculate(pipeline, data, chosen.num_pairs)[0])
+
+
+def peak_rss() -> int:
+    """
+    Returns the peak resident set size of the process so far.
+
+    Returns:
+        int: The peak RSS in bytes.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return int(Process().memory_info().peak_wset)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return int(peak if sys.platform == "darwin" else peak * 1024)
@@ -0,0 +1,197 @@
+from typing import Any, Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+from lindemann.index import backends, parallel_trj
+from lindemann.trajectory.quantize import Quantized
+
+
+@nb.njit(fastmath=True, parallel=False)
+def _update_frame(
+    codes: npt.NDArray[np.uint16],
+    scale: npt.NDArray[np.float32],
+    frame: int,
+    frame_count: int,
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+) -> None:
+    """
+    Adds the pair distances of a frame, decoded from the codes, to the running mean and second moment.
+
+    The origin of the frame cancels in the differences, only the step of each axis is needed.
+    """
+    num_atoms = codes.shape[1]
+    index = 0
+    for i in range(num_atoms):
+        for j in range(i + 1, num_atoms):
+            dist = 0.0
+            for k in range(3):
+                steps = np.float32(codes[frame, i, k]) - np.float32(codes[frame, j, k])
+                dist += (steps * scale[frame, k]) ** 2
+            dist = np.sqrt(dist)
+            delta = dist - mean_distances[index]
+            mean_distances[index] += delta / frame_count
+            delta2 = dist - mean_distances[index]
+            m2_distances[index] += delta * delta2
+
+            index += 1
+
+
+@nb.njit(fastmath=True, parallel=False)
+def _calculate(codes: npt.NDArray[np.uint16], scale: npt.NDArray[np.float32]) -> np.floating[Any]:
+    num_frames, num_atoms, _ = codes.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    for frame in range(num_frames):
+        _update_frame(codes, scale, frame, frame + 1, mean_distances, m2_distances)
+
+    return np.mean(np.sqrt(m2_distances / num_frames) / mean_distances)
+
+
+@nb.njit(fastmath=True, parallel=False)
+def _calculate_frames(
+    codes: npt.NDArray[np.uint16], scale: npt.NDArray[np.float32]
+) -> npt.NDArray[np.float32]:
+    num_frames, num_atoms, _ = codes.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    linde_per_frame = np.zeros(num_frames, dtype=np.float32)
+    for frame in range(num_frames):
+        frame_count = frame + 1
+        _update_frame(codes, scale, frame, frame_count, mean_distances, m2_distances)
+        linde_per_frame[frame] = np.mean(np.sqrt(m2_distances / frame_count) / mean_distances)
+
+    return linde_per_frame
+
+
+@nb.njit(fastmath=backends.NAN_SAFE_FASTMATH, parallel=False)
+def _calculate_atoms(
+    codes: npt.NDArray[np.uint16], scale: npt.NDArray[np.float32]
+) -> npt.NDArray[np.float32]:
+    num_frames, num_atoms, _ = codes.shape
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    lindex_array = np.zeros((num_frames, num_atoms), dtype=np.float32)
+    sums = np.zeros(num_atoms, dtype=np.float64)
+    counts = np.zeros(num_atoms, dtype=np.int64)
+    for frame in range(num_frames):
+        frame_count = frame + 1
+        _update_frame(codes, scale, frame, frame_count, mean_distances, m2_distances)
+
+        backends.reduce_frame(mean_distances, m2_distances, frame, num_atoms, True, sums, counts)
+        for i in range(num_atoms):
+            lindex_array[frame, i] = sums[i] / counts[i] if counts[i] else np.nan
+
+    return lindex_array
+
+
+@nb.njit(fastmath=True, parallel=True)
+def _calculate_parallel(
+    codes: npt.NDArray[np.uint16], scale: npt.NDArray[np.float32], num_chunks: int
+) -> np.floating[Any]:
+    num_frames, num_atoms, _ = codes.shape
+    num_chunks = max(1, min(num_chunks, num_frames))
+    bounds = parallel_trj.chunk_bounds(num_frames, num_chunks)
+    num_distances = num_atoms * (num_atoms - 1) // 2
+
+    all_mean_distances = np.zeros((num_chunks, num_distances), dtype=np.float32)
+    all_m2_distances = np.zeros((num_chunks, num_distances), dtype=np.float32)
+    all_counts = np.zeros(num_chunks, dtype=np.int64)
+
+    for chunk in nb.prange(num_chunks):
+        for frame in range(bounds[chunk], bounds[chunk + 1]):
+            _update_frame(
+                codes,
+                scale,
+                frame,
+                frame + 1 - bounds[chunk],
+                all_mean_distances[chunk],
+                all_m2_distances[chunk],
+            )
+        all_counts[chunk] = bounds[chunk + 1] - bounds[chunk]
+
+    step = 1
+    while step < num_chunks:
+        num_merges = (num_chunks + 2 * step - 1) // (2 * step)
+        for merge in nb.prange(num_merges):
+            chunk_a = merge * 2 * step
+            chunk_b = chunk_a + step
+            if chunk_b < num_chunks:
+                all_counts[chunk_a] = parallel_trj._merge_into(
+                    all_counts[chunk_a],
+                    all_mean_distances[chunk_a],
+                    all_m2_distances[chunk_a],
+                    all_counts[chunk_b],
+                    all_mean_distances[chunk_b],
+                    all_m2_distances[chunk_b],
+                )
+        step *= 2
+
+    return np.mean(np.sqrt(all_m2_distances[0] / all_counts[0]) / all_mean_distances[0])
+
+
+def calculate(quantized: Quantized) -> np.floating[Any]:
+    """
+    Calculates the Lindemann index of a quantized trajectory, like `per_trj.calculate`.
+
+    Args:
+        quantized (Quantized): The trajectory in 16-bit fixed point, see `quantize.frames`.
+
+    Returns:
+        np.floating[Any]: The Lindemann index.
+    """
+    return _calculate(quantized.codes, quantized.scale)
+
+
+def calculate_frames(quantized: Quantized) -> npt.NDArray[np.float32]:
+    """
+    Calculates the Lindemann index for each frame of a quantized trajectory, like `per_frames.calculate`.
+
+    Args:
+        quantized (Quantized): The trajectory in 16-bit fixed point, see `quantize.frames`.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of Lindemann indices for each frame.
+    """
+    return _calculate_frames(quantized.codes, quantized.scale)
+
+
+def calculate_atoms(quantized: Quantized) -> npt.NDArray[np.float32]:
+    """
+    Calculates the Lindemann index of each atom for each frame of a quantized trajectory, like
+    `per_atoms.calculate`.
+
+    Args:
+        quantized (Quantized): The trajectory in 16-bit fixed point, see `quantize.frames`.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (frames, atoms) with the Lindemann index per atom and frame.
+    """
+    return _calculate_atoms(quantized.codes, quantized.scale)
+
+
+def calculate_scheduled(
+    quantized: Quantized, max_memory: Optional[int] = None
+) -> np.floating[Any]:
+    """
+    Calculates the Lindemann index of a quantized trajectory in parallel chunks, like
+    `parallel_trj.calculate_scheduled`.
+
+    Args:
+        quantized (Quantized): The trajectory in 16-bit fixed point, see `quantize.frames`.
+        max_memory (Optional[int]): The memory budget for the chunk moments in bytes.
+
+    Returns:
+        np.floating[Any]: The Lindemann index.
+    """
+    num_frames, num_atoms, _ = quantized.codes.shape
+    num_chunks = parallel_trj.schedule(num_frames, num_atoms, max_memory=max_memory)
+    return _calculate_parallel(quantized.codes, quantized.scale, num_chunks)
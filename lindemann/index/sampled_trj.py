@@ -0,0 +1,269 @@
+from typing import Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+
+def sample_pairs(
+    num_atoms: int, num_pairs: int, seed: Optional[int] = None
+) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]:
+    """
+    Draws a random sample of distinct atom pairs without replacement.
+
+    Args:
+        num_atoms (int): The number of atoms.
+        num_pairs (int): The number of pairs to sample, at least 1 and at most num_atoms * (num_atoms - 1) // 2.
+        seed (Optional[int]): Seed of the random number generator, makes the sample reproducible.
+
+    Returns:
+        tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]: The first and second atom of each pair (i < j),
+                                                             sorted in the condensed pair order.
+
+    Raises:
+        ValueError: If no pairs or more pairs are requested than the system has.
+    """
+    num_distances = num_atoms * (num_atoms - 1) // 2
+    if num_pairs < 1 or num_pairs > num_distances:
+        raise ValueError(
+            f"Requested {num_pairs} pairs, but between 1 and {num_distances} pairs are available."
+        )
+
+    rng = np.random.default_rng(seed)
+    condensed = np.sort(rng.choice(num_distances, size=num_pairs, replace=False)).astype(
+        np.float64
+    )
+    # invert the condensed index k -> (i, j) of the upper triangle
+    pair_i = (
+        num_atoms
+        - 2
+        - np.floor(np.sqrt(-8 * condensed + 4 * num_atoms * (num_atoms - 1) - 7) / 2 - 0.5)
+    )
+    pair_j = (
+        condensed
+        + pair_i
+        + 1
+        - num_distances
+        + (num_atoms - pair_i) * (num_atoms - pair_i - 1) / 2
+    )
+    return pair_i.astype(np.int32), pair_j.astype(np.int32)
+
+
+def sample_pairs_per_atom(
+    num_atoms: int, pairs_per_atom: int, seed: Optional[int] = None
+) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]:
+    """
+    Draws a stratified sample with the same number of random partners for every atom.
+
+    Args:
+        num_atoms (int): The number of atoms.
+        pairs_per_atom (int): The number of partners drawn for each atom, at most num_atoms - 1.
+        seed (Optional[int]): Seed of the random number generator, makes the sample reproducible.
+
+    Returns:
+        tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]: The atom and its partner of each pair, ordered by atom,
+                                                             so pairs of atom i are at
+                                                             [i * pairs_per_atom, (i + 1) * pairs_per_atom).
+
+    Raises:
+        ValueError: If more partners are requested than each atom has.
+    """
+    if pairs_per_atom > num_atoms - 1:
+        raise ValueError(
+            f"Requested {pairs_per_atom} pairs per atom, but only {num_atoms - 1} partners are available."
+        )
+
+    rng = np.random.default_rng(seed)
+    pair_i = np.repeat(np.arange(num_atoms, dtype=np.int32), pairs_per_atom)
+    pair_j = np.zeros(num_atoms * pairs_per_atom, dtype=np.int32)
+    for atom in range(num_atoms):
+        partners = rng.choice(num_atoms - 1, size=pairs_per_atom, replace=False)
+        partners[partners >= atom] += 1
+        pair_j[atom * pairs_per_atom : (atom + 1) * pairs_per_atom] = partners
+    return pair_i, pair_j
+
+
+@nb.njit(fastmath=True, parallel=False)
+def calculate_frame(
+    positions: npt.NDArray[np.float32],
+    pair_i: npt.NDArray[np.int32],
+    pair_j: npt.NDArray[np.int32],
+    mean_distances: npt.NDArray[np.float32],
+    m2_distances: npt.NDArray[np.float32],
+    frame: int,
+) -> None:
+    """
+    Updates the mean and variance of the sampled pair distances for a specific frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of atomic positions for the current frame.
+        pair_i (npt.NDArray[np.int32]): First atom of each sampled pair.
+        pair_j (npt.NDArray[np.int32]): Second atom of each sampled pair.
+        mean_distances (npt.NDArray[np.float32]): Array to store the mean distances of the sampled pairs.
+        m2_distances (npt.NDArray[np.float32]): Array to store the squared differences of distances of the sampled pairs.
+        frame (int): The current frame index.
+
+    Returns:
+        None
+    """
+    frame_count = frame + 1
+    for index in range(pair_i.shape[0]):
+        i = pair_i[index]
+        j = pair_j[index]
+        dist = 0.0
+        for k in range(3):
+            dist += (positions[i, k] - positions[j, k]) ** 2
+
+        dist = np.sqrt(dist)
+        delta = dist - mean_distances[index]
+        mean_distances[index] += delta / frame_count
+        delta2 = dist - mean_distances[index]
+        m2_distances[index] += delta * delta2
+
+
+def _pair_ratios(
+    pipeline: Pipeline,
+    pair_i: npt.NDArray[np.int32],
+    pair_j: npt.NDArray[np.int32],
+    nframes: int,
+) -> npt.NDArray[np.float64]:
+    """
+    Streams the frames of the pipeline and returns the Lindemann ratio of each sampled pair.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        pair_i (npt.NDArray[np.int32]): First atom of each sampled pair.
+        pair_j (npt.NDArray[np.int32]): Second atom of each sampled pair.
+        nframes (int): The number of frames to process.
+
+    Returns:
+        npt.NDArray[np.float64]: The relative distance fluctuation of each sampled pair.
+    """
+    mean_distances = np.zeros(pair_i.shape[0], dtype=np.float32)
+    m2_distances = np.zeros(pair_i.shape[0], dtype=np.float32)
+    for frame in range(nframes):
+        data = pipeline.compute(frame)
+        calculate_frame(
+            data.particles["Position"].array, pair_i, pair_j, mean_distances, m2_distances, frame
+        )
+    return (np.sqrt(m2_distances / nframes) / mean_distances).astype(np.float64)
+
+
+def _num_frames(pipeline: Pipeline, nframes: Optional[int]) -> int:
+    """
+    Checks the requested number of frames against the frames available in the pipeline.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+
+    Returns:
+        int: The number of frames to process.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_frame = pipeline.source.num_frames
+    if nframes is None:
+        return num_frame
+    if nframes > num_frame:
+        raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
+    return nframes
+
+
+def calculate(
+    pipeline: Pipeline,
+    data: DataCollection,
+    num_pairs: int,
+    seed: Optional[int] = None,
+    nframes: Optional[int] = None,
+) -> tuple[float, float]:
+    """
+    Estimates the overall Lindemann index from a random sample of atom pairs.
+
+    Only the moments of the sampled pairs are kept, so memory and time per frame are O(num_pairs).
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        num_pairs (int): The number of atom pairs to sample.
+        seed (Optional[int]): Seed of the random number generator, makes the estimate reproducible.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+
+    Returns:
+        tuple[float, float]: The estimated Lindemann index and its standard error.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline, or
+                    the number of pairs is not between 1 and the number of pairs of the system.
+    """
+    num_particle = data.particles.count
+    nframes = _num_frames(pipeline, nframes)
+    pair_i, pair_j = sample_pairs(num_particle, num_pairs, seed)
+    ratios = _pair_ratios(pipeline, pair_i, pair_j, nframes)
+
+    num_distances = num_particle * (num_particle - 1) // 2
+    if num_pairs < 2:
+        return float(np.mean(ratios)), float("nan")
+    # finite population correction, the sample is drawn without replacement
+    correction = 1.0 - num_pairs / num_distances
+    stderr = np.std(ratios, ddof=1) / np.sqrt(num_pairs) * np.sqrt(correction)
+    return float(np.mean(ratios)), float(stderr)
+
+
+def calculate_atoms(
+    pipeline: Pipeline,
+    data: DataCollection,
+    pairs_per_atom: int,
+    seed: Optional[int] = None,
+    nframes: Optional[int] = None,
+) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]:
+    """
+    Estimates the contribution of each atom to the Lindemann index from a stratified sample of atom pairs.
+
+    Every atom gets the same number of random partners, so the per-atom values stay unbiased.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        pairs_per_atom (int): The number of partners sampled for each atom.
+        seed (Optional[int]): Seed of the random number generator, makes the estimate reproducible.
+        nframes (Optional[int]): The number of frames to process. If None, all frames are processed.
+
+    Returns:
+        tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]: The estimated Lindemann index of each atom
+                                                                 and its standard error.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    num_particle = data.particles.count
+    nframes = _num_frames(pipeline, nframes)
+    pair_i, pair_j = sample_pairs_per_atom(num_particle, pairs_per_atom, seed)
+    ratios = _pair_ratios(pipeline, pair_i, pair_j, nframes).reshape(num_particle, pairs_per_atom)
+
+    per_atom = np.mean(ratios, axis=1)
+    if pairs_per_atom < 2:
+        return per_atom.astype(np.float32), np.full(num_particle, np.nan, dtype=np.float32)
+    correction = 1.0 - pairs_per_atom / (num_particle - 1)
+    stderr = np.std(ratios, axis=1, ddof=1) / np.sqrt(pairs_per_atom) * np.sqrt(correction)
+    return per_atom.astype(np.float32), stderr.astype(np.float32)
+
+
+def required_pairs(num_pairs: int, stderr: float, target: float) -> int:
+    """
+    Extrapolates the sample size needed to reach a target standard error.
+
+    The standard error of the estimate falls with the square root of the number of sampled pairs.
+
+    Args:
+        num_pairs (int): The number of pairs the standard error was estimated with.
+        stderr (float): The standard error obtained with num_pairs pairs.
+        target (float): The standard error that should be reached.
+
+    Returns:
+        int: The number of pairs needed for the target standard error.
+    """
+    return int(np.ceil(num_pairs * (stderr / target) ** 2))
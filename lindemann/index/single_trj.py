@@ -0,0 +1,118 @@
+from typing import Optional
+
+import numba as nb
+import numpy as np
+import numpy.typing as npt
+
+
+@nb.njit(fastmath=True, parallel=False)
+def nearest_neighbor_distance(reference: npt.NDArray[np.float64], max_atoms: int = 1000) -> float:
+    """
+    Estimates the nearest neighbour distance of a structure.
+
+    The nearest neighbour distance is calculated for up to `max_atoms` evenly spaced atoms against all
+    atoms, so the cost is O(max_atoms * num_atoms). The median is used, so a few surface atoms or atoms
+    at a periodic boundary do not bias the result.
+
+    Args:
+        reference (npt.NDArray[np.float64]): Array of shape (num_atoms, 3) with the reference positions,
+                                             usually the mean positions of the atoms.
+        max_atoms (int): The maximum number of atoms the nearest neighbour distance is calculated for.
+
+    Returns:
+        float: The median nearest neighbour distance.
+    """
+    num_atoms = reference.shape[0]
+    step = max(1, num_atoms // max_atoms)
+    samples = np.arange(0, num_atoms, step)
+    nn_distances = np.empty(samples.shape[0], dtype=np.float64)
+    for sample in range(samples.shape[0]):
+        i = samples[sample]
+        nearest = np.inf
+        for j in range(num_atoms):
+            if i == j:
+                continue
+            dist = 0.0
+            for k in range(3):
+                dist += (reference[i, k] - reference[j, k]) ** 2
+            if dist < nearest:
+                nearest = dist
+        nn_distances[sample] = np.sqrt(nearest)
+    return np.median(nn_distances)
+
+
+@nb.njit(fastmath=True, parallel=False)
+def _calculate_atoms(
+    positions: npt.NDArray[np.float32], nn_distance: float, remove_drift: bool
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the single particle Lindemann index of each atom.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions with shape (num_frames, num_atoms, 3).
+        nn_distance (float): The nearest neighbour distance, estimated from the mean positions if <= 0.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_atoms,) with the single particle Lindemann index of each atom.
+    """
+    num_frames, num_atoms, _ = positions.shape
+
+    mean_positions = np.zeros((num_atoms, 3), dtype=np.float64)
+    m2_positions = np.zeros(num_atoms, dtype=np.float64)
+    center = np.zeros(3, dtype=np.float64)
+    for frame in range(num_frames):
+        frame_count = frame + 1
+        if remove_drift:
+            for k in range(3):
+                center[k] = np.mean(positions[frame, :, k])
+        for i in range(num_atoms):
+            for k in range(3):
+                position = positions[frame, i, k] - center[k]
+                delta = position - mean_positions[i, k]
+                mean_positions[i, k] += delta / frame_count
+                m2_positions[i] += delta * (position - mean_positions[i, k])
+
+    if nn_distance <= 0.0:
+        nn_distance = nearest_neighbor_distance(mean_positions)
+    return (np.sqrt(m2_positions / num_frames) / nn_distance).astype(np.float32)
+
+
+def calculate_atoms(
+    positions: npt.NDArray[np.float32],
+    nn_distance: Optional[float] = None,
+    remove_drift: bool = True,
+) -> npt.NDArray[np.float32]:
+    """
+    Calculates the single particle Lindemann index of each atom, the rms displacement of the atom about
+    its mean position divided by the nearest neighbour distance. Costs O(num_atoms) per frame.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions with shape (num_frames, num_atoms, 3).
+        nn_distance (Optional[float]): The nearest neighbour distance. If None, it is estimated from the mean positions.
+        remove_drift (bool): If True, the centre of each frame is removed, so a drifting system is not mistaken for
+                             fluctuating atoms.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_atoms,) with the single particle Lindemann index of each atom.
+    """
+    return _calculate_atoms(positions, nn_distance or 0.0, remove_drift)
+
+
+def calculate(
+    positions: npt.NDArray[np.float32],
+    nn_distance: Optional[float] = None,
+    remove_drift: bool = True,
+) -> float:
+    """
+    Calculates the single particle Lindemann index of the trajectory.
+
+    Args:
+        positions (npt.NDArray[np.float32]): Array of unwrapped atomic positions with shape (num_frames, num_atoms, 3).
+        nn_distance (Optional[float]): The nearest neighbour distance. If None, it is estimated from the mean positions.
+        remove_drift (bool): If True, the centre of each frame is removed before the update.
+
+    Returns:
+        float: The single particle Lindemann index.
+    """
+    return float(np.mean(calculate_atoms(positions, nn_distance, remove_drift)))
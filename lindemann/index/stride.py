@@ -0,0 +1,211 @@
+"""
+Adaptive frame stride from the decorrelation time of the pair distances.
+
+Neighbouring MD frames are strongly correlated, so most frames add little information to the Lindemann
+index. A cheap pilot pass reads a few windows of consecutive frames spread over the trajectory, follows
+the distances of a random sample of pairs and estimates their normalized autocorrelation function. With
+it the statistical efficiency of a stride s, the effective number of independent samples of every s-th
+frame relative to all frames,
+
+    efficiency(s) = tau(1) / (s * tau(s)),    tau(s) = 1/2 + sum_j rho(j * s),
+
+is known, and the largest stride that keeps the efficiency above 1 - tolerance is chosen. tau(1) is the
+integrated autocorrelation time, summed up to Sokal's self consistent window. Subtracting the mean of a
+window of T frames lowers the autocorrelation by about 2 tau / T, which is corrected for; the estimate
+stays on the low (small stride) side for decorrelation times close to the window length.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+import numpy.typing as npt
+from ovito.data import DataCollection
+from ovito.pipeline import Pipeline
+
+from lindemann.index import sampled_trj
+
+# the window of the integrated autocorrelation time is the smallest lag M >= SOKAL_WINDOW * tau(M)
+SOKAL_WINDOW = 5.0
+# the largest correction of the mean subtraction bias, beyond it the windows are too short to correct
+MAX_BIAS = 0.1
+
+
+class Stride(NamedTuple):
+    """The chosen stride with the decorrelation time and the efficiency it is based on."""
+
+    stride: int
+    decorrelation_time: float
+    efficiency: float
+
+
+def _autocovariance(series: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """The autocovariance of each lag summed over the pairs."""
+    num_frames = series.shape[0]
+    centred = series - series.mean(axis=0)
+    spectrum = np.fft.rfft(centred, n=2 * num_frames, axis=0)
+    covariance = np.fft.irfft(np.abs(spectrum) ** 2, n=2 * num_frames, axis=0)[:num_frames]
+    return covariance.sum(axis=1) / num_frames
+
+
+def autocorrelation(series: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """
+    Calculates the normalized autocorrelation function of a window of pair distances, the autocovariance
+    summed over the pairs (with FFT) divided by the summed variance.
+
+    Args:
+        series (npt.NDArray[np.float64]): Array of shape (num_frames, num_pairs) with the pair distances.
+
+    Returns:
+        npt.NDArray[np.float64]: The autocorrelation of the lags 0 .. num_frames - 1, 1 at lag 0, corrected
+                                 for the bias of the mean subtraction.
+    """
+    autocovariance = _autocovariance(series)
+    if autocovariance[0] <= 0:
+        return np.eye(1, len(autocovariance))[0]
+    return _debias(autocovariance / autocovariance[0])
+
+
+def _debias(rho: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """
+    Corrects the bias of the mean subtraction, rho_sampled = (rho - b) / (1 - b) with b = 2 tau / T, by
+    fixed point iteration on tau.
+    """
+    bias = 0.0
+    for _ in range(20):
+        tau, _ = integrated_time(rho * (1 - bias) + bias)
+        bias = min(2 * tau / len(rho), MAX_BIAS)
+    return rho * (1 - bias) + bias
+
+
+def integrated_time(rho: npt.NDArray[np.float64]) -> tuple[float, int]:
+    """
+    Calculates the integrated autocorrelation time with Sokal's automatic window.
+
+    Args:
+        rho (npt.NDArray[np.float64]): The normalized autocorrelation function, see `autocorrelation`.
+
+    Returns:
+        tuple[float, int]: The integrated autocorrelation time in frames and the window (largest lag) used.
+    """
+    tau = 0.5 + np.cumsum(rho[1:])
+    lags = np.arange(1, len(rho))
+    inside = lags >= SOKAL_WINDOW * tau
+    window = int(lags[np.argmax(inside)]) if inside.any() else len(rho) - 1
+    if window == 0:
+        return 0.5, 0
+    return max(float(tau[window - 1]), 0.5), window
+
+
+def efficiency(rho: npt.NDArray[np.float64], stride: int, window: int) -> float:
+    """
+    Calculates the statistical efficiency of every `stride`-th frame relative to all frames.
+
+    Args:
+        rho (npt.NDArray[np.float64]): The normalized autocorrelation function, see `autocorrelation`.
+        stride (int): The frame stride.
+        window (int): The largest lag summed, see `integrated_time`.
+
+    Returns:
+        float: The ratio of the effective sample sizes, 1 for uncorrelated frames.
+    """
+    tau_all = max(0.5 + rho[1 : window + 1].sum(), 0.5)
+    tau_strided = max(0.5 + rho[stride : window + 1 : stride].sum(), 0.5)
+    return float(min(tau_all / (stride * tau_strided), 1.0))
+
+
+def choose(rho: npt.NDArray[np.float64], tolerance: float) -> Stride:
+    """
+    Chooses the largest stride before the efficiency first drops below 1 - tolerance.
+
+    Args:
+        rho (npt.NDArray[np.float64]): The normalized autocorrelation function, see `autocorrelation`.
+        tolerance (float): The accepted loss of statistical efficiency, e.g. 0.05.
+
+    Returns:
+        Stride: The stride, the integrated autocorrelation time and the efficiency of the stride.
+    """
+    tau, window = integrated_time(rho)
+    chosen, chosen_efficiency = 1, 1.0
+    for stride in range(2, window + 1):
+        stride_efficiency = efficiency(rho, stride, window)
+        if stride_efficiency < 1 - tolerance:
+            break
+        chosen, chosen_efficiency = stride, stride_efficiency
+    return Stride(chosen, tau, chosen_efficiency)
+
+
+def pilot(
+    pipeline: Pipeline,
+    data: DataCollection,
+    num_pairs: int = 1000,
+    pilot_frames: int = 1000,
+    num_windows: int = 2,
+    seed: Optional[int] = 0,
+    nframes: Optional[int] = None,
+) -> npt.NDArray[np.float64]:
+    """
+    Estimates the autocorrelation of the pair distances from windows of consecutive frames spread evenly
+    over the trajectory, for a random sample of pairs.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        num_pairs (int): The number of sampled pairs, at most all pairs.
+        pilot_frames (int): The number of frames read in total, at most all frames.
+        num_windows (int): The number of windows the pilot frames are split into.
+        seed (Optional[int]): Seed of the pair sample.
+        nframes (Optional[int]): The number of frames of the trajectory to consider. If None, all frames.
+
+    Returns:
+        npt.NDArray[np.float64]: The normalized autocorrelation of the lags 0 .. window length - 1.
+
+    Raises:
+        ValueError: If the requested number of frames exceeds the available frames in the pipeline.
+    """
+    nframes = sampled_trj._num_frames(pipeline, nframes)
+    num_atoms = data.particles.count
+    num_pairs = min(num_pairs, num_atoms * (num_atoms - 1) // 2)
+    pair_i, pair_j = sampled_trj.sample_pairs(num_atoms, num_pairs, seed)
+
+    pilot_frames = min(pilot_frames, nframes)
+    num_windows = max(1, min(num_windows, pilot_frames // 2))
+    length = pilot_frames // num_windows
+    starts = np.linspace(0, nframes - length, num_windows).astype(np.int64)
+    autocovariance = np.zeros(length)
+    for start in starts:
+        series = np.zeros((length, num_pairs))
+        for step in range(length):
+            positions = pipeline.compute(int(start) + step).particles["Position"].array
+            series[step] = np.linalg.norm(positions[pair_i] - positions[pair_j], axis=1)
+        autocovariance += _autocovariance(series)
+    if autocovariance[0] <= 0:
+        return np.eye(1, length)[0]
+    return _debias(autocovariance / autocovariance[0])
+
+
+def estimate(
+    pipeline: Pipeline,
+    data: DataCollection,
+    tolerance: float = 0.05,
+    num_pairs: int = 1000,
+    pilot_frames: int = 1000,
+    seed: Optional[int] = 0,
+    nframes: Optional[int] = None,
+) -> Stride:
+    """
+    Chooses the frame stride of a trajectory from a pilot pass, see `pilot` and `choose`.
+
+    Args:
+        pipeline (Pipeline): The OVITO pipeline object.
+        data (DataCollection): The data collection object from OVITO.
+        tolerance (float): The accepted loss of statistical efficiency, e.g. 0.05.
+        num_pairs (int): The number of sampled pairs of the pilot pass.
+        pilot_frames (int): The number of frames read by the pilot pass.
+        seed (Optional[int]): Seed of the pair sample.
+        nframes (Optional[int]): The number of frames of the trajectory to consider. If None, all frames.
+
+    Returns:
+        Stride: The stride, the integrated autocorrelation time and the efficiency of the stride.
+    """
+    rho = pilot(pipeline, data, num_pairs, pilot_frames, seed=seed, nframes=nframes)
+    return choose(rho, tolerance)
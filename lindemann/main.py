@@ -1,5 +1,10 @@
+from typing import Optional
+
 import re
+import sys
 import time
+from contextlib import nullcontext
+from functools import partial
 from multiprocessing import Pool
 from pathlib import Path
 
@@ -8,18 +13,33 @@ import typer
 from psutil import cpu_count
 from rich.console import Console
 
-from lindemann import __version__
+from lindemann import __version__, cache, profiling, serve
 from lindemann.index import (
+    backends,
+    batch_trj,
+    blocks,
+    combined,
+    deterministic_trj,
     mem_use,
     online_atoms,
     online_frames,
+    online_single_trj,
     online_trj,
+    out_of_core,
+    parallel_single_trj,
     parallel_trj,
     per_atoms,
     per_frames,
+    per_groups,
     per_trj,
+    per_types,
+    planner,
+    quantized,
+    sampled_trj,
+    single_trj,
+    stride,
 )
-from lindemann.trajectory import plt_plot, read, save
+from lindemann.trajectory import events, follow, plt_plot, quantize, read, save
 
 app = typer.Typer(
     name="lindemann",
@@ -38,6 +58,61 @@ def version_callback(value: bool):
         raise typer.Exit()
 
 
+def cache_info_callback(value: bool):
+    """Prints the location, number and size of the cached results."""
+    if value:
+        console.print(f"[magenta]Cache:[/] [bold blue]{cache.info()}[/]")
+        raise typer.Exit()
+
+
+def cache_clear_callback(value: bool):
+    """Removes all cached results."""
+    if value:
+        console.print(f"[magenta]Removed cached results:[/] [bold blue]{cache.clear()}[/]")
+        raise typer.Exit()
+
+
+def tune_callback(value: bool):
+    """Tunes the chunk scheduling of the parallel mode for this machine."""
+    if value:
+        best = parallel_trj.tune()
+        console.print(f"[magenta]Tuned chunks per thread for -pt:[/] [bold blue]{best}[/]")
+        raise typer.Exit()
+
+
+def calibrate_callback(value: bool):
+    """Measures the start up and throughput of the compute backends for --engine auto."""
+    if value:
+        for name, measured in backends.calibrate().items():
+            console.print(
+                f"[magenta]{name}:[/] [bold blue]{measured['startup']:.3g} s start up, "
+                f"{measured['rate']:.3g} pair updates/s[/]"
+            )
+        raise typer.Exit()
+
+
+def plot_from_callback(value: Optional[Path]):
+    """Plots a saved per frame or per atom result."""
+    if value is not None:
+        plot_filename = plt_plot.from_file(str(value))
+        console.print(f"[magenta]Saved file as:[/] [bold blue]{plot_filename}[/]")
+        raise typer.Exit()
+
+
+def engine_callback(value: Optional[str]) -> Optional[str]:
+    """Checks the compute backend."""
+    if value is not None and value not in backends.ENGINES:
+        raise typer.BadParameter(f"choose one of {', '.join(backends.ENGINES)}")
+    return value
+
+
+def format_callback(value: str) -> str:
+    """Checks the output format of the results."""
+    if value not in save.FORMATS:
+        raise typer.BadParameter(f"choose one of {', '.join(save.FORMATS)}")
+    return value
+
+
 @app.command()
 def main(
     trjfile: list[Path] = typer.Argument(
@@ -59,6 +134,34 @@ def main(
         "-pt",
         help="Calculates the Lindemann-Index for the Trajectory file(s) in parallel.",
     ),
+    deterministic: bool = typer.Option(
+        False,
+        "--deterministic",
+        help="Calculates the Lindemann-Index for the Trajectory file(s) in parallel with the same result for \
+              any number of threads: fixed blocks of atom pairs, float64 moments and compensated, pairwise \
+              summation. Works with no flag, -t and -pt.",
+    ),
+    frame_stride: int = typer.Option(
+        1,
+        "--stride",
+        min=1,
+        help="Processes only every N-th frame. Works with no flag, -t, -ot, -pt, --deterministic, -f, -of, -a, \
+              -oa, -p and -l, and with several of them together.",
+    ),
+    auto_stride: Optional[float] = typer.Option(
+        None,
+        "--auto-stride",
+        help="Chooses the stride from the decorrelation time of the pair distances, estimated by a pilot pass \
+              over a sample of pairs and frames: the largest stride that loses at most this fraction of the \
+              statistical efficiency, between 0 and 1, e.g. 0.05. Works like --stride for a single trajectory \
+              and is rejected with several trajectories and with --stride.",
+    ),
+    batch: bool = typer.Option(
+        False,
+        "-b",
+        help="Calculates the Lindemann-Index for many (small) Trajectory files in one process with a \
+              single parallel kernel and writes the results to lindemann_index_batch.txt.",
+    ),
     frames: bool = typer.Option(
         False, "-f", help="Calculates the Lindemann-Index for each frame."
     ),
@@ -73,7 +176,141 @@ def main(
         "-oa",
         help="Calculates the Lindemann-Index for each atom for each frame. (reduced memory usage)",
     ),
-    plot: bool = typer.Option(False, "-p", help="Returns a plot Lindemann-Index vs. Frame."),
+    single: bool = typer.Option(
+        False,
+        "-st",
+        help="Calculates the single particle Lindemann-Index (rms displacement about the mean position \
+              divided by the nearest neighbour distance) for the Trajectory file.",
+    ),
+    on_single: bool = typer.Option(
+        False,
+        "-ost",
+        help="Calculates the single particle Lindemann-Index for the Trajectory file (reduced memory usage).",
+    ),
+    par_single: bool = typer.Option(
+        False,
+        "-pst",
+        help="Calculates the single particle Lindemann-Index for the Trajectory file in parallel.",
+    ),
+    species: bool = typer.Option(
+        False,
+        "-s",
+        help="Calculates the partial Lindemann-Index for each pair of particle types for the Trajectory.",
+    ),
+    species_frames: bool = typer.Option(
+        False,
+        "-sf",
+        help="Calculates the partial Lindemann-Index for each pair of particle types for each frame.",
+    ),
+    group_spec: Optional[str] = typer.Option(
+        None,
+        "--groups",
+        help="Calculates the mean Lindemann-Index of groups of atoms for each frame, without the per atom \
+              matrix: shells:N (radial shells around the centre), slabs:N:AXIS (slabs along x, y or z) or a \
+              file with one group id per atom. The groups are taken from the first frame (reduced memory usage).",
+    ),
+    sample: Optional[int] = typer.Option(
+        None,
+        "--sample",
+        min=2,
+        help="Estimates the Lindemann-Index for the Trajectory from a random sample of this many atom pairs, \
+              reports the standard error of the estimate (reduced memory usage).",
+    ),
+    seed: Optional[int] = typer.Option(
+        None, "--seed", help="Seed for the random pair sample, makes --sample reproducible."
+    ),
+    tolerance: Optional[float] = typer.Option(
+        None,
+        "--tolerance",
+        help="Stops the calculation of the Lindemann-Index for the Trajectory once its relative change \
+              between two checks is below this tolerance. Works with no flag, -t and -ot.",
+    ),
+    interval: int = typer.Option(
+        100,
+        "--interval",
+        min=1,
+        help="Number of frames between two convergence checks of --tolerance.",
+    ),
+    num_blocks: Optional[int] = typer.Option(
+        None,
+        "--blocks",
+        help="Reports the standard error of the Lindemann-Index for the Trajectory from block averaging: the \
+              moments of this many blocks of frames are kept during the single pass and merged pairwise for \
+              larger blocks (Flyvbjerg-Petersen). Costs the memory of -ot per block. Works with no flag, -t, \
+              -ot and -pt, and is rejected with -f, -of, -a, -oa, -p and -l.",
+    ),
+    max_memory: Optional[float] = typer.Option(
+        None,
+        "--max-memory",
+        help="Memory budget in GB. Chooses the fastest way to calculate the Lindemann-Index for the \
+              Trajectory that stays within the budget (parallel, in memory, online, out of core or sampled) \
+              and reports the predicted and measured peak memory. Use 0 for 90% of the available memory. \
+              With -f/-of or -a/-oa the pair moments are kept in blocks that fit the budget and the \
+              trajectory is swept once per block (out of core), for the index per frame and per atom too.",
+    ),
+    tail: bool = typer.Option(
+        False,
+        "--follow",
+        help="Follows a trajectory file that is still being written, prints the Lindemann-Index of each new \
+              frame and appends it to lindemann_index_follow.txt. Stops after --timeout seconds without \
+              new frames or when the --stop file exists.",
+    ),
+    timeout: float = typer.Option(
+        60.0, "--timeout", help="Seconds without new frames after which --follow stops."
+    ),
+    stop: Optional[Path] = typer.Option(
+        None, "--stop", help="Sentinel file, --follow stops as soon as it exists."
+    ),
+    fmt: str = typer.Option(
+        "txt",
+        "--format",
+        callback=format_callback,
+        help="Output format of the results of -f, -a, -of and -oa: txt, npy or h5 (chunked and \
+              compressed, needs h5py). With -oa the rows are written while the frames are processed.",
+    ),
+    quantize_positions: bool = typer.Option(
+        False,
+        "-q",
+        "--quantize",
+        help="Holds the positions in 16-bit fixed point instead of float32, which halves the memory of the \
+              trajectory, and reports the error bound of the positions and pair distances. \
+              Works with -t, -pt, -f, -a and -l.",
+    ),
+    engine: Optional[str] = typer.Option(
+        None,
+        "--engine",
+        callback=engine_callback,
+        help="Compute backend of -t, -f, -a, -l, the online modes -ot, -of, -oa and -p, --threshold and \
+              several outputs at once: auto, numba-serial, numba-parallel, numpy or blas. auto picks the fastest for the size of the trajectory from a calibration of this machine.",
+    ),
+    calibrate: bool = typer.Option(
+        None,
+        "--calibrate",
+        callback=calibrate_callback,
+        is_eager=True,
+        help="Measures the start up and throughput of the compute backends for --engine auto and caches them.",
+    ),
+    threshold: Optional[float] = typer.Option(
+        None,
+        "--threshold",
+        help="Calculates the Lindemann-Index for each atom for each frame, but only saves the atoms above this \
+              threshold and the frames at which atoms cross it to lindemann_events.npz (reduced memory \
+              usage). With -l only the atoms above the threshold are saved to lindemann_events.lammpstrj.",
+    ),
+    plot: bool = typer.Option(
+        False,
+        "-p",
+        help="Returns a plot Lindemann-Index vs. Frame. Combined with -a or -oa the index per atom is plotted \
+              as a heatmap of frames vs. index as well.",
+    ),
+    plot_from: Optional[Path] = typer.Option(
+        None,
+        "--plot-from",
+        callback=plot_from_callback,
+        is_eager=True,
+        help="Plots a saved result (.txt, .npy or .h5): the index per frame as Lindemann-Index vs. Frame, \
+              the index per atom as a heatmap. Long series are decimated, the plot stays fast for any length.",
+    ),
     lammpstrj: bool = typer.Option(
         False,
         "-l",
@@ -87,6 +324,41 @@ def main(
         is_eager=True,
         help="Prints the version of the lindemann package.",
     ),
+    use_cache: bool = typer.Option(
+        False,
+        "--cache",
+        help="Caches the results on disk, keyed by a fingerprint of the trajectory file and the options, \
+              so repeated calls return without recomputing. Works with no flag, -t, -ot, -pt, -f, -of, -a and -l.",
+    ),
+    cache_info: bool = typer.Option(
+        None,
+        "--cache-info",
+        callback=cache_info_callback,
+        is_eager=True,
+        help="Prints the location, number and size of the cached results.",
+    ),
+    cache_clear: bool = typer.Option(
+        None,
+        "--cache-clear",
+        callback=cache_clear_callback,
+        is_eager=True,
+        help="Removes all cached results.",
+    ),
+    profile: Optional[Path] = typer.Option(
+        None,
+        "--profile",
+        help="Shows a progress bar with frames/s, pair updates/s and the remaining time and writes the time, \
+              bytes and frames of each stage (open, read/parse, compute, reduction, write) to this JSON file. \
+              Works with no flag, -t, -ot, -pt, --deterministic, -f, -of, -a, -oa, -p and -l, several of them \
+              together, --blocks, --threshold, --groups and --max-memory with -f/-of or -a/-oa.",
+    ),
+    tune: bool = typer.Option(
+        None,
+        "--tune",
+        callback=tune_callback,
+        is_eager=True,
+        help="Measures the best number of chunks per thread of the -pt flag on this machine and caches it.",
+    ),
     timeit: bool = typer.Option(
         False, "-ti", "-timeit", help="Uses timeit module to show running time"
     ),
@@ -106,12 +378,66 @@ def main(
     n_cores = min(len(trjfile), cpu_count())
     single_process = len(trjfile) == 1
     trjfile_str = [str(trjf) for trjf in trjfile]
+    outputs = [trj or on_trj, frames or on_frames, atoms or on_atoms, plot, lammpstrj]
+    profiler = profiling.Profiler(progress=True) if profile is not None else None
+    frame_file = save.result_file("lindemann_index_per_frame", fmt)
+    atom_file = save.result_file("lindemann_index_per_atom", fmt)
+    quantized_funcs = {
+        per_trj.calculate: quantized.calculate,
+        parallel_trj.calculate_scheduled: quantized.calculate_scheduled,
+        per_frames.calculate: quantized.calculate_frames,
+        per_atoms.calculate: quantized.calculate_atoms,
+    }
+    engine_funcs = {
+        per_trj.calculate: backends.calculate,
+        per_frames.calculate: backends.calculate_frames,
+        per_atoms.calculate: backends.calculate_atoms,
+    }
+
+    def run_cached(trjfile, calc_func, compute):
+        if not use_cache:
+            return compute()
+        mode = f"{calc_func.__module__}.{calc_func.__qualname__}"
+        # the particle selection of read.open_pipeline and the precision of the position arrays
+        precision = "uint16" if quantize_positions else "float32"
+        return cache.cached(
+            trjfile,
+            mode,
+            compute,
+            types=[1, 2, 3],
+            precision=precision,
+            engine=engine,
+            stride=frame_stride,
+        )
+
+    def engine_name(nframes, natoms):
+        name = backends.select(nframes, natoms) if engine == "auto" else engine
+        console.print(f"[magenta]Engine:[/] [bold blue]{name}[/]")
+        return name
+
+    def online_engine(pipeline, data):
+        # the online modes update the moments with numba-serial unless --engine is given
+        if engine is None:
+            return "numba-serial"
+        nframes = len(range(0, pipeline.source.num_frames, frame_stride))
+        return engine_name(nframes, data.particles.count)
 
     def calculate_single_pipeline(pipeline_func, data_func, save_filename=None, save_func=None):
-        pipeline, data = pipeline_func(trjfile_str[0])
-        results = data_func(pipeline, data)
+        def compute():
+            with profiling.stage(profiler, "open"):
+                pipeline, data = pipeline_func(trjfile_str[0])
+            return data_func(
+                pipeline,
+                data,
+                profiler=profiler,
+                stride=frame_stride,
+                engine=online_engine(pipeline, data),
+            )
+
+        results = run_cached(trjfile_str[0], data_func, compute)
         if save_filename and save_func:
-            save_func(save_filename, results)
+            with profiling.stage(profiler, "write"):
+                save_func(save_filename, results)
             console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
         else:
             console.print(
@@ -119,14 +445,54 @@ def main(
             )
         typer.Exit()
 
-    def calculate_single(trjfile, calc_func, save_filename=None, save_func=None, cpu_count=None):
-        frames = read.frames(trjfile)
-        if cpu_count:
-            results = calc_func(frames, cpu_count)
-        else:
-            results = calc_func(frames)
+    def calculate_single(trjfile, calc_func, save_filename=None, save_func=None):
+        with_engine = engine is not None and not quantize_positions and calc_func in engine_funcs
+        if quantize_positions:
+            calc_func = quantized_funcs[calc_func]
+        elif with_engine:
+            calc_func = engine_funcs[calc_func]
+
+        # the error bound of the quantized positions, cached next to the result
+        bounds = []
+
+        def compute():
+            with profiling.stage(profiler, "read") as counters:
+                if quantize_positions:
+                    frames = quantize.frames(trjfile, stride=frame_stride)
+                    shape = frames.codes.shape
+                    bounds.append(quantize.error_bound(frames))
+                else:
+                    frames = read.frames(trjfile, stride=frame_stride)
+                    shape = frames.shape
+                counters.update(bytes=frames.nbytes, frames=shape[0])
+            calc_args = ()
+            if with_engine:
+                calc_args = (engine_name(shape[0], shape[1]),)
+            with profiling.stage(profiler, "compute", frames=shape[0]):
+                results = calc_func(frames, *calc_args)
+            if profiler is not None:
+                nframes, natoms, _ = shape
+                profiler.frame_done(nframes - 1, nframes, nframes * natoms * (natoms - 1) // 2)
+            return results
+
+        results = run_cached(trjfile, calc_func, compute)
+        if quantize_positions:
+            position_error, distance_error = run_cached(
+                trjfile,
+                quantize.error_bound,
+                lambda: (
+                    bounds[0]
+                    if bounds
+                    else quantize.error_bound(quantize.frames(trjfile, stride=frame_stride))
+                ),
+            )
+            console.print(
+                f"[magenta]Quantization error bound (position / pair distance):[/] "
+                f"[bold green]{position_error:.3g} / {distance_error:.3g}[/]"
+            )
         if save_filename and save_func:
-            save_func(save_filename, results)
+            with profiling.stage(profiler, "write"):
+                save_func(save_filename, results)
             console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
         else:
             console.print(
@@ -135,64 +501,446 @@ def main(
         typer.Exit()
 
     def calculate_parallel(trjfile_str, calc_func):
-        trj_frames = [read.frames(tf) for tf in trjfile_str]
+        trj_frames = [read.frames(tf, stride=frame_stride) for tf in trjfile_str]
         with Pool(n_cores) as p:
             console.print(f"Using {n_cores} cores")
             res = p.map(calc_func, trj_frames)
             console.print(res)
         typer.Exit()
 
-    if on_trj and single_process:
+    ignores_stride = {
+        "-b": batch,
+        "--follow": tail,
+        "--threshold": threshold is not None,
+        "--max-memory": max_memory is not None,
+        "--sample": sample is not None,
+        "--tolerance": tolerance is not None,
+        "--blocks": num_blocks is not None,
+        "-st/-ost/-pst": single or on_single or par_single,
+        "--groups": group_spec is not None,
+        "-s/-sf": species or species_frames,
+        "-ti": timeit,
+    }
+    ignored = [flag for flag, given in ignores_stride.items() if given]
+    if (frame_stride > 1 or auto_stride is not None) and ignored:
+        raise typer.BadParameter(
+            f"does not work with {', '.join(ignored)}",
+            param_hint="--stride" if auto_stride is None else "--auto-stride",
+        )
+
+    if auto_stride is not None and not 0 < auto_stride < 1:
+        raise typer.BadParameter(
+            "is the accepted loss of efficiency, between 0 and 1", param_hint="--auto-stride"
+        )
+    ignores_auto_stride = {
+        "several trajectories": not single_process,
+        "--stride": frame_stride > 1,
+    }
+    ignored = [flag for flag, given in ignores_auto_stride.items() if given]
+    if auto_stride is not None and ignored:
+        raise typer.BadParameter(
+            f"does not work with {', '.join(ignored)}", param_hint="--auto-stride"
+        )
+
+    ignores_profile = {
+        "several trajectories": not single_process,
+        "-b": batch,
+        "--follow": tail,
+        "--max-memory without -f/-of/-a/-oa": max_memory is not None and not any(outputs[1:3]),
+        "--sample": sample is not None,
+        "--tolerance": tolerance is not None,
+        "-st/-ost/-pst": single or on_single or par_single,
+        "-s/-sf": species or species_frames,
+        "-ti": timeit,
+        "-m": mem_useage,
+    }
+    ignored = [flag for flag, given in ignores_profile.items() if given]
+    if profile is not None and ignored:
+        raise typer.BadParameter(
+            f"does not work with {', '.join(ignored)}", param_hint="--profile"
+        )
+
+    ignores_quantize = {
+        "several trajectories": not single_process,
+        "several outputs": sum(outputs) > 1,
+        "-ot/-of/-oa": on_trj or on_frames or on_atoms,
+        "--deterministic": deterministic,
+        "-b": batch,
+        "--follow": tail,
+        "--threshold": threshold is not None,
+        "--max-memory": max_memory is not None,
+        "--sample": sample is not None,
+        "--tolerance": tolerance is not None,
+        "--blocks": num_blocks is not None,
+        "-st/-ost/-pst": single or on_single or par_single,
+        "--groups": group_spec is not None,
+        "-s/-sf": species or species_frames,
+        "-ti": timeit,
+        "-m": mem_useage,
+    }
+    ignored = [flag for flag, given in ignores_quantize.items() if given]
+    if quantize_positions and not (trj or par_trj or frames or atoms or lammpstrj):
+        raise typer.BadParameter("works with -t, -pt, -f, -a and -l", param_hint="-q")
+    if quantize_positions and ignored:
+        raise typer.BadParameter(f"does not work with {', '.join(ignored)}", param_hint="-q")
+
+    if tolerance is not None and any(outputs[1:]):
+        raise typer.BadParameter("works with no flag, -t and -ot", param_hint="--tolerance")
+    if num_blocks is not None and any(outputs[1:]):
+        raise typer.BadParameter("works with no flag, -t, -ot and -pt", param_hint="--blocks")
+
+    if auto_stride is not None and single_process:
+        pipeline, data = read.trajectory(trjfile_str[0])
+        chosen = stride.estimate(pipeline, data, auto_stride)
+        frame_stride = chosen.stride
+        console.print(
+            f"[magenta]Stride:[/] [bold blue]{frame_stride}[/] "
+            f"(decorrelation time {chosen.decorrelation_time:.3g} frames, "
+            f"efficiency {chosen.efficiency:.3f})"
+        )
+
+    if tail and single_process:
+        save_filename = "lindemann_index_follow.txt"
+        with open(save_filename, "w") as outfile:
+            outfile.write("# frame timestep lindemann_index\n")
+            tjr_frames = follow.iter_frames(
+                trjfile_str[0], timeout, sentinel=None if stop is None else str(stop)
+            )
+            running = online_frames.calculate_running(tjr_frames)
+            for frame, (timestep, linde) in enumerate(running):
+                outfile.write(f"{frame} {timestep} {linde}\n")
+                outfile.flush()
+                console.print(
+                    f"[magenta]lindemann index at frame {frame} (timestep {timestep}):[/] "
+                    f"[bold blue]{linde}[/]"
+                )
+        console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        typer.Exit()
+    elif tail and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif threshold is not None and single_process:
+        with profiling.stage(profiler, "open"):
+            pipeline, data = read.trajectory(trjfile_str[0])
+        found = events.Events(threshold, data.particles.count)
+        online_atoms.calculate(
+            pipeline, data, out=found, profiler=profiler, engine=online_engine(pipeline, data)
+        )
+        with profiling.stage(profiler, "write"):
+            save_filename = events.save("lindemann_events.npz", found)
+        console.print(
+            f"[magenta]Threshold crossings:[/] [bold blue]{len(found.crossings)}[/] \n"
+            f"[magenta]Atoms above the threshold in the last frame:[/] "
+            f"[bold blue]{len(found.above(found.num_frames - 1))}[/]"
+        )
+        console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        if lammpstrj:
+            with profiling.stage(profiler, "write"):
+                save_filename = events.to_lammps(trjfile_str[0], found)
+            console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        typer.Exit()
+    elif threshold is not None and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif max_memory is not None and any(outputs[1:3]) and single_process:
+        with profiling.stage(profiler, "open"):
+            pipeline, data = read.trajectory(trjfile_str[0])
+        budget = planner.memory_budget(int(max_memory * 1024**3) if max_memory > 0 else None)
+        per_frame = frames or on_frames
+        per_atom = atoms or on_atoms
+        num_pairs = out_of_core.block_pairs(
+            budget, pipeline.source.num_frames, data.particles.count, per_frame, per_atom
+        )
+        console.print(f"[magenta]Plan:[/] [bold blue]out_of_core ({num_pairs} pairs per block)[/]")
+        shape = (pipeline.source.num_frames, data.particles.count)
+        with save.rows(atom_file, shape) if per_atom else nullcontext() as out:
+            results = out_of_core.calculate(
+                pipeline,
+                data,
+                budget,
+                per_frame=per_frame,
+                per_atom=per_atom,
+                out=out,
+                profiler=profiler,
+            )
+        if trj or on_trj:
+            console.print(
+                f"[magenta]lindemann index for the Trajectory:[/] [bold blue]{results.trj}[/]"
+            )
+        if per_frame:
+            with profiling.stage(profiler, "write"):
+                save.to_file(frame_file, results.frames)
+            console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{frame_file}[/]")
+        if per_atom:
+            console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{atom_file}[/]")
+        typer.Exit()
+    elif max_memory is not None and any(outputs[1:3]) and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif sum(outputs) > 1 and single_process:
+        with profiling.stage(profiler, "open"):
+            pipeline, data = read.trajectory(trjfile_str[0])
+        results = combined.calculate_online(
+            pipeline,
+            data,
+            per_frame=frames or on_frames or plot,
+            per_atom=atoms or on_atoms or lammpstrj,
+            stride=frame_stride,
+            profiler=profiler,
+            engine=online_engine(pipeline, data),
+        )
+        if trj or on_trj:
+            console.print(
+                f"[magenta]lindemann index for the Trajectory:[/] [bold blue]{results.trj}[/]"
+            )
+        if frames or on_frames:
+            with profiling.stage(profiler, "write"):
+                save.to_file(frame_file, results.frames)
+            console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{frame_file}[/]")
+        if atoms or on_atoms:
+            with profiling.stage(profiler, "write"):
+                save.to_file(atom_file, results.atoms)
+            console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{atom_file}[/]")
+        if plot:
+            with profiling.stage(profiler, "write"):
+                plot_filename = plt_plot.lindemann_vs_frames(results.frames, stride=frame_stride)
+            console.print(f"[magenta]Saved file as:[/] [bold blue]{plot_filename}[/]")
+        if plot and (atoms or on_atoms):
+            with profiling.stage(profiler, "write"):
+                plot_filename = plt_plot.atoms_heatmap(results.atoms)
+            console.print(f"[magenta]Saved file as:[/] [bold blue]{plot_filename}[/]")
+        if lammpstrj:
+            with profiling.stage(profiler, "write"):
+                save.to_lammps(trjfile_str[0], results.atoms, stride=frame_stride)
+            console.print(
+                "[magenta]Lindemann index saved as:[/] [bold blue]lindemann_per_atom.lammpstrj[/]"
+            )
+        typer.Exit()
+    elif sample is not None and single_process:
+        pipeline, data = read.trajectory(trjfile_str[0])
+        try:
+            estimate, stderr = sampled_trj.calculate(pipeline, data, sample, seed)
+        except ValueError as error:
+            raise typer.BadParameter(str(error), param_hint="--sample") from None
+        console.print(
+            f"[magenta]lindemann index for the Trajectory:[/] [bold blue]{estimate}[/] \n"
+            f"[magenta]Standard error ({sample} pairs):[/] [bold green]{stderr}[/]"
+        )
+        typer.Exit()
+    elif sample is not None and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif batch:
+        save_filename = "lindemann_index_batch.txt"
+        with open(save_filename, "w") as outfile:
+            outfile.write("# trjfile lindemann_index\n")
+            for trjf, linde in batch_trj.calculate_files(trjfile_str):
+                outfile.write(f"{trjf} {linde}\n")
+                outfile.flush()
+        console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        typer.Exit()
+    elif tolerance is not None and single_process:
+        pipeline, data = read.trajectory(trjfile_str[0])
+        if trj:
+            num_frames = pipeline.source.num_frames
+            positions = (
+                np.asarray(pipeline.compute(frame).particles["Position"], dtype=np.float32)
+                for frame in range(num_frames)
+            )
+            linde, frames_used = per_trj.calculate_until_converged(
+                positions, tolerance, interval, num_frames
+            )
+        else:
+            linde, frames_used = online_trj.calculate_until_converged(
+                pipeline, data, tolerance, interval
+            )
+        console.print(
+            f"[magenta]lindemann index for the Trajectory:[/] [bold blue]{linde}[/] \n"
+            f"[magenta]Frames used:[/] [bold green]{frames_used}[/]"
+        )
+        typer.Exit()
+    elif tolerance is not None and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif num_blocks is not None and single_process:
+        if trj or par_trj:
+            with profiling.stage(profiler, "read") as counters:
+                tjr_frames = read.frames(trjfile_str[0])
+                counters.update(bytes=tjr_frames.nbytes, frames=len(tjr_frames))
+            with profiling.stage(profiler, "compute", frames=len(tjr_frames)):
+                linde, errors = blocks.calculate(tjr_frames, num_blocks)
+            if profiler is not None:
+                nframes, natoms, _ = tjr_frames.shape
+                profiler.frame_done(nframes - 1, nframes, nframes * natoms * (natoms - 1) // 2)
+        else:
+            with profiling.stage(profiler, "open"):
+                pipeline, data = read.trajectory(trjfile_str[0])
+            linde, errors = blocks.calculate_online(pipeline, data, num_blocks, profiler=profiler)
+        console.print(
+            f"[magenta]lindemann index for the Trajectory:[/] [bold blue]{linde}[/] \n"
+            f"[magenta]Standard error (block averaging):[/] [bold green]{blocks.plateau(errors)}[/]"
+        )
+        for error in errors:
+            console.print(
+                f"[magenta]Block size {round(error.block_size, 2)} frames ({error.num_blocks} blocks):[/] "
+                f"[bold green]{error.stderr}[/]"
+            )
+        typer.Exit()
+    elif num_blocks is not None and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif max_memory is not None and single_process:
+        probed = planner.probe(trjfile_str[0])
+        budget = int(max_memory * 1024**3) if max_memory > 0 else None
+        chosen = planner.plan(probed.nframes, probed.natoms, budget)
+        description = chosen.mode
+        if chosen.mode == "parallel":
+            description += f" ({chosen.workers} workers)"
+        elif chosen.mode == "sampled":
+            description += f" ({chosen.num_pairs} pairs)"
+        elif chosen.mode == "out_of_core":
+            description += f" ({chosen.num_pairs} pairs per block)"
+        console.print(f"[magenta]Plan:[/] [bold blue]{description}[/]")
+        linde = planner.run(trjfile_str[0], chosen)
+        console.print(
+            f"[magenta]lindemann index for the Trajectory:[/] [bold blue]{linde}[/] \n"
+            f"[magenta]Predicted memory:[/] [bold green]{round(chosen.predicted_bytes / 1024**3, 4)} GB[/] \n"
+            f"[magenta]Peak RSS:[/] [bold green]{round(planner.peak_rss() / 1024**3, 4)} GB[/]"
+        )
+        typer.Exit()
+    elif max_memory is not None and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif deterministic and not any(outputs[1:]) and single_process:
+        calculate_single(trjfile_str[0], deterministic_trj.calculate)
+    elif deterministic and not any(outputs[1:]) and not single_process:
+        calculate_parallel(trjfile_str, deterministic_trj.calculate)
+    elif on_trj and single_process:
         calculate_single_pipeline(read.trajectory, online_trj.calculate)
     elif trj and single_process:
         calculate_single(trjfile_str[0], per_trj.calculate)
     elif par_trj and single_process:
-        calculate_single(trjfile_str[0], parallel_trj.calculate, cpu_count=cpu_count())
+        calculate_single(trjfile_str[0], parallel_trj.calculate_scheduled)
     elif trj and not single_process:
         calculate_parallel(trjfile_str, per_trj.calculate)
     elif frames and single_process:
-        calculate_single(
-            trjfile_str[0], per_frames.calculate, "lindemann_index_per_frame.txt", np.savetxt
-        )
+        calculate_single(trjfile_str[0], per_frames.calculate, frame_file, save.to_file)
     elif frames and not single_process:
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
     elif on_frames and single_process:
         calculate_single_pipeline(
-            read.trajectory, online_frames.calculate, "lindemann_index_per_frame.txt", np.savetxt
+            read.trajectory, online_frames.calculate, frame_file, save.to_file
         )
     elif on_frames and not single_process:
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
     elif atoms and single_process:
-        calculate_single(
-            trjfile_str[0], per_atoms.calculate, "lindemann_index_per_atom.txt", np.savetxt
-        )
+        calculate_single(trjfile_str[0], per_atoms.calculate, atom_file, save.to_file)
     elif atoms and not single_process:
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
     elif on_atoms and single_process:
-        calculate_single_pipeline(
-            read.trajectory, online_atoms.calculate, "lindemann_index_per_atoms.txt", np.savetxt
-        )
+        with profiling.stage(profiler, "open"):
+            pipeline, data = read.trajectory(trjfile_str[0])
+        save_filename = save.result_file("lindemann_index_per_atoms", fmt)
+        num_rows = len(range(0, pipeline.source.num_frames, frame_stride))
+        with save.rows(save_filename, (num_rows, data.particles.count)) as out:
+            online_atoms.calculate(
+                pipeline,
+                data,
+                out=out,
+                profiler=profiler,
+                stride=frame_stride,
+                engine=online_engine(pipeline, data),
+            )
+        console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        typer.Exit()
     elif on_atoms and not single_process:
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
     elif plot and single_process:
-        tjr_frames = read.frames(trjfile_str[0])
-        indices = per_frames.calculate(tjr_frames)
-        plot_filename = plt_plot.lindemann_vs_frames(indices)
+        with profiling.stage(profiler, "open"):
+            pipeline, data = read.trajectory(trjfile_str[0])
+        indices = online_frames.calculate(
+            pipeline,
+            data,
+            profiler=profiler,
+            stride=frame_stride,
+            engine=online_engine(pipeline, data),
+        )
+        with profiling.stage(profiler, "write"):
+            plot_filename = plt_plot.lindemann_vs_frames(indices, stride=frame_stride)
         console.print(f"[magenta]Saved file as:[/] [bold blue]{plot_filename}[/]")
         typer.Exit()
     elif plot and not single_process:
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
     elif lammpstrj and single_process:
-        calculate_single(trjfile_str[0], per_atoms.calculate, trjfile_str[0], save.to_lammps)
+        calculate_single(
+            trjfile_str[0],
+            per_atoms.calculate,
+            trjfile_str[0],
+            partial(save.to_lammps, stride=frame_stride),
+        )
         typer.Exit()
     elif lammpstrj and not single_process:
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
+    elif (single or on_single or par_single) and single_process:
+        if on_single:
+            pipeline, data = read.trajectory(trjfile_str[0])
+            linde = online_single_trj.calculate(pipeline, data)
+        elif par_single:
+            linde = parallel_single_trj.calculate(read.frames(trjfile_str[0], unwrapped=True))
+        else:
+            linde = single_trj.calculate(read.frames(trjfile_str[0], unwrapped=True))
+        console.print(
+            f"[magenta]single particle lindemann index for the Trajectory:[/] [bold blue]{linde}[/]"
+        )
+        typer.Exit()
+    elif (single or on_single or par_single) and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif group_spec is not None and single_process:
+        with profiling.stage(profiler, "open"):
+            pipeline, data = read.trajectory(trjfile_str[0])
+        try:
+            group_codes, labels = per_groups.groups(group_spec, data.particles["Position"].array)
+        except (OSError, ValueError) as error:
+            raise typer.BadParameter(str(error), param_hint="--groups") from None
+        console.print(f"[magenta]Groups:[/] [bold blue]{labels}[/]")
+        save_filename = save.result_file("lindemann_index_per_group", fmt)
+        with save.rows(save_filename, (pipeline.source.num_frames, len(labels))) as out:
+            per_groups.calculate(
+                pipeline, data, group_codes, len(labels), out=out, profiler=profiler
+            )
+        console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        typer.Exit()
+    elif group_spec is not None and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
+    elif (species or species_frames) and single_process:
+        tjr_frames = read.frames(trjfile_str[0])
+        type_codes, labels = read.types(trjfile_str[0])
+        console.print(f"[magenta]Particle types:[/] [bold blue]{labels}[/]")
+        if species:
+            partial_indices = per_types.calculate(tjr_frames, type_codes, len(labels))
+            console.print(
+                f"[magenta]partial lindemann indices for the Trajectory:[/]\n"
+                f"[bold blue]{partial_indices}[/]"
+            )
+        else:
+            partial_per_frame = per_types.calculate_frames(tjr_frames, type_codes, len(labels))
+            upper = np.triu_indices(len(labels))
+            header = " ".join(f"{labels[a]}-{labels[b]}" for a, b in zip(*upper))
+            save_filename = "lindemann_index_per_frame_species.txt"
+            np.savetxt(save_filename, partial_per_frame[:, upper[0], upper[1]], header=header)
+            console.print(f"[magenta]Lindemann index saved as:[/] [bold blue]{save_filename}[/]")
+        typer.Exit()
+    elif (species or species_frames) and not single_process:
+        console.print("multiprocessing is implemented only for the -t flag")
+        typer.Exit()
     elif timeit and single_process:
         tjr_frames = read.frames(trjfile_str[0])
         start = time.time()
@@ -207,8 +955,7 @@ def main(
         console.print("multiprocessing is implemented only for the -t flag")
         typer.Exit()
     elif mem_useage and single_process:
-        tjr_frames = read.frames(trjfile_str[0])
-        nframes, natoms, _ = tjr_frames.shape
+        nframes, natoms = planner.probe(trjfile_str[0])
         mem_use_in_gb = mem_use.in_gb(nframes, natoms)
         console.print(f"[magenta]Memory use:[/] [bold blue]{mem_use_in_gb}[/]")
         typer.Exit()
@@ -221,6 +968,23 @@ def main(
         else:
             calculate_parallel(trjfile_str, per_trj.calculate)
 
+    if profiler is not None:
+        profile_filename = profiler.write(str(profile))
+        console.print(f"[magenta]Profile saved as:[/] [bold blue]{profile_filename}[/]")
+
+
+def cli():
+    """
+    Entry point of the lindemann command. `lindemann serve` starts the daemon and `lindemann submit ARGS`
+    sends a job to it, everything else runs in this process.
+    """
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command in ("serve", "submit") and not Path(command).exists():
+        sub_app = serve.serve_app if command == "serve" else serve.submit_app
+        sub_app(args=sys.argv[2:], prog_name=f"lindemann {command}")
+    else:
+        app(prog_name="lindemann")
+
 
 if __name__ == "__main__":
-    app()
+    cli()
@@ -0,0 +1,165 @@
+"""
+Stage level instrumentation of a run: time, bytes and frames of each stage (open, parse, compute,
+reduction, write), the throughput in frames and pair updates per second, a live progress display and
+callbacks for embedding.
+
+A callback is called as `callback(event, data)` with the event "stage" after each finished stage
+(data: name, seconds, bytes, frames) and "frame" after each processed frame (data: frame, total, and the
+current frames and pair updates per second).
+"""
+
+from typing import Any, Callable, Optional
+
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeRemainingColumn
+
+Callback = Callable[[str, dict[str, Any]], None]
+
+
+class Profiler:
+    """Collects the stage timings and the throughput of a run."""
+
+    def __init__(self, callbacks: Optional[list[Callback]] = None, progress: bool = False) -> None:
+        self.callbacks = callbacks or []
+        self.stages: dict[str, dict[str, float]] = {}
+        self.frames = 0
+        self.pair_updates = 0
+        self._start = time.perf_counter()
+        self._progress = (
+            Progress(
+                TextColumn("[magenta]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                TextColumn("[bold blue]{task.fields[rates]}"),
+                TimeRemainingColumn(),
+                transient=True,
+            )
+            if progress
+            else None
+        )
+        self._task: Optional[int] = None
+
+    def _notify(self, event: str, data: dict[str, Any]) -> None:
+        for callback in self.callbacks:
+            callback(event, data)
+
+    @contextmanager
+    def stage(self, name: str, nbytes: int = 0, frames: int = 0) -> Iterator[dict[str, int]]:
+        """
+        Times a stage. Bytes and frames can be given up front or added to the yielded dict.
+
+        Args:
+            name (str): The stage, e.g. "open", "parse", "compute", "reduction" or "write".
+            nbytes (int): The bytes the stage reads or writes.
+            frames (int): The frames the stage processes.
+
+        Yields:
+            dict[str, int]: The counters of this call, "bytes" and "frames" may be increased inside the stage.
+        """
+        counters = {"bytes": nbytes, "frames": frames}
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            seconds = time.perf_counter() - start
+            record = self.stages.setdefault(
+                name, {"seconds": 0.0, "bytes": 0, "frames": 0, "calls": 0}
+            )
+            record["seconds"] += seconds
+            record["bytes"] += counters["bytes"]
+            record["frames"] += counters["frames"]
+            record["calls"] += 1
+            self._notify("stage", {"name": name, "seconds": seconds, **counters})
+
+    def frame_done(self, frame: int, total: int, pairs: int) -> None:
+        """
+        Records the frames processed up to `frame` and updates the progress display.
+
+        Args:
+            frame (int): The index of the last processed frame.
+            total (int): The number of frames of the run.
+            pairs (int): The number of pair distances updated since the last call.
+        """
+        self.frames = frame + 1
+        self.pair_updates += pairs
+        rates = self.rates()
+        if self._progress is not None:
+            if self._task is None:
+                self._progress.start()
+                self._task = self._progress.add_task("frames", total=total, rates="")
+            self._progress.update(
+                self._task,
+                completed=frame + 1,
+                rates=f"{rates['frames_per_second']:.1f} frames/s "
+                f"{rates['pair_updates_per_second']:.3g} pair updates/s",
+            )
+            if frame + 1 == total:
+                self._progress.stop()
+        self._notify("frame", {"frame": frame, "total": total, **rates})
+
+    def rates(self) -> dict[str, float]:
+        """
+        Returns the throughput of the compute stage, or of the whole run before any compute stage finished.
+
+        Returns:
+            dict[str, float]: The frames per second and pair updates per second.
+        """
+        seconds = self.stages.get("compute", {}).get("seconds", 0.0)
+        seconds = seconds or (time.perf_counter() - self._start)
+        return {
+            "frames_per_second": self.frames / seconds if seconds else 0.0,
+            "pair_updates_per_second": self.pair_updates / seconds if seconds else 0.0,
+        }
+
+    def report(self) -> dict[str, Any]:
+        """
+        Summarizes the run.
+
+        Returns:
+            dict[str, Any]: The wall time, the stages, the processed frames and pair updates and the throughput.
+        """
+        if self._progress is not None:
+            self._progress.stop()
+        return {
+            "seconds": time.perf_counter() - self._start,
+            "stages": self.stages,
+            "frames": self.frames,
+            "pair_updates": self.pair_updates,
+            **self.rates(),
+        }
+
+    def write(self, filename: str) -> str:
+        """
+        Writes the report as JSON.
+
+        Args:
+            filename (str): The name of the report file.
+
+        Returns:
+            str: The name of the report file.
+        """
+        with open(filename, "w") as outfile:
+            json.dump(self.report(), outfile, indent=2)
+        return filename
+
+
+def stage(profiler: Optional[Profiler], name: str, nbytes: int = 0, frames: int = 0) -> Any:
+    """
+    Times a stage with the profiler, does nothing if there is no profiler.
+
+    Args:
+        profiler (Optional[Profiler]): The profiler of the run or None.
+        name (str): The stage.
+        nbytes (int): The bytes the stage reads or writes.
+        frames (int): The frames the stage processes.
+
+    Returns:
+        The context manager of the stage.
+    """
+    if profiler is None:
+        return nullcontext({"bytes": 0, "frames": 0})
+    return profiler.stage(name, nbytes, frames)
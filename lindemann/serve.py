@@ -0,0 +1,227 @@
+"""
+A daemon that keeps worker processes with imported modules, compiled kernels and opened trajectories warm
+and runs jobs sent by a thin client over a local Unix socket, so repeated short analyses do not pay the
+Python start up, the imports, the JIT compile and the frame index of the trajectory each time.
+
+A job is one line of JSON, `{"args": [...], "cwd": "..."}` with the same arguments as the `lindemann`
+command, the reply is one line of JSON with the exit code, the output and the timing of the job.
+"""
+
+from typing import Any, Optional
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import typer
+from psutil import cpu_count
+from rich.console import Console
+
+console = Console()
+# trajectories each worker keeps open between jobs
+OPEN_PIPELINES = 8
+
+
+def default_socket() -> str:
+    """
+    Returns the path of the socket, `$LINDEMANN_SOCKET` or a per user socket in the temp directory.
+
+    Returns:
+        str: The path of the Unix socket.
+    """
+    return os.environ.get(
+        "LINDEMANN_SOCKET", os.path.join(tempfile.gettempdir(), f"lindemann-{os.getuid()}.sock")
+    )
+
+
+def warm_up() -> None:
+    """
+    Imports the command, compiles the kernels of the common modes on a tiny trajectory and keeps the last
+    `OPEN_PIPELINES` trajectories of the jobs open, see `read.keep_open`.
+    """
+    import lindemann.main  # noqa: F401
+    from lindemann.index import backends, online_trj, per_atoms, per_frames, per_trj
+    from lindemann.trajectory import read
+
+    read.keep_open(OPEN_PIPELINES)
+
+    positions = np.random.default_rng(0).random((3, 4, 3), dtype=np.float32)
+    per_trj.calculate(positions)
+    per_frames.calculate(positions)
+    per_atoms.calculate(positions)
+    # the online modes update and reduce the moments from the float64 positions of OVITO
+    num_distances = 4 * 3 // 2
+    mean_distances = np.zeros(num_distances, dtype=np.float32)
+    m2_distances = np.zeros(num_distances, dtype=np.float32)
+    online_trj.calculate_frame(positions[0].astype(np.float64), mean_distances, m2_distances, 0, 4)
+    backends.reduce_frame(
+        mean_distances, m2_distances, 0, 4, True, np.zeros(4), np.zeros(4, dtype=np.int64)
+    )
+
+
+def run_job(args: list[str], cwd: str) -> dict[str, Any]:
+    """
+    Runs one job in a worker process, like `lindemann *args` started in `cwd`.
+
+    Args:
+        args (list[str]): The command line arguments.
+        cwd (str): The working directory of the client, relative paths and output files refer to it.
+
+    Returns:
+        dict[str, Any]: The exit code, the output and the run time of the job in seconds.
+    """
+    from lindemann.main import app
+
+    start = time.perf_counter()
+    output = io.StringIO()
+    exit_code = 0
+    os.chdir(cwd)
+    command = typer.main.get_command(app)
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            command.main(args=args, prog_name="lindemann")
+        except SystemExit as error:
+            exit_code = error.code if isinstance(error.code, int) else 0
+        except Exception as error:  # reported to the client, the worker keeps running
+            output.write(f"{type(error).__name__}: {error}\n")
+            exit_code = 1
+    return {
+        "exit_code": exit_code,
+        "stdout": output.getvalue(),
+        "run": time.perf_counter() - start,
+    }
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Accepts jobs on a Unix socket and runs them on a pool of warm worker processes. At most
+    `workers + queue_size` jobs are accepted at once, further jobs are rejected right away.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, workers: int, queue_size: int) -> None:
+        # fresh processes, OVITO and the numba thread pools are not safe to fork
+        self.pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"), initializer=warm_up
+        )
+        # starts and warms up all workers before the first job arrives
+        for started in [self.pool.submit(os.getpid) for _ in range(workers)]:
+            started.result()
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _Handler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.server_address)  # type: ignore[arg-type]
+
+    def submit(self, job: dict[str, Any]) -> dict[str, Any]:
+        """
+        Queues a job on the worker pool and waits for its result.
+
+        Args:
+            job (dict[str, Any]): The job with the command line arguments and working directory.
+
+        Returns:
+            dict[str, Any]: The result of `run_job` plus the time the job waited in the queue.
+        """
+        if not self.slots.acquire(blocking=False):
+            return {"exit_code": 1, "stdout": "lindemann serve: the job queue is full\n"}
+        try:
+            start = time.perf_counter()
+            result = self.pool.submit(run_job, job["args"], job["cwd"]).result()
+            result["queued"] = time.perf_counter() - start - result["run"]
+            return result
+        finally:
+            self.slots.release()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                result = self.server.submit(json.loads(line))  # type: ignore[attr-defined]
+            except (ValueError, KeyError, TypeError) as error:
+                result = {"exit_code": 1, "stdout": f"lindemann serve: bad job: {error}\n"}
+            self.wfile.write(json.dumps(result).encode() + b"\n")
+            self.wfile.flush()
+
+
+def submit(args: list[str], socket_path: Optional[str] = None) -> dict[str, Any]:
+    """
+    Sends a job to a running `lindemann serve` daemon and waits for the result.
+
+    Args:
+        args (list[str]): The command line arguments of the job.
+        socket_path (Optional[str]): The socket of the daemon, see `default_socket`.
+
+    Returns:
+        dict[str, Any]: The exit code, the output, and the run and queue time of the job in seconds.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path or default_socket())
+        client.sendall(json.dumps({"args": args, "cwd": os.getcwd()}).encode() + b"\n")
+        with client.makefile("rb") as reply:
+            return json.loads(reply.readline())  # type: ignore[no-any-return]
+
+
+serve_app = typer.Typer(add_completion=False)
+
+
+@serve_app.command()
+def serve(
+    socket_path: str = typer.Option(
+        None, "--socket", help="Path of the Unix socket. [default: $LINDEMANN_SOCKET or temp dir]"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", help="Number of worker processes. [default: number of cores]"
+    ),
+    queue_size: int = typer.Option(
+        64, "--queue", help="Number of jobs that may wait for a worker, further jobs are rejected."
+    ),
+):
+    """Starts the daemon that runs lindemann jobs sent with `lindemann submit`."""
+    socket_path = socket_path or default_socket()
+    with Server(socket_path, workers or cpu_count(), queue_size) as server:
+        console.print(f"[magenta]lindemann serve listening on:[/] [bold blue]{socket_path}[/]")
+        with contextlib.suppress(KeyboardInterrupt):
+            server.serve_forever()
+
+
+submit_app = typer.Typer(add_completion=False)
+
+
+@submit_app.command(context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
+def submit_command(
+    ctx: typer.Context,
+    socket_path: str = typer.Option(None, "--socket", help="Path of the Unix socket."),
+    timing: bool = typer.Option(
+        False, "--timing", help="Prints the run and queue time of the job."
+    ),
+):
+    """Runs `lindemann ARGS` on a running daemon, e.g. `lindemann submit traj.lammpstrj -t`."""
+    try:
+        result = submit(ctx.args, socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        console.print("no lindemann serve daemon is running, start it with `lindemann serve`")
+        raise typer.Exit(1) from None
+    print(result["stdout"], end="")
+    if timing and "run" in result:
+        console.print(
+            f"[magenta]Runtime:[/] [bold green]{result['run']}[/] "
+            f"[magenta]Queued:[/] [bold green]{result['queued']}[/]"
+        )
+    raise typer.Exit(result["exit_code"])
@@ -0,0 +1,92 @@
+"""
+Light weight stand-ins for the parts of the OVITO pipeline and DataCollection the index modules use
+(`pipeline.source.num_frames`, `pipeline.compute(frame)`, `data.particles`, `data.cell`), so trajectories
+that are not read by OVITO plug into every mode.
+"""
+
+from typing import Any, Optional, Protocol
+
+import numpy as np
+import numpy.typing as npt
+
+
+class Property(np.ndarray):  # type: ignore[type-arg]
+    """A particle property, a numpy array that also offers the `.array` attribute of OVITO properties."""
+
+    @property
+    def array(self) -> npt.NDArray[Any]:
+        return np.asarray(self)
+
+
+class Cell(np.ndarray):  # type: ignore[type-arg]
+    """The (3, 4) cell matrix, the cell vectors as columns and the origin as last column."""
+
+    pbc: tuple[bool, bool, bool]
+
+    def __new__(cls, matrix: npt.ArrayLike, pbc: tuple[bool, bool, bool] = (True, True, True)):
+        cell = np.asarray(matrix, dtype=np.float64).view(cls)
+        cell.pbc = pbc
+        return cell
+
+    def __array_finalize__(self, obj: Optional[npt.NDArray[Any]]) -> None:
+        self.pbc = getattr(obj, "pbc", (True, True, True))
+
+
+class Particles:
+    """The particle properties of a frame."""
+
+    def __init__(self, properties: dict[str, npt.NDArray[Any]]) -> None:
+        self._properties = properties
+
+    @property
+    def count(self) -> int:
+        return len(self._properties["Position"])
+
+    def __getitem__(self, name: str) -> Property:
+        return self._properties[name].view(Property)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._properties
+
+    def keys(self) -> list[str]:
+        return list(self._properties)
+
+
+class Frame:
+    """The data of one frame, mirrors the DataCollection attributes used by lindemann."""
+
+    def __init__(
+        self, properties: dict[str, npt.NDArray[Any]], cell: Cell, timestep: int = 0
+    ) -> None:
+        self.particles = Particles(properties)
+        self.cell = cell
+        self.timestep = timestep
+
+
+class Reader(Protocol):
+    """A trajectory reader that can be wrapped into a `FramePipeline`."""
+
+    @property
+    def num_frames(self) -> int: ...
+
+    def frame(self, index: int) -> Frame: ...
+
+
+class _Source:
+    def __init__(self, reader: Reader) -> None:
+        self._reader = reader
+
+    @property
+    def num_frames(self) -> int:
+        return self._reader.num_frames
+
+
+class FramePipeline:
+    """Wraps a `Reader`, so it can be used in place of an OVITO pipeline."""
+
+    def __init__(self, reader: Reader) -> None:
+        self.reader = reader
+        self.source = _Source(reader)
+
+    def compute(self, frame: int = 0) -> Frame:
+        return self.reader.frame(frame)
@@ -0,0 +1,400 @@
+"""
+Native readers for binary trajectory formats: LAMMPS binary dumps (.bin), DCD (.dcd) and GROMACS TRR (.trr).
+
+The readers index the frame offsets once and then decode positions in bulk with `np.frombuffer` on a
+memory map, straight into the float32 (frames, atoms, 3) layout of the kernels. They offer random frame
+access and plug into every mode through `adapter.FramePipeline`. XTC files are read by OVITO.
+"""
+
+from typing import Any, Optional
+
+import struct
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from lindemann.trajectory.adapter import Cell, Frame
+from lindemann.trajectory.stream import _properties
+
+
+class _BinaryReader(ABC):
+    """Common frame access of the binary readers, subclasses fill the frame index."""
+
+    num_atoms: int
+
+    def __init__(self, trjfile: str) -> None:
+        self.trjfile = trjfile
+        self._map = np.memmap(trjfile, dtype=np.uint8, mode="r")
+
+    @property
+    @abstractmethod
+    def num_frames(self) -> int:
+        """The number of frames of the frame index."""
+
+    @abstractmethod
+    def positions(self, index: int) -> npt.NDArray[np.float32]:
+        """The positions of a frame, shape (num_atoms, 3)."""
+
+    @abstractmethod
+    def cell(self, index: int) -> Cell:
+        """The cell of a frame."""
+
+    def properties(self, index: int) -> dict[str, npt.NDArray[Any]]:
+        identifiers = np.arange(1, self.num_atoms + 1, dtype=np.int64)
+        return {
+            "Particle Identifier": identifiers,
+            "Particle Type": np.ones(self.num_atoms, dtype=np.int32),
+            "Position": self.positions(index),
+        }
+
+    def frame(self, index: int) -> Frame:
+        if not 0 <= index < self.num_frames:
+            raise IndexError(
+                f"Requested frame {index}, but only {self.num_frames} frames are available."
+            )
+        return Frame(self.properties(index), self.cell(index), index)
+
+    def read_positions(
+        self, nframes: Optional[int] = None, out: Optional[npt.NDArray[np.float32]] = None
+    ) -> npt.NDArray[np.float32]:
+        """
+        Decodes the positions of the first `nframes` frames in bulk.
+
+        Args:
+            nframes (Optional[int]): The number of frames. If None, all frames are decoded.
+            out (Optional[npt.NDArray[np.float32]]): Array of shape (nframes, num_atoms, 3) to decode into.
+
+        Returns:
+            npt.NDArray[np.float32]: Array of shape (nframes, num_atoms, 3) with the positions.
+        """
+        nframes = self.num_frames if nframes is None else nframes
+        if out is None:
+            out = np.empty((nframes, self.num_atoms, 3), dtype=np.float32)
+        for index in range(nframes):
+            out[index] = self.positions(index)
+        return out
+
+
+class LammpsBinaryReader(_BinaryReader):
+    """
+    Reader for LAMMPS binary dumps (`dump atom/custom` with a .bin file name), with or without the
+    magic string header of newer LAMMPS versions. Old style dumps without column names are expected
+    to hold `id type x y z` (plus `ix iy iz`), pass `columns` otherwise.
+    """
+
+    def __init__(self, trjfile: str, columns: Optional[list[str]] = None) -> None:
+        super().__init__(trjfile)
+        self._frames: list[dict[str, Any]] = []
+        offset = 0
+        size = len(self._map)
+        while offset < size:
+            header, offset = self._header(offset)
+            chunks = []
+            for _ in range(header["nchunk"]):
+                (count,) = struct.unpack_from("<i", self._map, offset)
+                chunks.append((offset + 4, count))
+                offset += 4 + 8 * count
+            header["chunks"] = chunks
+            self._frames.append(header)
+        if not self._frames:
+            raise ValueError(f"{trjfile} holds no frames.")
+        first = self._frames[0]
+        self.num_atoms = first["natoms"]
+        self.columns = columns or first["columns"] or self._default_columns(first["size_one"])
+
+    @staticmethod
+    def _default_columns(size_one: int) -> list[str]:
+        if size_one == 5:
+            return ["id", "type", "x", "y", "z"]
+        if size_one == 8:
+            return ["id", "type", "x", "y", "z", "ix", "iy", "iz"]
+        raise ValueError(
+            f"The binary dump has {size_one} columns but no column names, pass the columns explicitly."
+        )
+
+    def _header(self, offset: int) -> tuple[dict[str, Any], int]:
+        """
+        Reads the header of the frame starting at `offset`.
+
+        Args:
+            offset (int): The byte offset of the frame.
+
+        Returns:
+            tuple[dict[str, Any], int]: The header values and the offset of the first chunk.
+
+        Raises:
+            ValueError: If the dump uses a layout that is not supported.
+        """
+        buffer = self._map
+        (ntimestep,) = struct.unpack_from("<q", buffer, offset)
+        offset += 8
+        revision = 0
+        if ntimestep < 0:
+            # magic string header: length, "DUMPATOM"/"DUMPCUSTOM", endian flag, revision
+            offset += -ntimestep
+            endian, revision = struct.unpack_from("<ii", buffer, offset)
+            if endian != 1:
+                raise ValueError("Only little endian LAMMPS binary dumps are supported.")
+            offset += 8
+            (ntimestep,) = struct.unpack_from("<q", buffer, offset)
+            offset += 8
+        natoms, triclinic = struct.unpack_from("<qi", buffer, offset)
+        offset += 12
+        boundary = struct.unpack_from("<6i", buffer, offset)
+        offset += 24
+        if triclinic > 1:
+            raise ValueError("General triclinic LAMMPS binary dumps are not supported.")
+        nbox = 9 if triclinic else 6
+        box = struct.unpack_from(f"<{nbox}d", buffer, offset)
+        offset += 8 * nbox
+        (size_one,) = struct.unpack_from("<i", buffer, offset)
+        offset += 4
+        columns: list[str] = []
+        if revision > 1:
+            (length,) = struct.unpack_from("<i", buffer, offset)
+            offset += 4 + length
+            (time_flag,) = struct.unpack_from("<b", buffer, offset)
+            offset += 1 + (8 if time_flag else 0)
+            (length,) = struct.unpack_from("<i", buffer, offset)
+            offset += 4
+            columns = bytes(buffer[offset : offset + length]).decode().split()
+            offset += length
+        (nchunk,) = struct.unpack_from("<i", buffer, offset)
+        offset += 4
+        header = {
+            "timestep": ntimestep,
+            "natoms": natoms,
+            "boundary": boundary,
+            "box": box,
+            "size_one": size_one,
+            "columns": columns,
+            "nchunk": nchunk,
+        }
+        return header, offset
+
+    @property
+    def num_frames(self) -> int:
+        return len(self._frames)
+
+    def values(self, index: int) -> npt.NDArray[np.float64]:
+        """
+        Decodes all columns of a frame.
+
+        Args:
+            index (int): The frame index.
+
+        Returns:
+            npt.NDArray[np.float64]: Array of shape (num_atoms, size_one) with the atom values.
+        """
+        header = self._frames[index]
+        values = np.concatenate(
+            [
+                np.frombuffer(self._map, dtype="<f8", count=count, offset=start)
+                for start, count in header["chunks"]
+            ]
+        )
+        return values.reshape(header["natoms"], header["size_one"])
+
+    def cell(self, index: int) -> Cell:
+        header = self._frames[index]
+        xlo, xhi, ylo, yhi, zlo, zhi = header["box"][:6]
+        xy, xz, yz = header["box"][6:] if len(header["box"]) == 9 else (0.0, 0.0, 0.0)
+        xlo -= min(0.0, xy, xz, xy + xz)
+        xhi -= max(0.0, xy, xz, xy + xz)
+        ylo -= min(0.0, yz)
+        yhi -= max(0.0, yz)
+        matrix = [[xhi - xlo, xy, xz, xlo], [0.0, yhi - ylo, yz, ylo], [0.0, 0.0, zhi - zlo, zlo]]
+        boundary = header["boundary"]
+        pbc = tuple(boundary[2 * dim] == 0 for dim in range(3))
+        return Cell(matrix, pbc)  # type: ignore[arg-type]
+
+    def properties(self, index: int) -> dict[str, npt.NDArray[Any]]:
+        return _properties(self.columns, self.values(index), self.cell(index))
+
+    def positions(self, index: int) -> npt.NDArray[np.float32]:
+        return np.asarray(self.properties(index)["Position"], dtype=np.float32)
+
+
+class DcdReader(_BinaryReader):
+    """
+    Reader for CHARMM/NAMD style DCD files as written by LAMMPS `dump dcd`. All frames have the same
+    size, so the file is mapped as one structured array and positions are decoded without any copy.
+    """
+
+    def __init__(self, trjfile: str) -> None:
+        super().__init__(trjfile)
+        (marker,) = struct.unpack_from("<i", self._map, 0)
+        self._endian = "<" if marker == 84 else ">"
+        if struct.unpack_from(f"{self._endian}i", self._map, 0)[0] != 84:
+            raise ValueError(f"{trjfile} is not a DCD file.")
+        if bytes(self._map[4:8]) != b"CORD":
+            raise ValueError(f"{trjfile} is not a DCD coordinate file.")
+        icntrl = struct.unpack_from(f"{self._endian}20i", self._map, 8)
+        if icntrl[8] != 0:
+            raise ValueError("DCD files with fixed atoms are not supported.")
+        has_cell = icntrl[19] != 0 and icntrl[10] != 0
+        offset = 4 + 84 + 4
+        (title_size,) = struct.unpack_from(f"{self._endian}i", self._map, offset)
+        offset += 4 + title_size + 4
+        (self.num_atoms,) = struct.unpack_from(f"{self._endian}i", self._map, offset + 4)
+        offset += 4 + 4 + 4
+
+        marker = f"{self._endian}i4"
+        real = f"{self._endian}f4"
+        fields: list[tuple[Any, ...]] = []
+        if has_cell:
+            fields += [("m0", marker), ("cell", f"{self._endian}f8", (6,)), ("m1", marker)]
+        for axis in ("x", "y", "z"):
+            fields += [
+                (f"m{axis}0", marker),
+                (axis, real, (self.num_atoms,)),
+                (f"m{axis}1", marker),
+            ]
+        frame_dtype = np.dtype(fields)
+        nframes = (len(self._map) - offset) // frame_dtype.itemsize
+        self._records = np.memmap(
+            trjfile, dtype=frame_dtype, mode="r", offset=offset, shape=(nframes,)
+        )
+        self._has_cell = has_cell
+
+    @property
+    def num_frames(self) -> int:
+        return len(self._records)
+
+    def positions(self, index: int) -> npt.NDArray[np.float32]:
+        record = self._records[index]
+        return np.stack([record["x"], record["y"], record["z"]], axis=-1).astype(np.float32)
+
+    def cell(self, index: int) -> Cell:
+        if not self._has_cell:
+            return Cell(np.zeros((3, 4)), (False, False, False))
+        # LAMMPS writes the box lengths at the positions of A, B and C: (A, gamma, B, beta, alpha, C)
+        unit_cell = self._records[index]["cell"]
+        matrix = np.zeros((3, 4))
+        matrix[0, 0], matrix[1, 1], matrix[2, 2] = unit_cell[0], unit_cell[2], unit_cell[5]
+        return Cell(matrix)
+
+    def read_positions(
+        self, nframes: Optional[int] = None, out: Optional[npt.NDArray[np.float32]] = None
+    ) -> npt.NDArray[np.float32]:
+        nframes = self.num_frames if nframes is None else nframes
+        if out is None:
+            out = np.empty((nframes, self.num_atoms, 3), dtype=np.float32)
+        for dim, axis in enumerate(("x", "y", "z")):
+            out[:, :, dim] = self._records[axis][:nframes]
+        return out
+
+
+class TrrReader(_BinaryReader):
+    """Reader for GROMACS TRR files (XDR, big endian), in single or double precision."""
+
+    def __init__(self, trjfile: str) -> None:
+        super().__init__(trjfile)
+        self._frames: list[dict[str, Any]] = []
+        offset = 0
+        while offset < len(self._map):
+            header, offset = self._header(offset)
+            self._frames.append(header)
+        if not self._frames:
+            raise ValueError(f"{trjfile} holds no frames.")
+        self.num_atoms = self._frames[0]["natoms"]
+
+    def _header(self, offset: int) -> tuple[dict[str, Any], int]:
+        """
+        Reads the header of the frame starting at `offset`.
+
+        Args:
+            offset (int): The byte offset of the frame.
+
+        Returns:
+            tuple[dict[str, Any], int]: The header values (with the offsets of box and positions) and the
+                                        offset of the next frame.
+
+        Raises:
+            ValueError: If the frame does not start with the TRR magic number.
+        """
+        buffer = self._map
+        magic, _, _ = struct.unpack_from(">iii", buffer, offset)
+        if magic != 1993:
+            raise ValueError(f"{self.trjfile} is not a TRR file.")
+        (version_length,) = struct.unpack_from(">i", buffer, offset + 8)
+        offset += 12 + (version_length + 3) // 4 * 4
+        sizes = struct.unpack_from(">13i", buffer, offset)
+        offset += 13 * 4
+        ir, e, box, vir, pres, top, sym, x, v, f, natoms, step, _ = sizes
+        if box:
+            real_size = box // 9
+        elif x:
+            real_size = x // (3 * natoms)
+        else:
+            real_size = 4
+        real = ">f8" if real_size == 8 else ">f4"
+        offset += 2 * real_size  # t and lambda
+        offset += ir + e
+        header = {"natoms": natoms, "step": step, "real": real, "box": None, "x": None}
+        if box:
+            header["box"] = offset
+        offset += box + vir + pres + top + sym
+        if x:
+            header["x"] = offset
+        offset += x + v + f
+        return header, offset
+
+    @property
+    def num_frames(self) -> int:
+        return len(self._frames)
+
+    def positions(self, index: int) -> npt.NDArray[np.float32]:
+        header = self._frames[index]
+        if header["x"] is None:
+            raise ValueError(f"Frame {index} of {self.trjfile} holds no positions.")
+        values = np.frombuffer(
+            self._map, dtype=header["real"], count=3 * self.num_atoms, offset=header["x"]
+        )
+        # GROMACS uses nm, positions are converted to Angstrom like in OVITO
+        return (values.reshape(self.num_atoms, 3) * 10.0).astype(np.float32)
+
+    def cell(self, index: int) -> Cell:
+        header = self._frames[index]
+        matrix = np.zeros((3, 4))
+        if header["box"] is None:
+            return Cell(matrix, (False, False, False))
+        box = np.frombuffer(self._map, dtype=header["real"], count=9, offset=header["box"])
+        matrix[:, :3] = box.reshape(3, 3).T * 10.0
+        return Cell(matrix)
+
+
+BINARY_READERS = {
+    ".bin": LammpsBinaryReader,
+    ".lammpsbin": LammpsBinaryReader,
+    ".dcd": DcdReader,
+    ".trr": TrrReader,
+}
+
+
+def is_binary(trjfile: str) -> bool:
+    """
+    Checks if the trajectory file is one of the binary formats with a native reader.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+
+    Returns:
+        bool: True if the file suffix belongs to a native binary reader.
+    """
+    return Path(trjfile).suffix.lower() in BINARY_READERS
+
+
+def open_reader(trjfile: str) -> _BinaryReader:
+    """
+    Opens the native reader for a binary trajectory file.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+
+    Returns:
+        _BinaryReader: The reader matching the file suffix.
+    """
+    return BINARY_READERS[Path(trjfile).suffix.lower()](trjfile)  # type: ignore[no-any-return]
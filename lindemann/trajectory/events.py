@@ -0,0 +1,199 @@
+"""
+Sparse output of the per atom Lindemann index: instead of the dense (frames, atoms) matrix only the atoms
+above a threshold (e.g. the Lindemann criterion 0.1) and the frames at which atoms cross the threshold are
+kept, so the output and the time to write it scale with the number of events.
+
+`Events` supports `out[frame] = row` like the outputs of `save.rows`, so it can be handed to
+`online_atoms.calculate` and the dense matrix is never held in memory.
+"""
+
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from lindemann.trajectory import read
+
+
+class Events:
+    """
+    The atoms above the threshold in each frame (compressed sparse rows) and the threshold crossings.
+
+    An atom crosses upwards in a frame if its index is above the threshold and was not in the previous
+    frame, all atoms start below it. NaN indices count as below.
+    """
+
+    def __init__(self, threshold: float, num_atoms: int) -> None:
+        self.threshold = threshold
+        self.num_atoms = num_atoms
+        self._indptr = [0]
+        self._indices: list[npt.NDArray[np.int32]] = []
+        self._crossings: list[npt.NDArray[np.int64]] = []
+        self._above = np.zeros(num_atoms, dtype=bool)
+
+    @property
+    def num_frames(self) -> int:
+        return len(self._indptr) - 1
+
+    def __setitem__(self, frame: int, row: npt.NDArray[Any]) -> None:
+        if frame != self.num_frames:
+            raise ValueError(f"Frame {frame} was given, but frame {self.num_frames} is next.")
+        above = np.asarray(row) > self.threshold
+        changed = np.flatnonzero(above != self._above)
+        if len(changed):
+            self._crossings.append(
+                np.column_stack(
+                    (np.full(len(changed), frame), changed, above[changed].astype(np.int64))
+                )
+            )
+        indices = np.flatnonzero(above).astype(np.int32)
+        self._indices.append(indices)
+        self._indptr.append(self._indptr[-1] + len(indices))
+        self._above = above
+
+    def record(self, indices_per_atom: npt.NDArray[Any]) -> "Events":
+        """
+        Adds the frames of a dense per atom result.
+
+        Args:
+            indices_per_atom (npt.NDArray[Any]): Array of shape (frames, atoms), e.g. from `per_atoms.calculate`.
+
+        Returns:
+            Events: The events, for chaining.
+        """
+        for row in indices_per_atom:
+            self[self.num_frames] = row
+        return self
+
+    def above(self, frame: int) -> npt.NDArray[np.int32]:
+        """
+        Returns the atoms above the threshold in a frame.
+
+        Args:
+            frame (int): The frame.
+
+        Returns:
+            npt.NDArray[np.int32]: The indices of the atoms, in the order of the particle identifiers.
+        """
+        return self._indices[frame]
+
+    @property
+    def indptr(self) -> npt.NDArray[np.int64]:
+        return np.asarray(self._indptr, dtype=np.int64)
+
+    @property
+    def indices(self) -> npt.NDArray[np.int32]:
+        return np.concatenate(self._indices) if self._indices else np.zeros(0, dtype=np.int32)
+
+    @property
+    def crossings(self) -> npt.NDArray[np.int64]:
+        """Array of shape (crossings, 3): the frame, the atom and 1 for upwards, 0 for downwards."""
+        if not self._crossings:
+            return np.zeros((0, 3), dtype=np.int64)
+        return np.concatenate(self._crossings)
+
+
+def save(filename: str, events: Events) -> str:
+    """
+    Saves the events as a compressed .npz file with the arrays `threshold`, `shape` (frames, atoms),
+    `indptr` and `indices` (the atoms above the threshold per frame in compressed sparse rows, like
+    scipy.sparse.csr_matrix) and `crossings` (frame, atom, upwards).
+
+    Args:
+        filename (str): The file name.
+        events (Events): The events.
+
+    Returns:
+        str: The name of the saved file.
+    """
+    np.savez_compressed(
+        filename,
+        threshold=events.threshold,
+        shape=np.array([events.num_frames, events.num_atoms]),
+        indptr=events.indptr,
+        indices=events.indices,
+        crossings=events.crossings,
+    )
+    return filename
+
+
+def load(filename: str) -> Events:
+    """
+    Loads events saved with `save`.
+
+    Args:
+        filename (str): The file name.
+
+    Returns:
+        Events: The events.
+    """
+    with np.load(filename) as saved:
+        num_frames, num_atoms = saved["shape"]
+        events = Events(float(saved["threshold"]), int(num_atoms))
+        indptr, indices = saved["indptr"], saved["indices"]
+        for frame in range(num_frames):
+            row = np.zeros(num_atoms, dtype=np.float32)
+            row[indices[indptr[frame] : indptr[frame + 1]]] = np.inf
+            events[frame] = row
+    return events
+
+
+def to_lammps(
+    trjfile: str,
+    events: Events,
+    filename: str = "lindemann_events.lammpstrj",
+    flagged_only: bool = True,
+) -> str:
+    """
+    Writes the atoms above the threshold to a LAMMPS dump that can be viewed in OVITO.
+
+    Args:
+        trjfile (str): Path to the trajectory file the events were calculated from.
+        events (Events): The events.
+        filename (str): The name of the dump.
+        flagged_only (bool): If True, each frame only holds the atoms above the threshold, otherwise all atoms
+                             with a 0/1 column `flagged`.
+
+    Returns:
+        str: The name of the dump.
+    """
+    pipeline = read.open_pipeline(trjfile)
+    with open(filename, "w") as outfile:
+        for frame in range(events.num_frames):
+            data = pipeline.compute(frame)
+            positions = np.asarray(data.particles["Position"])
+            count = len(positions)
+            identifiers = (
+                np.asarray(data.particles["Particle Identifier"])
+                if "Particle Identifier" in data.particles
+                else np.arange(1, count + 1)
+            )
+            types = (
+                np.asarray(data.particles["Particle Type"])
+                if "Particle Type" in data.particles
+                else np.ones(count, dtype=np.int64)
+            )
+            flagged = np.zeros(count, dtype=np.int64)
+            flagged[events.above(frame)] = 1
+            atoms = events.above(frame) if flagged_only else np.arange(count)
+            timestep = getattr(data, "timestep", None)
+            if timestep is None:
+                timestep = data.attributes.get("Timestep", frame)
+            cell = np.asarray(data.cell)
+            low = cell[:, 3]
+            high = low + np.diag(cell[:, :3])
+
+            outfile.write(f"ITEM: TIMESTEP\n{timestep}\nITEM: NUMBER OF ATOMS\n{len(atoms)}\n")
+            outfile.write("ITEM: BOX BOUNDS pp pp pp\n")
+            for axis in range(3):
+                outfile.write(f"{low[axis]} {high[axis]}\n")
+            columns = ["id", "type", "x", "y", "z"]
+            table = [identifiers[atoms], types[atoms], *positions[atoms].T]
+            fmt = ["%d", "%d", "%g", "%g", "%g"]
+            if not flagged_only:
+                columns.append("flagged")
+                table.append(flagged)
+                fmt.append("%d")
+            outfile.write(f"ITEM: ATOMS {' '.join(columns)}\n")
+            np.savetxt(outfile, np.column_stack(table), fmt=fmt)
+    return filename
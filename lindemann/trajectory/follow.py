@@ -0,0 +1,52 @@
+"""
+Tails a LAMMPS text dump that is still being written by a running simulation and yields the frames as soon
+as they are complete, so the index can be updated live without re-reading the growing file.
+"""
+
+from typing import Optional
+
+import os
+import time
+from collections.abc import Iterator
+
+from lindemann.trajectory.adapter import Frame
+from lindemann.trajectory.stream import BLOCK_SIZE, DumpParser
+
+
+def iter_frames(
+    trjfile: str,
+    timeout: float = 60.0,
+    poll: float = 0.5,
+    sentinel: Optional[str] = None,
+    block_size: int = BLOCK_SIZE,
+) -> Iterator[Frame]:
+    """
+    Yields the complete frames of a growing LAMMPS text dump, waiting for new frames at the end of the file.
+
+    Only the newly appended bytes are read and parsed. A frame that is only partly written stays in the
+    parser until its remaining atom lines arrive.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+        timeout (float): Stops following once no new data arrived for this many seconds.
+        poll (float): Seconds to wait before looking for new data at the end of the file.
+        sentinel (Optional[str]): Path to a file, following stops as soon as it exists.
+        block_size (int): The number of bytes read at once.
+
+    Yields:
+        Frame: The next complete frame of the dump.
+    """
+    parser = DumpParser()
+    last_data = time.monotonic()
+    with open(trjfile, "rb") as infile:
+        while True:
+            block = infile.read(block_size)
+            if block:
+                last_data = time.monotonic()
+                yield from parser.feed(block)
+                continue
+            if sentinel is not None and os.path.exists(sentinel):
+                break
+            if time.monotonic() - last_data >= timeout:
+                break
+            time.sleep(poll)
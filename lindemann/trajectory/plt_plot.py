@@ -1,18 +1,215 @@
-import matplotlib as mpl
-import matplotlib.pyplot as plt
+"""
+Plots of the Lindemann index per frame and per atom. Long series are decimated before they are drawn and
+per atom results are drawn as a binned heatmap, so plotting stays fast for any number of frames. The
+results can come from a calculation or from a saved result file (`save.to_file`, `save.rows`), matplotlib is
+only imported once a plot is drawn.
+"""
+
+from typing import Any
+
+import numba as nb
 import numpy as np
 import numpy.typing as npt
 
-mpl.use("Agg")
+from lindemann.trajectory import save
+
+# points drawn of a per frame curve, and frame and index bins of a per atom heatmap
+MAX_POINTS = 5000
+FRAME_BINS = 500
+INDEX_BINS = 200
+# frames of a per atom result read at once
+ROWS_PER_CHUNK = 1024
+
+
+def _pyplot() -> Any:
+    """Imports matplotlib with the non interactive Agg backend."""
+    import matplotlib as mpl
+
+    mpl.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+@nb.njit(fastmath=True, parallel=False)
+def lttb(y: npt.NDArray[np.float32], num_out: int) -> npt.NDArray[np.int64]:
+    """
+    Selects the points of a curve that preserve its shape with Largest-Triangle-Three-Buckets decimation:
+    the first and last point are kept, of every bucket in between the point that spans the largest
+    triangle with the previously kept point and the mean of the next bucket.
+
+    Args:
+        y (npt.NDArray[np.float32]): The values of the curve, one per frame.
+        num_out (int): The number of points to keep.
+
+    Returns:
+        npt.NDArray[np.int64]: The frames of the kept points, ascending.
+    """
+    num_points = y.shape[0]
+    if num_out >= num_points or num_out < 3:
+        return np.arange(num_points)
+
+    kept = np.zeros(num_out, dtype=np.int64)
+    every = (num_points - 2) / (num_out - 2)
+    previous = 0
+    for bucket in range(num_out - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, num_points)
+        mean_x = 0.0
+        mean_y = 0.0
+        count = 0
+        for point in range(next_start, next_end):
+            if not np.isnan(y[point]):
+                mean_x += point
+                mean_y += y[point]
+                count += 1
+        if count > 0:
+            mean_x /= count
+            mean_y /= count
+        else:
+            mean_x = next_start
+            mean_y = 0.0
+
+        largest = -1.0
+        chosen = start
+        y_previous = 0.0 if np.isnan(y[previous]) else y[previous]
+        for point in range(start, end):
+            if np.isnan(y[point]):
+                continue
+            area = abs(
+                (previous - mean_x) * (y[point] - y_previous)
+                - (previous - point) * (mean_y - y_previous)
+            )
+            if area > largest:
+                largest = area
+                chosen = point
+        kept[bucket + 1] = chosen
+        previous = chosen
+    kept[num_out - 1] = num_points - 1
+    return kept
+
+
+def lindemann_vs_frames(
+    indices: npt.NDArray[np.float32],
+    filename: str = "lindemann_per_frame.pdf",
+    max_points: int = MAX_POINTS,
+    stride: int = 1,
+) -> str:
+    """
+    Plots the Lindemann index per frame, decimated to at most `max_points` points with `lttb`.
+
+    Args:
+        indices (npt.NDArray[np.float32]): The Lindemann index of each frame.
+        filename (str): The name of the plot, the format follows from the suffix.
+        max_points (int): The number of points drawn at most.
+        stride (int): The frame stride the indices were calculated with, the x axis shows trajectory frames.
+
+    Returns:
+        str: The name of the plot.
+    """
+    plt = _pyplot()
+    indices = np.asarray(indices, dtype=np.float32)
+    frames = lttb(indices, max_points)
+    fig, ax = plt.subplots()
+    ax.set_title("Lindemann index per frame")
+    ax.set_xlabel("Frames")
+    ax.set_ylabel("Lindemann index")
+    ax.plot(frames * stride, indices[frames], "+" if len(frames) <= 1000 else "-")
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+    return filename
+
+
+@nb.njit(fastmath=False, parallel=False)
+def _bin_rows(
+    rows: npt.NDArray[np.float32],
+    first_frame: int,
+    frames_per_bin: float,
+    index_per_bin: float,
+    counts: npt.NDArray[np.float64],
+) -> None:
+    """Adds the finite indices of a chunk of frames to the heatmap, indices above the range to the top bin."""
+    index_bins = counts.shape[0]
+    for row in range(rows.shape[0]):
+        frame_bin = int((first_frame + row) / frames_per_bin)
+        for atom in range(rows.shape[1]):
+            linde = rows[row, atom]
+            if np.isfinite(linde) and linde >= 0:
+                counts[min(int(linde / index_per_bin), index_bins - 1), frame_bin] += 1
+
+
+def atoms_heatmap(
+    indices_per_atom: Any,
+    filename: str = "lindemann_per_atom.pdf",
+    frame_bins: int = FRAME_BINS,
+    index_bins: int = INDEX_BINS,
+) -> str:
+    """
+    Plots the distribution of the per atom Lindemann indices over the frames as a heatmap: the frames are
+    binned along x, the indices along y (up to 1.5 times the 99.5th percentile of the last frame, larger
+    indices fall into the top bin), the colour is the share of atoms in a bin. The rows are read in chunks,
+    so memory maps and HDF5 datasets are never loaded as a whole.
+
+    Args:
+        indices_per_atom (Any): Array of shape (frames, atoms), a memory map or an HDF5 dataset.
+        filename (str): The name of the plot, the format follows from the suffix.
+        frame_bins (int): The number of frame bins at most.
+        index_bins (int): The number of index bins.
+
+    Returns:
+        str: The name of the plot.
+    """
+    num_frames = indices_per_atom.shape[0]
+    frame_bins = max(1, min(frame_bins, num_frames))
+
+    # the index range of the last frame, the one the distribution settles on
+    last = np.asarray(indices_per_atom[num_frames - 1], dtype=np.float64)
+    last = last[np.isfinite(last)]
+    high = float(np.percentile(last, 99.5)) * 1.5 if len(last) else 1.0
+    index_edges = np.linspace(0.0, high if high > 0 else 1.0, index_bins + 1)
+
+    counts = np.zeros((index_bins, frame_bins))
+    for start in range(0, num_frames, ROWS_PER_CHUNK):
+        rows = np.asarray(indices_per_atom[start : start + ROWS_PER_CHUNK], dtype=np.float32)
+        _bin_rows(rows, start, num_frames / frame_bins, index_edges[-1] / index_bins, counts)
+    totals = counts.sum(axis=0)
+    share = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+
+    plt = _pyplot()
+    fig, ax = plt.subplots()
+    ax.set_title("Lindemann index per atom")
+    ax.set_xlabel("Frames")
+    ax.set_ylabel("Lindemann index")
+    # an image instead of a mesh, a vector mesh of every bin would make the plot slow to save and view
+    image = ax.imshow(
+        share,
+        origin="lower",
+        aspect="auto",
+        interpolation="nearest",
+        extent=(0, num_frames, 0, index_edges[-1]),
+        cmap="viridis",
+    )
+    fig.colorbar(image, ax=ax, label="Share of atoms")
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+    return filename
+
+
+def from_file(filename: str) -> str:
+    """
+    Plots a saved result: a per frame result as a curve, a per atom result as a heatmap.
 
+    Args:
+        filename (str): The result file (.txt, .npy or .h5), see `save.to_file` and `save.rows`.
 
-def lindemann_vs_frames(indices: npt.NDArray[np.float32]) -> str:
-    plt.figure(1)
-    plt.title("Lindemann index per frame")
-    plt.xlabel("Frames")
-    plt.ylabel("Lindemann index")
-    plt.plot(np.arange(0, len(indices)), indices, "+")
-    plt.tight_layout()
-    # plt.show()
-    plt.savefig("lindemann_per_frame.pdf")
-    return "lindemann_per_frame.pdf"
+    Returns:
+        str: The name of the plot.
+    """
+    with save.from_file(filename) as values:
+        if len(values.shape) == 1 or values.shape[1] == 1:
+            return lindemann_vs_frames(np.asarray(values).ravel())
+        return atoms_heatmap(values)
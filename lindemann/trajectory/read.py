@@ -1,20 +1,119 @@
-from typing import Optional
+from typing import Any, Optional
+
+from collections import OrderedDict
+from pathlib import Path
 
 import numba as nb
 import numpy as np
 import numpy.typing as npt
+from ovito.data import DataCollection
 from ovito.io import import_file
 from ovito.modifiers import SelectTypeModifier
 
 from lindemann.index import per_trj
+from lindemann.trajectory import adapter, binary, stream
+
+# pipelines kept open between calls by `keep_open`, keyed by path, size and modification time
+_open_pipelines: OrderedDict[tuple[str, int, int], Any] = OrderedDict()
+_max_open = 0
+
+
+def keep_open(max_open: int) -> None:
+    """
+    Keeps the last opened pipelines open, so their frame index is not built again when the same file is
+    opened again, e.g. by the jobs of a `lindemann serve` worker. A file that changed is opened again.
+
+    Parameters:
+        max_open (int): The number of pipelines kept open, 0 closes them and opens every file anew.
+    """
+    global _max_open
+    _max_open = max_open
+    while len(_open_pipelines) > _max_open:
+        _open_pipelines.popitem(last=False)
+
+
+def open_pipeline(trjfile: str):
+    """
+    Opens a trajectory file as a pipeline.
 
+    Compressed LAMMPS dumps (.gz, .bz2, .xz, .zst) are decompressed and parsed on the fly by
+    `stream.DumpReader`, LAMMPS binary dumps (.bin), DCD and TRR files are read by the native readers
+    of `binary`, every other file is imported with OVITO. All pipelines offer
+    `pipeline.source.num_frames` and `pipeline.compute(frame)`, so they work with every mode.
+    Pipelines kept open by `keep_open` are reused while the file does not change.
 
-def frames(trjfile: str, nframes: Optional[int] = None) -> npt.NDArray[np.float32]:
+    Parameters:
+        trjfile (str): Path to the trajectory file.
+
+    Returns:
+        Pipeline: The OVITO pipeline or a `adapter.FramePipeline` for compressed dumps and binary files.
+    """
+
+    if not _max_open:
+        return _open_pipeline(trjfile)
+    stat = Path(trjfile).stat()
+    key = (str(Path(trjfile).resolve()), stat.st_size, stat.st_mtime_ns)
+    if key not in _open_pipelines:
+        _open_pipelines[key] = _open_pipeline(trjfile)
+        keep_open(_max_open)
+    _open_pipelines.move_to_end(key)
+    return _open_pipelines[key]
+
+
+def _open_pipeline(trjfile: str):
+    """Opens a trajectory file as a pipeline, see `open_pipeline`."""
+
+    if stream.is_compressed(trjfile):
+        return adapter.FramePipeline(stream.DumpReader(trjfile))
+    if binary.is_binary(trjfile):
+        return adapter.FramePipeline(binary.open_reader(trjfile))
+    pipeline = import_file(trjfile, sort_particles=True)
+    pipeline.modifiers.append(
+        SelectTypeModifier(operate_on="particles", property="Particle Type", types={1, 2, 3})
+    )
+    return pipeline
+
+
+def unwrap(
+    data: DataCollection, previous: Optional[npt.NDArray[np.float32]] = None
+) -> npt.NDArray[np.float32]:
+    """
+    Returns the particle positions of a frame as unwrapped coordinates.
+
+    If the dump contains image flags (ix iy iz), the positions are shifted by the image flags times
+    the cell vectors. Without image flags, jumps of a particle across a periodic boundary between the
+    `previous` (already unwrapped) frame and this frame are removed with the minimum image convention.
+    Coordinates that were written unwrapped (xu yu zu) pass through unchanged.
+
+    Parameters:
+        data (DataCollection): The data collection of the frame.
+        previous (Optional[npt.NDArray[np.float32]]): The unwrapped positions of the previous frame.
+
+    Returns:
+        npt.NDArray[np.float32]: Array of shape (num_particles, 3) with the unwrapped positions.
+    """
+
+    positions = np.array(data.particles["Position"], dtype=np.float32)
+    cell = np.asarray(data.cell[:3, :3], dtype=np.float64)
+    if "Periodic Image" in data.particles:
+        images = np.asarray(data.particles["Periodic Image"], dtype=np.float64)
+        positions += (images @ cell.T).astype(np.float32)
+    elif previous is not None and any(data.cell.pbc):
+        reduced = (positions - previous) @ np.linalg.inv(cell).T
+        jumps = np.round(reduced) * np.asarray(data.cell.pbc)
+        positions -= (jumps @ cell.T).astype(np.float32)
+    return positions
+
+
+def frames(
+    trjfile: str, nframes: Optional[int] = None, unwrapped: bool = False, stride: int = 1
+) -> npt.NDArray[np.float32]:
     """
     Extracts the frame position data from a MD trajectory file using the OVITO pipeline.
 
     The function loads the specified trajectory file, applies a selection modifier to filter
     particles of type 1, 2, and 3, and computes the positions for a specified number of frames.
+    Compressed LAMMPS dumps are read as a stream, binary files are decoded in bulk, see `open_pipeline`.
     If `nframes` is None, the function will attempt to process all frames in the trajectory.
 
     Parameters:
@@ -22,10 +121,12 @@ def frames(trjfile: str, nframes: Optional[int] = None) -> npt.NDArray[np.float3
         nframes (Optional[int]): The number of frames to process. If not specified, all frames
                                  in the trajectory file are processed. If the specified number
                                  exceeds the available frames in the file, a ValueError is raised.
+        unwrapped (bool): If True, the positions are unwrapped across periodic boundaries, see `unwrap`.
+        stride (int): Only every stride-th of the first `nframes` frames is read, see `index.stride`.
 
     Returns:
-        npt.NDArray[np.float32]: A 3D NumPy array of shape (nframes, num_particles, 3) containing
-                                 the position data for each particle across the specified frames.
+        npt.NDArray[np.float32]: A 3D NumPy array of shape (ceil(nframes / stride), num_particles, 3)
+                                 containing the position data for each particle across the specified frames.
 
     Raises:
         ValueError: If `nframes` is more than the number of available frames in the trajectory file.
@@ -35,11 +136,8 @@ def frames(trjfile: str, nframes: Optional[int] = None) -> npt.NDArray[np.float3
         This would load 100 frames from the specified file and return the position data.
     """
 
-    pipeline = import_file(trjfile, sort_particles=True)
+    pipeline = open_pipeline(trjfile)
     num_frame = pipeline.source.num_frames
-    pipeline.modifiers.append(
-        SelectTypeModifier(operate_on="particles", property="Particle Type", types={1, 2, 3})
-    )
     data = pipeline.compute()
     num_particle = data.particles.count
 
@@ -48,21 +146,50 @@ def frames(trjfile: str, nframes: Optional[int] = None) -> npt.NDArray[np.float3
     elif nframes > num_frame:
         raise ValueError(f"Requested {nframes} frames, but only {num_frame} frames are available.")
 
-    position = np.zeros((nframes, num_particle, 3), dtype=np.float32)
+    selected = range(0, nframes, stride)
+    position = np.zeros((len(selected), num_particle, 3), dtype=np.float32)
+    if isinstance(pipeline, adapter.FramePipeline) and not unwrapped and stride == 1:
+        read_positions = getattr(pipeline.reader, "read_positions", None)
+        if read_positions is not None:
+            return read_positions(nframes, out=position)
 
-    for frame in range(nframes):
+    for step, frame in enumerate(selected):
         data = pipeline.compute(frame)
-        position[frame, :, :] = np.array(data.particles["Position"])
+        if unwrapped:
+            position[step, :, :] = unwrap(data, position[step - 1] if step else None)
+        else:
+            position[step, :, :] = np.array(data.particles["Position"])
     frames = position
 
     return frames
 
 
-def trajectory(trjfile: str, nframes: Optional[int] = None):
+def types(trjfile: str) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]:
+    """
+    Extracts the particle types of a MD trajectory file as contiguous type codes.
 
-    pipeline = import_file(trjfile, sort_particles=True)
-    pipeline.modifiers.append(
-        SelectTypeModifier(operate_on="particles", property="Particle Type", types={1, 2, 3})
+    The particle types are taken from the first frame, the particles are sorted by their identifier
+    like in `frames` and `trajectory`, so the codes line up with the position arrays.
+
+    Parameters:
+        trjfile (str): Path to the trajectory file to be processed.
+
+    Returns:
+        tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]: The type code (0 .. number of types - 1)
+                                                             of each particle and the particle type
+                                                             belonging to each code.
+    """
+
+    pipeline = open_pipeline(trjfile)
+    data = pipeline.compute(0)
+    labels, type_codes = np.unique(
+        np.asarray(data.particles["Particle Type"]), return_inverse=True
     )
+    return type_codes.astype(np.int32), labels.astype(np.int32)
+
+
+def trajectory(trjfile: str, nframes: Optional[int] = None):
+
+    pipeline = open_pipeline(trjfile)
     data = pipeline.compute()
     return pipeline, data
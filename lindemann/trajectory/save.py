@@ -1,4 +1,8 @@
+from typing import IO, Any, Union
+
 import os
+from collections.abc import Iterator
+from contextlib import contextmanager
 
 import numpy as np
 import numpy.typing as npt
@@ -10,11 +14,12 @@ I had big problems to get the ovito export_file module to do what I want, to put
 """
 
 
-def to_lammps(trjfile: str, indices_per_atom: npt.NDArray[np.float64]) -> str:
+def to_lammps(trjfile: str, indices_per_atom: npt.NDArray[np.float64], stride: int = 1) -> str:
     pipeline = import_file(trjfile, sort_particles=True)
 
+    # row `frame` of the result belongs to trajectory frame `frame * stride`
     for frame, linde in enumerate(indices_per_atom):
-        data = pipeline.compute(frame)
+        data = pipeline.compute(frame * stride)
         data.particles_.create_property("lindemann", data=linde)
         export_file(
             data,
@@ -46,3 +51,143 @@ def to_lammps(trjfile: str, indices_per_atom: npt.NDArray[np.float64]) -> str:
     for frame in range(len(indices_per_atom)):
         os.remove(f"lindemann_outputfile_X{frame}.dump")
     return "saved trajectory as lindemann_per_atom.lammpstrj"
+
+
+# output formats of the result arrays, npy and h5 are binary, h5 is chunked and compressed
+FORMATS = ("txt", "npy", "h5")
+
+
+def _h5py() -> Any:
+    """
+    Imports the optional h5py package.
+
+    Returns:
+        module: The h5py module.
+
+    Raises:
+        ImportError: If the h5py package is not installed.
+    """
+    try:
+        import h5py
+    except ImportError as error:
+        raise ImportError("Writing .h5 results needs the h5py package.") from error
+    return h5py
+
+
+def result_file(name: str, fmt: str = "txt") -> str:
+    """
+    Returns the file name of a result in the requested format.
+
+    Args:
+        name (str): The file name without suffix, e.g. "lindemann_index_per_frame".
+        fmt (str): One of `FORMATS`.
+
+    Returns:
+        str: The file name with the suffix of the format.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}, choose one of {', '.join(FORMATS)}.")
+    return f"{name}.{fmt}"
+
+
+def _format(filename: str) -> str:
+    """Returns the format of a result file from its suffix, text for unknown suffixes."""
+    suffix = os.path.splitext(filename)[1].lstrip(".")
+    return suffix if suffix in FORMATS else "txt"
+
+
+def to_file(filename: str, values: npt.NDArray[Any]) -> str:
+    """
+    Saves a result array in the format given by the file suffix, as text with np.savetxt, binary as
+    .npy or chunked and gzip compressed as .h5.
+
+    Args:
+        filename (str): The file name, see `result_file`.
+        values (npt.NDArray[Any]): The result array.
+
+    Returns:
+        str: The name of the saved file.
+    """
+    fmt = _format(filename)
+    if fmt == "npy":
+        np.save(filename, values)
+    elif fmt == "h5":
+        with _h5py().File(filename, "w") as h5file:
+            h5file.create_dataset("lindemann", data=values, chunks=True, compression="gzip")
+    else:
+        np.savetxt(filename, values)
+    return filename
+
+
+class _TextRows:
+    """Writes rows to a text file in the layout of np.savetxt, rows have to come in order."""
+
+    def __init__(self, outfile: IO[str]) -> None:
+        self._outfile = outfile
+
+    def __setitem__(self, frame: int, row: npt.NDArray[Any]) -> None:
+        np.savetxt(self._outfile, np.atleast_2d(row))
+
+
+@contextmanager
+def rows(filename: str, shape: tuple[int, int]) -> Iterator[Union[npt.NDArray[np.float32], Any]]:
+    """
+    Opens a result file that is filled row by row, e.g. one row of per atom values per frame, so the
+    whole result never has to be held in memory.
+
+    The format is given by the file suffix. The .npy file is a memory map, the .h5 dataset is chunked per
+    row and gzip compressed and the text file is written line by line. All of them support
+    `out[frame] = row`.
+
+    Args:
+        filename (str): The file name, see `result_file`.
+        shape (tuple[int, int]): The shape of the result, (frames, values per frame).
+
+    Yields:
+        The writable output, `out[frame] = row` stores a row.
+    """
+    fmt = _format(filename)
+    if fmt == "npy":
+        out = np.lib.format.open_memmap(filename, mode="w+", dtype=np.float32, shape=shape)
+        try:
+            yield out
+        finally:
+            out.flush()
+            del out
+    elif fmt == "h5":
+        with _h5py().File(filename, "w") as h5file:
+            yield h5file.create_dataset(
+                "lindemann",
+                shape=shape,
+                dtype=np.float32,
+                chunks=(1, max(shape[1], 1)),
+                compression="gzip",
+            )
+    else:
+        with open(filename, "w") as outfile:
+            yield _TextRows(outfile)
+
+
+@contextmanager
+def from_file(filename: str) -> Iterator[Union[npt.NDArray[np.float32], Any]]:
+    """
+    Opens a result file saved with `to_file` or `rows` for reading. The .npy file is opened as a memory
+    map and the .h5 dataset is read on access, so large results are only read in the parts that are used.
+
+    Args:
+        filename (str): The file name, the format is given by the suffix.
+
+    Yields:
+        The result, an array or an HDF5 dataset.
+    """
+    fmt = _format(filename)
+    if fmt == "npy":
+        yield np.load(filename, mmap_mode="r")
+    elif fmt == "h5":
+        with _h5py().File(filename, "r") as h5file:
+            yield h5file["lindemann"]
+    else:
+        yield np.loadtxt(filename, dtype=np.float32, ndmin=1)
@@ -0,0 +1,571 @@
+"""
+Streaming reader for LAMMPS text dumps, including compressed dumps (.gz, .bz2, .xz, .zst) that are
+decompressed on the fly instead of to scratch disk. Decompression runs in a background thread (or in a
+parallel external tool such as pigz, lbzip2 or multi threaded xz, if one is installed) that feeds the parser.
+"""
+
+from typing import IO, Any, Callable, NamedTuple, Optional
+
+import bz2
+import gzip
+import lzma
+import queue
+import shutil
+import subprocess  # nosec B404
+import threading
+import warnings
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from lindemann.trajectory.adapter import Cell, Frame
+
+BLOCK_SIZE = 1 << 22
+TIMESTEP_ITEM = b"ITEM: TIMESTEP"
+
+
+def _zstd_open(trjfile: str) -> IO[bytes]:
+    """
+    Opens a zstd compressed file with the optional zstandard package.
+
+    Args:
+        trjfile (str): Path to the compressed file.
+
+    Returns:
+        IO[bytes]: The decompressed stream.
+
+    Raises:
+        ImportError: If the zstandard package is not installed.
+    """
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImportError(
+            "Reading .zst trajectories needs the zstd command line tool or the zstandard package."
+        ) from error
+    return zstandard.ZstdDecompressor().stream_reader(open(trjfile, "rb"))  # type: ignore[no-any-return]
+
+
+# parallel command line tools first, the python modules are the fallback
+DECOMPRESSORS: dict[str, tuple[list[str], Callable[[str], IO[bytes]]]] = {
+    ".gz": (["pigz", "-dc"], lambda trjfile: gzip.open(trjfile, "rb")),
+    ".bz2": (["lbzip2", "-dc"], lambda trjfile: bz2.open(trjfile, "rb")),
+    ".xz": (["xz", "-dc", "-T0"], lambda trjfile: lzma.open(trjfile, "rb")),
+    ".lzma": (["xz", "-dc", "-T0"], lambda trjfile: lzma.open(trjfile, "rb")),
+    ".zst": (["zstd", "-dc"], _zstd_open),
+}
+
+
+def is_compressed(trjfile: str) -> bool:
+    """
+    Checks if the trajectory file is compressed with one of the supported formats.
+
+    Args:
+        trjfile (str): Path to the trajectory file.
+
+    Returns:
+        bool: True if the file suffix is one of the supported compression formats.
+    """
+    return Path(trjfile).suffix.lower() in DECOMPRESSORS
+
+
+def _open(trjfile: str) -> tuple[IO[bytes], Optional[subprocess.Popen[bytes]]]:
+    """
+    Opens the trajectory file as a decompressed byte stream.
+
+    Args:
+        trjfile (str): Path to the (compressed) trajectory file.
+
+    Returns:
+        tuple[IO[bytes], Optional[subprocess.Popen[bytes]]]: The stream and the decompression process, if an
+                                                             external tool is used.
+    """
+    suffix = Path(trjfile).suffix.lower()
+    if suffix not in DECOMPRESSORS:
+        return open(trjfile, "rb"), None
+    command, python_open = DECOMPRESSORS[suffix]
+    if shutil.which(command[0]):
+        process = subprocess.Popen(  # nosec B603
+            [*command, trjfile], stdout=subprocess.PIPE, bufsize=BLOCK_SIZE
+        )
+        return process.stdout, process  # type: ignore[return-value]
+    return python_open(trjfile), None
+
+
+def iter_blocks(trjfile: str, block_size: int = BLOCK_SIZE, prefetch: int = 8) -> Iterator[bytes]:
+    """
+    Yields the decompressed content of the trajectory file in blocks.
+
+    A background thread reads (and decompresses) up to `prefetch` blocks ahead, so decompression and
+    parsing overlap.
+
+    Args:
+        trjfile (str): Path to the (compressed) trajectory file.
+        block_size (int): The size of the blocks in bytes.
+        prefetch (int): The number of blocks the background thread reads ahead.
+
+    Yields:
+        bytes: The next block of the decompressed file.
+
+    Raises:
+        RuntimeError: If the external decompression tool fails.
+    """
+    blocks: queue.Queue[Any] = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    stream, process = _open(trjfile)
+
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce() -> None:
+        try:
+            while not stop.is_set():
+                block = stream.read(block_size)
+                if not block:
+                    break
+                put(block)
+        except Exception as error:  # handed over to the consumer
+            put(error)
+        finally:
+            put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            block = blocks.get()
+            if block is None:
+                break
+            if isinstance(block, Exception):
+                raise block
+            yield block
+        if process is not None and process.wait() != 0:
+            raise RuntimeError(
+                f"Decompressing {trjfile} failed with exit code {process.returncode}."
+            )
+    finally:
+        stop.set()
+        producer.join()
+        stream.close()
+        if process is not None and process.poll() is None:
+            process.terminate()
+            process.wait()
+
+
+# the frame counts of the dumps read in this process, keyed by path, size and modification time
+_frame_counts: dict[tuple[str, int, int], int] = {}
+
+
+def _count_key(trjfile: str) -> tuple[str, int, int]:
+    """The key of a dump in the frame counts, changes when the file is rewritten."""
+    stat = Path(trjfile).stat()
+    return str(Path(trjfile).resolve()), stat.st_size, stat.st_mtime_ns
+
+
+def count_frames(trjfile: str) -> int:
+    """
+    Counts the frames of a LAMMPS text dump without parsing them.
+
+    Args:
+        trjfile (str): Path to the (compressed) trajectory file.
+
+    Returns:
+        int: The number of frames.
+    """
+    count = 0
+    tail = b""
+    for block in iter_blocks(trjfile):
+        block = tail + block
+        count += block.count(TIMESTEP_ITEM)
+        # a marker split between two blocks is completed by the tail, which is too short to hold a whole one
+        tail = block[-(len(TIMESTEP_ITEM) - 1) :]
+    return count
+
+
+def _box(bounds: list[str], flags: list[str]) -> Cell:
+    """
+    Converts the BOX BOUNDS item of a dump into a cell matrix.
+
+    Args:
+        bounds (list[str]): The three lines below the BOX BOUNDS item.
+        flags (list[str]): The words of the BOX BOUNDS item line, tilt factor names and boundary flags.
+
+    Returns:
+        Cell: The cell matrix with the periodic boundary flags.
+    """
+    values = np.array([line.split() for line in bounds], dtype=np.float64)
+    xy, xz, yz = (values[0, 2], values[1, 2], values[2, 2]) if values.shape[1] == 3 else (0, 0, 0)
+    xlo = values[0, 0] - min(0.0, xy, xz, xy + xz)
+    xhi = values[0, 1] - max(0.0, xy, xz, xy + xz)
+    ylo = values[1, 0] - min(0.0, yz)
+    yhi = values[1, 1] - max(0.0, yz)
+    zlo, zhi = values[2, 0], values[2, 1]
+    matrix = np.array(
+        [[xhi - xlo, xy, xz, xlo], [0.0, yhi - ylo, yz, ylo], [0.0, 0.0, zhi - zlo, zlo]]
+    )
+    boundaries = [flag for flag in flags if flag not in ("xy", "xz", "yz")]
+    pbc = tuple(flag == "pp" for flag in boundaries) if len(boundaries) == 3 else (True,) * 3
+    return Cell(matrix, pbc)  # type: ignore[arg-type]
+
+
+# the columns of the ATOMS item that are read, the others may hold anything, e.g. element names
+PROPERTY_COLUMNS = (
+    "id",
+    "type",
+    "x",
+    "y",
+    "z",
+    "xu",
+    "yu",
+    "zu",
+    "xs",
+    "ys",
+    "zs",
+    "xsu",
+    "ysu",
+    "zsu",
+    "ix",
+    "iy",
+    "iz",
+)
+
+
+def _values(
+    body: bytes, num_atoms: int, columns: list[str]
+) -> tuple[list[str], npt.NDArray[np.float64]]:
+    """
+    Converts the atom lines of a frame to numbers, only the columns in `PROPERTY_COLUMNS` are kept.
+
+    Args:
+        body (bytes): The atom lines of the frame.
+        num_atoms (int): The number of atoms of the frame.
+        columns (list[str]): The column names of the ATOMS item.
+
+    Returns:
+        tuple[list[str], npt.NDArray[np.float64]]: The kept column names and an array of shape
+                                                   (num_atoms, number of kept columns) with their values.
+
+    Raises:
+        ValueError: If the atom lines do not have one value per column or a kept column is not numeric.
+    """
+    kept = [i for i, name in enumerate(columns) if name in PROPERTY_COLUMNS]
+    names = [columns[i] for i in kept]
+    if len(kept) == len(columns):
+        # a value that is not a number stops the conversion with a warning or an error depending on the
+        # numpy version, the words are checked one column at a time below then
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                values = np.fromstring(body, sep=" ")  # type: ignore[call-overload]
+        except ValueError:
+            values = np.zeros(0)
+        if values.size == num_atoms * len(columns):
+            return names, values.reshape(num_atoms, len(columns))
+
+    words = body.split()
+    if len(words) != num_atoms * len(columns):
+        raise ValueError(
+            f"The {num_atoms} atom lines do not have one value for each column: {' '.join(columns)}"
+        )
+    values = np.empty((num_atoms, len(kept)), dtype=np.float64)
+    for position, i in enumerate(kept):
+        try:
+            values[:, position] = np.array(words[i :: len(columns)]).astype(np.float64)
+        except ValueError:
+            raise ValueError(f"The column {columns[i]} of the dump is not numeric") from None
+    return names, values
+
+
+def _properties(
+    columns: list[str], values: npt.NDArray[np.float64], cell: Cell
+) -> dict[str, npt.NDArray[Any]]:
+    """
+    Maps the columns of the ATOMS item to particle properties, sorted by the particle identifier.
+
+    Args:
+        columns (list[str]): The column names of the ATOMS item.
+        values (npt.NDArray[np.float64]): Array of shape (num_atoms, num_columns) with the atom lines.
+        cell (Cell): The cell of the frame, needed for scaled coordinates.
+
+    Returns:
+        dict[str, npt.NDArray[Any]]: The particle properties, named like in OVITO.
+
+    Raises:
+        ValueError: If the dump has no position columns.
+    """
+    position = {name: i for i, name in enumerate(columns)}
+    properties: dict[str, npt.NDArray[Any]] = {}
+    for names, scaled in (
+        (("x", "y", "z"), False),
+        (("xu", "yu", "zu"), False),
+        (("xs", "ys", "zs"), True),
+        (("xsu", "ysu", "zsu"), True),
+    ):
+        if all(name in position for name in names):
+            coords = values[:, [position[name] for name in names]]
+            if scaled:
+                coords = coords @ cell[:, :3].T + cell[:, 3]
+            properties["Position"] = coords
+            break
+    else:
+        raise ValueError(f"The dump has no position columns: {' '.join(columns)}")
+    if "type" in position:
+        properties["Particle Type"] = values[:, position["type"]].astype(np.int32)
+    else:
+        properties["Particle Type"] = np.ones(len(values), dtype=np.int32)
+    if all(name in position for name in ("ix", "iy", "iz")):
+        properties["Periodic Image"] = values[
+            :, [position["ix"], position["iy"], position["iz"]]
+        ].astype(np.int32)
+    if "id" in position:
+        identifiers = values[:, position["id"]].astype(np.int64)
+        order = np.argsort(identifiers, kind="stable")
+        properties = {name: prop[order] for name, prop in properties.items()}
+        properties["Particle Identifier"] = identifiers[order]
+    return properties
+
+
+class _Header(NamedTuple):
+    """The parsed item lines of a frame whose atom lines did not all arrive yet."""
+
+    timestep: int
+    num_atoms: int
+    bounds: list[str]
+    flags: list[str]
+    columns: list[str]
+    body_start: int
+
+
+class DumpParser:
+    """
+    Incremental parser for LAMMPS text dumps. Bytes are fed in blocks of any size, complete frames are
+    returned as soon as all of their atom lines arrived.
+
+    The parser keeps a read offset into its buffer and drops the parsed frames once per block, and only
+    the atom lines of the current frame are scanned for line ends, so parsing is linear in the size of the
+    dump for any block size.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._offset = 0
+        self._header: Optional[_Header] = None
+        # the end of the atom lines scanned so far and the number of line ends found in them
+        self._scanned = 0
+        self._lines = 0
+        # bytes per atom line of the last frame, the size of the next scan window is estimated with it
+        self._line_length = 64
+
+    def feed(self, block: bytes) -> list[Frame]:
+        """
+        Adds a block of the dump and parses all frames that are complete.
+
+        Args:
+            block (bytes): The next bytes of the dump.
+
+        Returns:
+            list[Frame]: The frames completed by this block.
+        """
+        self._buffer += block
+        frames = []
+        frame = self._parse()
+        while frame is not None:
+            frames.append(frame)
+            frame = self._parse()
+        self._compact()
+        return frames
+
+    def finish(self) -> list[Frame]:
+        """
+        Parses the last frame if the dump does not end with a newline.
+
+        Returns:
+            list[Frame]: The remaining frame, if there is one.
+        """
+        if len(self._buffer) > self._offset and not self._buffer.endswith(b"\n"):
+            return self.feed(b"\n")
+        return []
+
+    def _compact(self) -> None:
+        """Drops the parsed frames from the buffer and moves the positions of the pending frame."""
+        if self._offset == 0:
+            return
+        del self._buffer[: self._offset]
+        if self._header is not None:
+            self._header = self._header._replace(body_start=self._header.body_start - self._offset)
+            self._scanned -= self._offset
+        self._offset = 0
+
+    def _parse_header(self) -> Optional[_Header]:
+        """
+        Parses the item lines of the next frame of the buffer.
+
+        Returns:
+            Optional[_Header]: The items, or None if the buffer does not hold all of them yet.
+        """
+        start = self._buffer.find(TIMESTEP_ITEM, self._offset)
+        if start < 0:
+            return None
+        atoms_item = self._buffer.find(b"ITEM: ATOMS", start)
+        header_end = self._buffer.find(b"\n", atoms_item) if atoms_item >= 0 else -1
+        if header_end < 0:
+            return None
+
+        items: dict[str, list[str]] = {}
+        flags: list[str] = []
+        columns: list[str] = []
+        name = ""
+        for line in bytes(self._buffer[start:header_end]).decode().splitlines():
+            if line.startswith("ITEM: "):
+                # TIMESTEP, NUMBER (OF ATOMS), BOX (BOUNDS ...) or ATOMS ...
+                words = line[6:].split()
+                name = words[0]
+                items[name] = []
+                if name == "BOX":
+                    flags = words[2:]
+                elif name == "ATOMS":
+                    columns = words[1:]
+            else:
+                items[name].append(line)
+        return _Header(
+            int(items["TIMESTEP"][0]),
+            int(items["NUMBER"][0]),
+            items["BOX"],
+            flags,
+            columns,
+            header_end + 1,
+        )
+
+    def _body_end(self, header: _Header) -> int:
+        """
+        Scans the atom lines of the pending frame for their line ends, in windows of about the size of the
+        missing lines, continuing where the previous call stopped.
+
+        Returns:
+            int: The end of the last atom line, or -1 if not all atom lines arrived yet.
+        """
+        if self._scanned < header.body_start:
+            self._scanned, self._lines = header.body_start, 0
+        size = len(self._buffer)
+        while self._lines < header.num_atoms:
+            if self._scanned >= size:
+                return -1
+            missing = header.num_atoms - self._lines
+            window_end = min(size, self._scanned + max(missing * self._line_length, 1 << 16))
+            window = np.frombuffer(
+                self._buffer,
+                dtype=np.uint8,
+                count=window_end - self._scanned,
+                offset=self._scanned,
+            )
+            newlines = np.flatnonzero(window == 10)
+            # the view has to be released before the buffer is resized
+            del window
+            if len(newlines) >= missing:
+                return self._scanned + int(newlines[missing - 1]) + 1
+            self._lines += len(newlines)
+            self._scanned = window_end
+        return header.body_start
+
+    def _parse(self) -> Optional[Frame]:
+        """
+        Parses the next frame of the buffer and moves the read offset behind it.
+
+        Returns:
+            Optional[Frame]: The frame, or None if the buffer does not hold a complete frame yet.
+        """
+        if self._header is None:
+            self._header = self._parse_header()
+            if self._header is None:
+                return None
+        header = self._header
+        body_end = self._body_end(header)
+        if body_end < 0:
+            return None
+        columns, values = _values(
+            bytes(self._buffer[header.body_start : body_end]), header.num_atoms, header.columns
+        )
+        if header.num_atoms:
+            self._line_length = max((body_end - header.body_start) // header.num_atoms, 1)
+        self._offset = body_end
+        self._header = None
+        self._scanned, self._lines = 0, 0
+
+        cell = _box(header.bounds, header.flags)
+        return Frame(_properties(columns, values, cell), cell, header.timestep)
+
+
+def iter_frames(trjfile: str) -> Iterator[Frame]:
+    """
+    Yields the frames of a (compressed) LAMMPS text dump one by one.
+
+    Args:
+        trjfile (str): Path to the (compressed) trajectory file.
+
+    Yields:
+        Frame: The next frame of the dump.
+    """
+    parser = DumpParser()
+    for block in iter_blocks(trjfile):
+        yield from parser.feed(block)
+    yield from parser.finish()
+
+
+class DumpReader:
+    """
+    Sequential frame access to a (compressed) LAMMPS text dump, to be wrapped in a `FramePipeline`.
+
+    Frames are decompressed and parsed in order, going back to an earlier frame restarts the stream.
+    """
+
+    def __init__(self, trjfile: str) -> None:
+        self.trjfile = trjfile
+        self._num_frames: Optional[int] = None
+        self._frames: Optional[Iterator[Frame]] = None
+        self._position = -1
+        self._current: Optional[Frame] = None
+
+    @property
+    def num_frames(self) -> int:
+        """
+        The number of frames. It is known once the frames were parsed to the end of the stream, or from an
+        earlier reader of the same dump in this process; only otherwise the dump is decompressed once more
+        to count the frames.
+        """
+        if self._num_frames is None:
+            self._num_frames = _frame_counts.get(_count_key(self.trjfile))
+        if self._num_frames is None:
+            self._num_frames = count_frames(self.trjfile)
+            _frame_counts[_count_key(self.trjfile)] = self._num_frames
+        return self._num_frames
+
+    def frame(self, index: int) -> Frame:
+        if index == self._position and self._current is not None:
+            return self._current
+        if self._frames is None or index < self._position:
+            self.close()
+            self._frames = iter_frames(self.trjfile)
+            self._position = -1
+        while self._position < index:
+            try:
+                self._current = next(self._frames)
+            except StopIteration:
+                self._num_frames = self._position + 1
+                _frame_counts[_count_key(self.trjfile)] = self._num_frames
+                raise IndexError(
+                    f"Requested frame {index}, but only {self._position + 1} frames are available."
+                ) from None
+            self._position += 1
+        return self._current  # type: ignore[return-value]
+
+    def close(self) -> None:
+        if self._frames is not None:
+            self._frames.close()  # type: ignore[attr-defined]
+            self._frames = None
@@ -0,0 +1,53 @@
+import numpy as np
+
+from lindemann import cache
+from lindemann.index import per_frames, per_trj
+from lindemann.trajectory import read
+
+"Testing the on-disk result cache"
+
+
+def test_cached(tmp_path, monkeypatch):
+    """The second call is served from the cache, a changed file or parameter is a miss."""
+    monkeypatch.setenv("LINDEMANN_CACHE_DIR", str(tmp_path / "cache"))
+    trajectory = str(tmp_path / "459_02.lammpstrj")
+    with open("tests/test_example/459_02.lammpstrj", "rb") as infile:
+        content = infile.read()
+    with open(trajectory, "wb") as outfile:
+        outfile.write(content)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return per_trj.calculate(read.frames(trajectory))
+
+    linde = cache.cached(trajectory, "per_trj", compute)
+    assert cache.cached(trajectory, "per_trj", compute) == linde
+    assert len(calls) == 1
+    cache.cached(trajectory, "per_trj", compute, nframes=10)
+    assert len(calls) == 2
+
+    frames = cache.cached(
+        trajectory, "per_frames", lambda: per_frames.calculate(read.frames(trajectory))
+    )
+    assert np.array_equal(cache.cached(trajectory, "per_frames", None), frames, equal_nan=True)
+
+    with open(trajectory, "ab") as outfile:
+        outfile.write(content)
+    cache.cached(trajectory, "per_trj", compute)
+    assert len(calls) == 3
+    assert "4 results" in cache.info()
+
+
+def test_evict(tmp_path, monkeypatch):
+    """The least recently used results are evicted first."""
+    monkeypatch.setenv("LINDEMANN_CACHE_DIR", str(tmp_path))
+    for name in ("a", "b", "c"):
+        cache.store(name, np.zeros(1000))
+    assert cache.load("a") is not None
+    size = (tmp_path / "a.npy").stat().st_size
+    # b is now the least recently used result
+    assert cache.evict(2 * size) == 1
+    assert cache.load("b") is None
+    assert cache.load("a") is not None
+    assert cache.clear() == 2
@@ -1,3 +1,6 @@
+import json
+
+import numpy as np
 from typer.testing import CliRunner
 
 import lindemann
@@ -22,7 +25,7 @@ def single_process_and_multiprocess(trajectory, flag, result_str):
 def test_all_flags_multiprocess():
     trajectory = ["tests/test_example/459_02.lammpstrj", "tests/test_example/459_01.lammpstrj"]
     result_str = "multiprocessing is implemented only for the -t flag"
-    for flag in ["-f", "-of", "-a", "-oa", "-p", "-ti", "-m"]:
+    for flag in ["-f", "-of", "-a", "-oa", "-st", "-ost", "-pst", "-s", "-sf", "-p", "-ti", "-m"]:
         single_process_and_multiprocess(trajectory, flag, result_str)
 
 
@@ -34,6 +37,7 @@ def test_a_p_flags():
         "-oa",
         "-f",
         "-of",
+        "-sf",
         "-p",
     ]:
         single_process_and_multiprocess(trajectory, flag, result_str)
@@ -66,3 +70,269 @@ def test_none_flag_multi():
     assert result.exit_code == 0
     assert "0.025923" in result.stdout
     assert "0.026426" in result.stdout
+
+
+def test_s_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-s"])
+    assert result.exit_code == 0
+    assert "partial lindemann indices for the Trajectory:" in result.stdout
+
+
+def test_sample_flag():
+    result = runner.invoke(
+        app, ["tests/test_example/459_02.lammpstrj", "--sample", "5000", "--seed", "1"]
+    )
+    assert result.exit_code == 0
+    assert "Standard error (5000 pairs):" in result.stdout
+
+
+def test_sample_invalid_sizes():
+    for size in ["0", "-5", "10000000"]:
+        result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--sample", size])
+        assert result.exit_code == 2
+
+
+def test_tolerance_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--tolerance", "0.0"])
+    assert result.exit_code == 0
+    assert "lindemann index for the Trajectory: 0.026426" in result.stdout
+    assert "Frames used:" in result.stdout
+
+
+def test_tolerance_invalid_flags():
+    for flags in (
+        ["--tolerance", "0.01", "-f"],
+        ["--tolerance", "0.01", "-t", "-f"],
+        ["--tolerance", "0.01", "--interval", "0"],
+    ):
+        result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", *flags])
+        assert result.exit_code == 2
+
+
+def test_st_flags():
+    for flag in ["-st", "-ost", "-pst"]:
+        result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", flag])
+        assert result.exit_code == 0
+        assert "single particle lindemann index for the Trajectory:" in result.stdout
+
+
+def test_b_flag():
+    result = runner.invoke(
+        app, ["tests/test_example/459_01.lammpstrj", "tests/test_example/459_02.lammpstrj", "-b"]
+    )
+    assert result.exit_code == 0
+    assert "lindemann_index_batch.txt" in result.stdout
+    with open("lindemann_index_batch.txt") as infile:
+        assert len(infile.readlines()) == 3
+
+
+def test_combined_flags():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-t", "-f", "-a", "-p"])
+    assert result.exit_code == 0
+    assert "lindemann index for the Trajectory: 0.026426" in result.stdout
+    assert "lindemann_index_per_frame.txt" in result.stdout
+    assert "lindemann_index_per_atom.txt" in result.stdout
+    assert "Saved file as:" in result.stdout
+
+
+def test_combined_atoms_flag():
+    """The per atom index of the shared pass matches -a, NaN contributions are skipped in both."""
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-a"])
+    assert result.exit_code == 0
+    alone = np.loadtxt("lindemann_index_per_atom.txt")
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-t", "-a"])
+    assert result.exit_code == 0
+    shared = np.loadtxt("lindemann_index_per_atom.txt")
+    assert not np.isnan(shared).any()
+    assert np.allclose(shared, alone)
+
+
+def test_format_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-oa", "--format", "npy"])
+    assert result.exit_code == 0
+    assert "lindemann_index_per_atoms.npy" in result.stdout
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-f", "--format", "csv"])
+    assert result.exit_code != 0
+
+
+def test_follow_flag():
+    result = runner.invoke(
+        app, ["tests/test_example/459_02.lammpstrj", "--follow", "--timeout", "0"]
+    )
+    assert result.exit_code == 0
+    assert "lindemann_index_follow.txt" in result.stdout
+
+
+def test_cache_flags(tmp_path):
+    env = {"LINDEMANN_CACHE_DIR": str(tmp_path)}
+    for _ in range(2):
+        result = runner.invoke(
+            app, ["tests/test_example/459_02.lammpstrj", "-t", "--cache"], env=env
+        )
+        assert result.exit_code == 0
+        assert "lindemann index for the Trajectory:" in result.stdout
+    result = runner.invoke(app, ["--cache-info"], env=env)
+    assert "1 results" in result.stdout
+    result = runner.invoke(app, ["--cache-clear"], env=env)
+    assert "Removed cached results: 1" in result.stdout
+
+
+def test_max_memory_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--max-memory", "0"])
+    assert result.exit_code == 0
+    assert "Plan:" in result.stdout
+    assert "Peak RSS:" in result.stdout
+
+
+def test_max_memory_out_of_core_flag():
+    result = runner.invoke(
+        app, ["tests/test_example/459_02.lammpstrj", "--max-memory", "0.0001", "-of", "-ot"]
+    )
+    assert result.exit_code == 0
+    assert "out_of_core" in result.stdout
+    assert "lindemann index for the Trajectory:" in result.stdout
+    assert "lindemann_index_per_frame.txt" in result.stdout
+
+
+def test_profile_flag(tmp_path):
+    profile = str(tmp_path / "profile.json")
+    result = runner.invoke(
+        app, ["tests/test_example/459_02.lammpstrj", "-ot", "--profile", profile]
+    )
+    assert result.exit_code == 0
+    assert "Profile saved as:" in result.stdout
+    with open(profile) as infile:
+        assert set(json.load(infile)["stages"]) == {"open", "parse", "compute", "reduction"}
+    result = runner.invoke(
+        app, ["tests/test_example/459_02.lammpstrj", "-t", "-f", "--profile", profile]
+    )
+    assert result.exit_code == 0
+    with open(profile) as infile:
+        report = json.load(infile)
+    assert set(report["stages"]) == {"open", "parse", "compute", "reduction", "write"}
+    assert report["frames"] == 260
+    result = runner.invoke(
+        app, ["tests/test_example/459_02.lammpstrj", "--sample", "100", "--profile", profile]
+    )
+    assert result.exit_code == 2
+
+
+def test_quantize_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-t", "-q"])
+    assert result.exit_code == 0
+    assert "Quantization error bound" in result.stdout
+    assert "lindemann index for the Trajectory:" in result.stdout
+    rejected = (
+        ["-ot"],
+        ["-oa"],
+        ["-t", "-f"],
+        ["-t", "--blocks", "4"],
+        ["--sample", "100"],
+        ["--deterministic"],
+        ["-t", "--deterministic"],
+        ["-pt", "--deterministic"],
+    )
+    for flags in rejected:
+        result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-q", *flags])
+        assert result.exit_code == 2
+
+
+def test_quantize_cache_flags(tmp_path):
+    env = {"LINDEMANN_CACHE_DIR": str(tmp_path)}
+    for _ in range(2):
+        result = runner.invoke(
+            app, ["tests/test_example/459_02.lammpstrj", "-t", "-q", "--cache"], env=env
+        )
+        assert result.exit_code == 0
+        assert "Quantization error bound" in result.stdout
+
+
+def test_engine_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-t", "--engine", "numpy"])
+    assert result.exit_code == 0
+    assert "Engine: numpy" in result.stdout
+    assert "lindemann index for the Trajectory:" in result.stdout
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-of", "--engine", "blas"])
+    assert result.exit_code == 0
+    assert "Engine: blas" in result.stdout
+    assert "lindemann_index_per_frame.txt" in result.stdout
+
+
+def test_groups_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--groups", "shells:2"])
+    assert result.exit_code == 0
+    assert "lindemann_index_per_group.txt" in result.stdout
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--groups", "shells:x"])
+    assert result.exit_code != 0
+
+
+def test_blocks_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-t", "--blocks", "4"])
+    assert result.exit_code == 0
+    assert "Standard error (block averaging):" in result.stdout
+    for flag in ["-f", "-of", "-a", "-oa", "-p", "-l"]:
+        result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", flag, "--blocks", "4"])
+        assert result.exit_code == 2
+        result = runner.invoke(
+            app, ["tests/test_example/459_02.lammpstrj", "-t", flag, "--blocks", "4"]
+        )
+        assert result.exit_code == 2
+
+
+def test_threshold_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--threshold", "0.1"])
+    assert result.exit_code == 0
+    assert "lindemann_events.npz" in result.stdout
+
+
+def test_plot_from_flag(tmp_path):
+    saved = tmp_path / "lindemann_index_per_frame.npy"
+    np.save(saved, np.linspace(0, 0.1, 1000, dtype=np.float32))
+    result = runner.invoke(app, ["--plot-from", str(saved)])
+    assert result.exit_code == 0
+    assert "lindemann_per_frame.pdf" in result.stdout
+
+
+def test_deterministic_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-pt", "--deterministic"])
+    assert result.exit_code == 0
+    assert "lindemann index for the Trajectory:" in result.stdout
+
+
+def test_stride_flags():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-t", "--stride", "2"])
+    assert result.exit_code == 0
+    assert "lindemann index for the Trajectory:" in result.stdout
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "--auto-stride", "0.05"])
+    assert result.exit_code == 0
+    assert "Stride: 1" in result.stdout
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    rejected = (
+        [trajectory, "--auto-stride", "0"],
+        [trajectory, "--auto-stride", "1"],
+        [trajectory, "--auto-stride", "-0.05"],
+        [trajectory, "--auto-stride", "0.05", "--stride", "2"],
+        [trajectory, "tests/test_example/459_01.lammpstrj", "-t", "--auto-stride", "0.05"],
+    )
+    for args in rejected:
+        result = runner.invoke(app, args)
+        assert result.exit_code == 2
+
+
+def test_stride_combined_flags():
+    """The shared pass of several outputs processes the strided frames like a single output."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    alone = runner.invoke(app, [trajectory, "-t", "--stride", "5"])
+    shared = runner.invoke(app, [trajectory, "-t", "-f", "--stride", "5"])
+    assert shared.exit_code == 0
+    index = alone.stdout.split("Trajectory:")[1].split()[0]
+    assert np.isclose(float(shared.stdout.split("Trajectory:")[1].split()[0]), float(index))
+    assert len(np.loadtxt("lindemann_index_per_frame.txt")) == 52
+    result = runner.invoke(app, [trajectory, "--sample", "100", "--stride", "5"])
+    assert result.exit_code == 2
+
+
+def test_l_flag():
+    result = runner.invoke(app, ["tests/test_example/459_02.lammpstrj", "-l"])
+    assert result.exit_code == 0
+    assert "Lindemann index saved as:" in result.stdout
@@ -1,17 +1,34 @@
+import numba as nb
 import numpy as np
 import pytest
 from psutil import cpu_count
 
 from lindemann.index import (
+    backends,
+    batch_trj,
+    blocks,
+    combined,
+    deterministic_trj,
     online_atoms,
     online_frames,
+    online_single_trj,
     online_trj,
+    out_of_core,
+    parallel_single_trj,
     parallel_trj,
     per_atoms,
     per_frames,
+    per_groups,
     per_trj,
+    per_types,
+    planner,
+    quantized,
+    sampled_trj,
+    single_trj,
+    stride,
 )
-from lindemann.trajectory import read
+from lindemann.profiling import Profiler
+from lindemann.trajectory import quantize, read, save
 
 "Testing the individal parts of the index module, its possible to change the test setup for individual modules"
 
@@ -74,6 +91,36 @@ def test_parallel_tra(trajectory, lindemannindex):
     assert np.isclose(parallel_trj.calculate(frame, num_cores), lindemannindex)
 
 
+@pytest.mark.parametrize(
+    ("trajectory"),
+    [
+        ("tests/test_example/459_01.lammpstrj"),
+        ("tests/test_example/459_02.lammpstrj"),
+    ],
+)
+def test_parallel_chunks(trajectory):
+    """Any chunk count, also more chunks than frames, gives the serial result."""
+    frame = read.frames(trajectory)
+    linde = per_trj.calculate(frame)
+    for num_chunks in (1, 3, 7, len(frame) - 1, 10 * len(frame)):
+        assert np.isclose(parallel_trj.calculate(frame, num_chunks), linde)
+    assert np.isclose(parallel_trj.calculate_scheduled(frame), linde)
+    bounds = parallel_trj.chunk_bounds(len(frame), 7)
+    assert np.ptp(np.diff(bounds)) <= 1 and bounds[-1] == len(frame)
+
+
+def test_schedule(tmp_path, monkeypatch):
+    """The chunk count respects frames, memory and the tuned chunks per thread."""
+    monkeypatch.setenv("LINDEMANN_CACHE_DIR", str(tmp_path))
+    chunk_bytes = 100 * 99 * 4
+    assert parallel_trj.schedule(1000, 100, threads=8) == 8
+    assert parallel_trj.schedule(5, 100, threads=8) == 5
+    assert parallel_trj.schedule(1000, 100, threads=8, max_memory=3 * chunk_bytes) == 3
+    best = parallel_trj.tune(num_frames=8, num_atoms=20, candidates=(2,))
+    assert best == parallel_trj.chunks_per_thread() == 2
+    assert parallel_trj.schedule(1000, 100, threads=8) == 16
+
+
 @pytest.mark.parametrize(
     ("trajectory", "lindemannindex"),
     [
@@ -181,6 +228,19 @@ def test_atoms_middle(trajectory):
     assert np.isclose(lindeman_at_200_frame, lindeman_from_200_trj)
 
 
+@pytest.mark.parametrize(("fmt"), ["txt", "npy"])
+def test_online_atoms_rows(tmp_path, fmt):
+    """Rows streamed into a result file match the in memory result."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    pipeline, data = read.trajectory(trajectory)
+    expected = online_atoms.calculate(pipeline, data)
+    filename = save.result_file(str(tmp_path / "per_atom"), fmt)
+    with save.rows(filename, expected.shape) as out:
+        online_atoms.calculate(pipeline, data, out=out)
+    saved = np.load(filename) if fmt == "npy" else np.loadtxt(filename)
+    assert np.allclose(saved, expected, equal_nan=True)
+
+
 @pytest.mark.parametrize(
     ("trajectory", "lindemannindex"),
     [
@@ -215,3 +275,447 @@ def test_online_atoms_middle(trajectory):
     per_atoms_frame_at_200 = online_atoms.calculate(pipeline, data)[200]
     lindeman_at_200_frame = np.mean(per_atoms_frame_at_200)
     assert np.isclose(lindeman_at_200_frame, lindeman_from_200_trj)
+
+
+@pytest.mark.parametrize(
+    ("trajectory", "lindemannindex"),
+    [
+        (
+            "tests/test_example/459_01.lammpstrj",
+            0.025923892565654555,
+        ),
+        (
+            "tests/test_example/459_02.lammpstrj",
+            0.026426709832984754,
+        ),
+    ],
+)
+def test_types(trajectory, lindemannindex):
+    """The pair weighted partial indices add up to the index of the trajectory."""
+    frame = read.frames(trajectory)
+    type_codes, labels = read.types(trajectory)
+    partial = per_types.calculate(frame, type_codes, len(labels))
+    counts = per_types.pair_counts(type_codes, len(labels))
+    upper = np.triu_indices(len(labels))
+    weighted = np.nansum(partial[upper] * counts[upper]) / np.sum(counts[upper])
+    assert np.allclose(partial, partial.T, equal_nan=True)
+    assert np.isclose(weighted, lindemannindex)
+
+
+@pytest.mark.parametrize(
+    ("trajectory"),
+    [
+        ("tests/test_example/459_01.lammpstrj"),
+        ("tests/test_example/459_02.lammpstrj"),
+    ],
+)
+def test_types_frames(trajectory):
+    """Example test with parametrization."""
+    frame = read.frames(trajectory)
+    type_codes, labels = read.types(trajectory)
+    partial_per_frame = per_types.calculate_frames(frame, type_codes, len(labels))
+    partial_at_200 = per_types.calculate(frame[0:201], type_codes, len(labels))
+    assert partial_per_frame.shape == (len(frame), len(labels), len(labels))
+    assert np.allclose(partial_per_frame[200], partial_at_200, equal_nan=True)
+
+
+@pytest.mark.parametrize(
+    ("trajectory", "lindemannindex"),
+    [
+        (
+            "tests/test_example/459_01.lammpstrj",
+            0.025923892565654555,
+        ),
+        (
+            "tests/test_example/459_02.lammpstrj",
+            0.026426709832984754,
+        ),
+    ],
+)
+def test_sampled_tra(trajectory, lindemannindex):
+    """Sampling every pair gives the exact index, a small sample stays within its error bars."""
+    pipeline, data = read.trajectory(trajectory)
+    num_distances = data.particles.count * (data.particles.count - 1) // 2
+    estimate, stderr = sampled_trj.calculate(pipeline, data, num_distances)
+    assert np.isclose(estimate, lindemannindex)
+    assert np.isclose(stderr, 0.0)
+    estimate, stderr = sampled_trj.calculate(pipeline, data, 5000, seed=42)
+    assert abs(estimate - lindemannindex) < 5 * stderr
+    assert sampled_trj.calculate(pipeline, data, 5000, seed=42) == (estimate, stderr)
+
+
+@pytest.mark.parametrize(
+    ("trajectory"),
+    [
+        ("tests/test_example/459_01.lammpstrj"),
+        ("tests/test_example/459_02.lammpstrj"),
+    ],
+)
+def test_sampled_atoms(trajectory):
+    """Example test with parametrization."""
+    frame = read.frames(trajectory)
+    pipeline, data = read.trajectory(trajectory)
+    per_atom, stderr = sampled_trj.calculate_atoms(pipeline, data, data.particles.count - 1)
+    assert np.allclose(per_atom, per_atoms.calculate(frame)[-1])
+    assert np.allclose(stderr, 0.0)
+
+
+@pytest.mark.parametrize(
+    ("trajectory"),
+    [
+        ("tests/test_example/459_01.lammpstrj"),
+        ("tests/test_example/459_02.lammpstrj"),
+    ],
+)
+def test_converged_tra(trajectory):
+    """The converged index is the index of the frames that were used."""
+    frame = read.frames(trajectory)
+    linde, frames_used = per_trj.calculate_until_converged(frame, 0.05, 20)
+    assert frames_used % 20 == 0 or frames_used == len(frame)
+    assert np.isclose(linde, per_trj.calculate(frame[0:frames_used]))
+    pipeline, data = read.trajectory(trajectory)
+    online_linde, online_frames_used = online_trj.calculate_until_converged(
+        pipeline, data, 0.05, 20
+    )
+    assert online_frames_used == frames_used
+    assert np.isclose(online_linde, linde)
+    assert per_trj.calculate_until_converged(frame, 0.0, 20)[1] == len(frame)
+    streamed = per_trj.calculate_until_converged(iter(frame), 0.05, 20, len(frame))
+    assert streamed == (linde, frames_used)
+
+
+@pytest.mark.parametrize(
+    ("trajectory"),
+    [
+        ("tests/test_example/459_01.lammpstrj"),
+        ("tests/test_example/459_02.lammpstrj"),
+    ],
+)
+def test_single_tra(trajectory):
+    """The serial, parallel and streaming single particle indices agree with a NumPy reference."""
+    frame = read.frames(trajectory, unwrapped=True)
+    centered = frame.astype(np.float64) - frame.mean(axis=1, keepdims=True)
+    nn_distance = 2.5
+    reference = np.sqrt(np.sum(centered.var(axis=0), axis=1)) / nn_distance
+    assert np.allclose(single_trj.calculate_atoms(frame, nn_distance), reference, rtol=1e-4)
+    assert np.allclose(
+        parallel_single_trj.calculate_atoms(frame, nn_distance), reference, rtol=1e-4
+    )
+    pipeline, data = read.trajectory(trajectory)
+    assert np.allclose(
+        online_single_trj.calculate_atoms(pipeline, data, nn_distance), reference, rtol=1e-4
+    )
+    assert np.isclose(single_trj.calculate(frame), parallel_single_trj.calculate(frame))
+
+
+def test_single_unwrap(tmp_path):
+    """Atoms jumping across a periodic boundary do not change the single particle index."""
+    frame = read.frames("tests/test_example/459_01.lammpstrj", unwrapped=True)
+    shift = 60.0 - np.mean(frame[:, 0, 0])
+    wrapped_file = tmp_path / "wrapped.lammpstrj"
+    with open(wrapped_file, "w") as outfile:
+        for step, coords in enumerate(frame):
+            outfile.write(
+                f"ITEM: TIMESTEP\n{step}\nITEM: NUMBER OF ATOMS\n{len(coords)}\n"
+                "ITEM: BOX BOUNDS pp pp pp\n0 60\n0 60\n0 60\nITEM: ATOMS id type x y z\n"
+            )
+            for atom, (x, y, z) in enumerate(coords):
+                outfile.write(f"{atom + 1} 1 {(x + shift) % 60.0} {y} {z}\n")
+    unwrapped = read.frames(str(wrapped_file), unwrapped=True)
+    assert np.isclose(
+        single_trj.calculate(unwrapped, 2.5), single_trj.calculate(frame, 2.5), rtol=1e-4
+    )
+    pipeline, data = read.trajectory(str(wrapped_file))
+    assert np.isclose(
+        online_single_trj.calculate(pipeline, data, 2.5),
+        single_trj.calculate(frame, 2.5),
+        rtol=1e-4,
+    )
+
+
+def test_batch_tra():
+    """The batch kernel gives the same index as per_trj for trajectories of different sizes."""
+    trajectories = [
+        read.frames("tests/test_example/459_01.lammpstrj")[0:50],
+        read.frames("tests/test_example/459_02.lammpstrj")[0:80, 0:300],
+        read.frames("tests/test_example/459_01.lammpstrj")[10:30, 100:120],
+    ]
+    linde = batch_trj.calculate(*batch_trj.pack(trajectories))
+    assert np.allclose(linde, [per_trj.calculate(positions) for positions in trajectories])
+    results = dict(
+        batch_trj.calculate_files(
+            ["tests/test_example/459_01.lammpstrj", "tests/test_example/459_02.lammpstrj"],
+            batch_size=1,
+        )
+    )
+    assert np.isclose(results["tests/test_example/459_01.lammpstrj"], 0.025923892565654555)
+    assert np.isclose(results["tests/test_example/459_02.lammpstrj"], 0.026426709832984754)
+
+
+@pytest.mark.parametrize(
+    ("trajectory", "lindemannindex"),
+    [
+        (
+            "tests/test_example/459_01.lammpstrj",
+            0.025923892565654555,
+        ),
+        (
+            "tests/test_example/459_02.lammpstrj",
+            0.026426709832984754,
+        ),
+    ],
+)
+def test_combined(trajectory, lindemannindex):
+    """One shared pass gives the same outputs as the individual modes."""
+    frame = read.frames(trajectory)
+    results = combined.calculate(frame, per_frame=True, per_atom=True)
+    assert np.isclose(results.trj, lindemannindex)
+    assert np.allclose(results.frames, per_frames.calculate(frame), equal_nan=True)
+    assert np.allclose(results.atoms[200], per_atoms.calculate(frame)[200])
+    assert np.isclose(np.mean(results.atoms[-1]), lindemannindex)
+    pipeline, data = read.trajectory(trajectory)
+    online_results = combined.calculate_online(pipeline, data, per_frame=True)
+    assert np.isclose(online_results.trj, lindemannindex)
+    assert np.allclose(online_results.frames, results.frames, equal_nan=True)
+    assert online_results.atoms is None
+
+
+def test_plan():
+    """The planner picks the fastest mode that fits into the memory budget."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    nframes, natoms = planner.probe(trajectory)
+    assert (nframes, natoms) == read.frames(trajectory).shape[:2]
+    in_memory = planner.predicted_bytes("in_memory", nframes, natoms)
+    online = planner.predicted_bytes("online", nframes, natoms)
+    assert planner.plan(nframes, natoms, 10 * in_memory, cores=4).mode == "parallel"
+    chosen = planner.plan(nframes, natoms, in_memory, cores=1)
+    assert chosen.mode == "in_memory"
+    assert np.isclose(planner.run(trajectory, chosen), per_trj.calculate(read.frames(trajectory)))
+    assert planner.plan(nframes, natoms, online, cores=4).mode == "online"
+    chosen = planner.plan(nframes, natoms, online // 4, cores=4)
+    assert chosen.mode == "out_of_core"
+    assert chosen.predicted_bytes <= online // 4
+    assert np.isclose(planner.run(trajectory, chosen), per_trj.calculate(read.frames(trajectory)))
+    # not even the moments of one row fit
+    assert planner.plan(nframes, natoms, natoms, cores=4).mode == "sampled"
+    assert np.isclose(
+        planner.run(trajectory, planner.plan(nframes, natoms, online, cores=1)),
+        per_trj.calculate(read.frames(trajectory)),
+    )
+
+
+def test_out_of_core(tmp_path):
+    """The sweeps over blocks of pairs give the indices of the trajectory, per frame and per atom."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    pipeline, data = read.trajectory(trajectory)
+    expected = combined.calculate_online(pipeline, data, per_frame=True, per_atom=True)
+    nframes, natoms = planner.probe(trajectory)
+    assert out_of_core.row_blocks(natoms, natoms * natoms)[-1] == natoms
+    # the per atom sums are spilled and the moments of about 50 rows fit into the budget
+    budget = 50 * natoms * out_of_core.MOMENT_BYTES
+    assert out_of_core.spills(budget, nframes, natoms)
+    bounds = out_of_core.row_blocks(natoms, out_of_core.block_pairs(budget, nframes, natoms))
+    assert len(bounds) > 5
+    results = out_of_core.calculate(
+        pipeline, data, budget, per_frame=True, per_atom=True, spill_dir=str(tmp_path)
+    )
+    assert np.isclose(results.trj, expected.trj)
+    assert np.allclose(results.frames, expected.frames, equal_nan=True)
+    assert np.allclose(results.atoms, expected.atoms, equal_nan=True)
+    # NaN pair ratios of the first frames are skipped like in per_atoms
+    assert not np.isnan(results.atoms).any()
+    assert list(tmp_path.iterdir()) == []
+    one_block = out_of_core.calculate(pipeline, data, 10**9, per_atom=True, nframes=100)
+    assert one_block.frames is None
+    assert np.allclose(one_block.atoms, per_atoms.calculate(read.frames(trajectory)[:100]))
+    assert np.isclose(one_block.trj, per_trj.calculate(read.frames(trajectory)[:100]))
+
+
+def test_profiler():
+    """The profiler records the stages and frames of an online run and calls the callbacks."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    events = []
+    profiler = Profiler(callbacks=[lambda event, data: events.append(event)])
+    pipeline, data = read.trajectory(trajectory)
+    linde = online_trj.calculate(pipeline, data, profiler=profiler)
+    assert np.isclose(linde, online_trj.calculate(pipeline, data))
+    report = profiler.report()
+    nframes, natoms, _ = read.frames(trajectory).shape
+    assert report["frames"] == report["stages"]["compute"]["frames"] == nframes
+    assert report["pair_updates"] == nframes * natoms * (natoms - 1) // 2
+    assert set(report["stages"]) == {"parse", "compute", "reduction"}
+    assert events.count("frame") == nframes
+
+
+def test_quantized():
+    """The kernels on 16-bit positions agree with the float32 kernels within the error bound."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    positions = read.frames(trajectory)
+    encoded = quantize.frames(trajectory)
+    assert encoded.codes.dtype == np.uint16
+    assert encoded.nbytes < positions.nbytes * 0.6
+    position_error, distance_error = quantize.error_bound(encoded)
+    assert np.abs(quantize.decode(encoded) - positions).max() <= position_error * 1.01 + 1e-6
+    assert distance_error < 0.01
+    linde = per_trj.calculate(positions)
+    assert np.isclose(quantized.calculate(encoded), linde, rtol=1e-3)
+    assert np.isclose(quantized.calculate_scheduled(encoded), linde, rtol=1e-3)
+    assert np.allclose(
+        quantized.calculate_frames(encoded),
+        per_frames.calculate(positions),
+        rtol=1e-2,
+        equal_nan=True,
+    )
+    assert np.allclose(
+        quantized.calculate_atoms(encoded)[-1],
+        per_atoms.calculate(positions)[-1],
+        rtol=1e-2,
+        equal_nan=True,
+    )
+
+
+def test_backends(tmp_path, monkeypatch):
+    """Every backend reproduces the compiled kernels of -t, -f and -a, in memory and online."""
+    monkeypatch.setenv("LINDEMANN_CACHE_DIR", str(tmp_path))
+    positions = read.frames("tests/test_example/459_02.lammpstrj")
+    linde = per_trj.calculate(positions)
+    linde_frames = per_frames.calculate(positions)
+    linde_atoms = per_atoms.calculate(positions)
+    finite = np.isfinite(linde_frames)
+    pipeline, data = read.trajectory("tests/test_example/459_02.lammpstrj")
+    for engine in backends.BACKENDS:
+        assert np.isclose(backends.calculate(positions, engine), linde, rtol=1e-4)
+        assert np.isclose(online_trj.calculate(pipeline, data, engine=engine), linde, rtol=1e-4)
+        assert np.allclose(
+            online_frames.calculate(pipeline, data, engine=engine)[finite],
+            linde_frames[finite],
+            rtol=1e-3,
+        )
+        assert np.allclose(
+            online_atoms.calculate(pipeline, data, engine=engine)[-1],
+            linde_atoms[-1],
+            rtol=1e-3,
+            equal_nan=True,
+        )
+        # the float32 moments of the first frames can round to NaN in the compiled kernels
+        assert np.allclose(
+            backends.calculate_frames(positions, engine)[finite], linde_frames[finite], rtol=1e-3
+        )
+        assert np.allclose(
+            backends.calculate_atoms(positions, engine)[-1],
+            linde_atoms[-1],
+            rtol=1e-3,
+            equal_nan=True,
+        )
+    # without a calibration a static rule selects, nothing is compiled or measured
+    assert backends.select(*positions.shape[:2]) in backends.BACKENDS
+    assert not (tmp_path / "backends_calibration.json").exists()
+    assert set(backends.calibrate()) == set(backends.BACKENDS)
+    assert backends.calibration() is not None
+    assert backends.select(*positions.shape[:2]) in backends.BACKENDS
+    assert np.isnan(backends.calculate(positions[:0], "numpy"))
+
+
+def test_groups(tmp_path):
+    """The group means of the kernel equal the means of the per atom indices of each group."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    positions = read.frames(trajectory)
+    linde_atoms = per_atoms.calculate(positions)
+    for spec in ("shells:3", "slabs:4:z"):
+        group_codes, labels = per_groups.groups(spec, positions[0])
+        linde_groups = per_groups.calculate_frames(positions, group_codes, len(labels))
+        assert linde_groups.shape == (len(positions), len(labels))
+        expected = [
+            np.nanmean(linde_atoms[-1][group_codes == group]) for group in range(len(labels))
+        ]
+        assert np.allclose(linde_groups[-1], expected, rtol=1e-4)
+    group_file = tmp_path / "groups.txt"
+    np.savetxt(group_file, np.arange(positions.shape[1]) % 2 + 7, fmt="%d")
+    group_codes, labels = per_groups.groups(str(group_file), positions[0])
+    assert list(labels) == [7, 8]
+    pipeline, data = read.trajectory(trajectory)
+    assert np.allclose(
+        per_groups.calculate(pipeline, data, group_codes, 2)[-1],
+        per_groups.calculate_frames(positions, group_codes, 2)[-1],
+        rtol=1e-4,
+    )
+    with pytest.raises(ValueError):
+        per_groups.groups("slabs:2:w", positions[0])
+
+
+def test_blocks():
+    """The merged blocks give the index of the trajectory, the online pass the same standard errors."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    positions = read.frames(trajectory)
+    linde, errors = blocks.calculate(positions, 8)
+    assert np.isclose(linde, per_trj.calculate(positions), rtol=1e-5)
+    assert [error.num_blocks for error in errors] == [8, 4, 2]
+    assert all(error.stderr > 0 for error in errors)
+    assert blocks.plateau(errors) == max(errors[0].stderr, errors[1].stderr)
+    pipeline, data = read.trajectory(trajectory)
+    linde_online, errors_online = blocks.calculate_online(pipeline, data, 8)
+    assert np.isclose(linde_online, linde, rtol=1e-5)
+    assert np.allclose([e.stderr for e in errors_online], [e.stderr for e in errors], rtol=1e-4)
+
+
+def test_deterministic():
+    """The reproducible mode gives the float64 index and the same bits for any number of threads."""
+    positions = read.frames("tests/test_example/459_02.lammpstrj")[:40]
+    doubled = positions.astype(np.float64)
+    rows, cols = np.triu_indices(positions.shape[1], 1)
+    distances = np.linalg.norm(doubled[:, rows] - doubled[:, cols], axis=2)
+    reference = np.mean(distances.std(axis=0) / distances.mean(axis=0))
+    linde = deterministic_trj.calculate(positions)
+    assert np.isclose(linde, reference, rtol=1e-12, atol=0)
+    threads = nb.get_num_threads()
+    try:
+        for num_threads in range(1, threads + 1):
+            nb.set_num_threads(num_threads)
+            assert deterministic_trj.calculate(positions) == linde
+    finally:
+        nb.set_num_threads(threads)
+
+    bounds = deterministic_trj.row_bounds(100, 7)
+    assert bounds[0] == 0 and bounds[-1] == 100 and np.all(np.diff(bounds) > 0)
+
+
+def test_stride(tmp_path):
+    """The stride follows the decorrelation time, strided modes match the strided positions."""
+    rng = np.random.default_rng(1)
+    correlated = np.zeros((4000, 20))
+    for frame in range(1, len(correlated)):
+        correlated[frame] = 0.9 * correlated[frame - 1] + rng.normal(size=20)
+    chosen = stride.choose(stride.autocorrelation(correlated), 0.05)
+    assert np.isclose(chosen.decorrelation_time, (1 + 0.9) / (2 * (1 - 0.9)), rtol=0.2)
+    assert chosen.stride > 1 and chosen.efficiency >= 0.95
+    assert stride.choose(stride.autocorrelation(rng.normal(size=(4000, 20))), 0.05).stride == 1
+
+    # the first frame of the test trajectory with correlated vibrations, rho(k) = 0.8**k
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    first = read.frames(trajectory, 1)[0]
+    displacement = np.zeros_like(first)
+    correlated_file = tmp_path / "correlated.lammpstrj"
+    ids = np.arange(1, len(first) + 1)
+    with open(correlated_file, "w") as outfile:
+        for frame in range(400):
+            displacement = 0.8 * displacement + rng.normal(0.0, 0.06, first.shape)
+            outfile.write(f"ITEM: TIMESTEP\n{frame}\nITEM: NUMBER OF ATOMS\n{len(ids)}\n")
+            outfile.write("ITEM: BOX BOUNDS pp pp pp\n" + "0 60\n" * 3)
+            outfile.write("ITEM: ATOMS id type x y z\n")
+            np.savetxt(outfile, np.column_stack((ids, np.ones_like(ids), first + displacement)))
+    pipeline, data = read.trajectory(str(correlated_file))
+    chosen = stride.estimate(pipeline, data, 0.05)
+    assert np.isclose(chosen.decorrelation_time, (1 + 0.8) / (2 * (1 - 0.8)), rtol=0.15)
+    assert chosen.stride in (2, 3, 4)
+    pipeline, data = read.trajectory(trajectory)
+    assert stride.estimate(pipeline, data, 0.05).stride == 1
+
+    strided = read.frames(trajectory, stride=3)
+    assert np.array_equal(strided, read.frames(trajectory)[::3])
+    assert np.isclose(online_trj.calculate(pipeline, data, stride=3), per_trj.calculate(strided))
+    assert np.allclose(
+        online_frames.calculate(pipeline, data, stride=3),
+        per_frames.calculate(strided),
+        rtol=1e-4,
+        equal_nan=True,
+    )
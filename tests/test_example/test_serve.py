@@ -0,0 +1,26 @@
+import os
+import threading
+
+from lindemann import serve
+
+"Testing the daemon and its client"
+
+
+def test_serve(tmp_path):
+    """Jobs sent to the daemon give the same output as the command and report their timing."""
+    socket_path = str(tmp_path / "lindemann.sock")
+    server = serve.Server(socket_path, 1, 1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        trajectory = os.path.abspath("tests/test_example/459_02.lammpstrj")
+        result = serve.submit([trajectory, "-t"], socket_path)
+        assert result["exit_code"] == 0
+        assert "lindemann index for the Trajectory:" in result["stdout"]
+        assert result["run"] >= 0 and result["queued"] >= 0
+        result = serve.submit([trajectory, "-x"], socket_path)
+        assert result["exit_code"] != 0
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not os.path.exists(socket_path)
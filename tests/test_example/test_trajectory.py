@@ -0,0 +1,271 @@
+import bz2
+import gzip
+import lzma
+import struct
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from lindemann.index import online_atoms, online_frames, online_trj, per_frames, per_trj
+from lindemann.trajectory import binary, events, follow, plt_plot, read, save, stream
+
+"Testing the readers of the trajectory module against the OVITO import of the plain text dumps"
+
+
+@pytest.mark.parametrize(
+    ("suffix", "compress"),
+    [
+        (".gz", gzip.compress),
+        (".bz2", bz2.compress),
+        (".xz", lzma.compress),
+    ],
+)
+def test_compressed(tmp_path, suffix, compress):
+    """Compressed dumps are read as a stream and give the same positions and index."""
+    trajectory = "tests/test_example/459_01.lammpstrj"
+    compressed_file = str(tmp_path / f"459_01.lammpstrj{suffix}")
+    with open(trajectory, "rb") as infile, open(compressed_file, "wb") as outfile:
+        outfile.write(compress(infile.read()))
+    frame = read.frames(trajectory)
+    assert np.array_equal(read.frames(compressed_file), frame)
+    assert np.array_equal(read.types(compressed_file)[0], read.types(trajectory)[0])
+    pipeline, data = read.trajectory(compressed_file)
+    assert np.isclose(online_trj.calculate(pipeline, data), per_trj.calculate(frame))
+
+
+def test_dump_reader_counts_once(tmp_path, monkeypatch):
+    """The frames of a compressed dump are counted at most once per process."""
+    compressed_file = str(tmp_path / "459_01.lammpstrj.gz")
+    with open("tests/test_example/459_01.lammpstrj", "rb") as infile:
+        content = infile.read()
+    with open(compressed_file, "wb") as outfile:
+        outfile.write(gzip.compress(content))
+    reader = stream.DumpReader(compressed_file)
+    with pytest.raises(IndexError):
+        reader.frame(10**6)
+    monkeypatch.setattr(stream, "count_frames", None)
+    assert (
+        reader.num_frames
+        == stream.DumpReader(compressed_file).num_frames
+        == content.count(stream.TIMESTEP_ITEM)
+    )
+
+
+def test_dump_parser_blocks():
+    """Frames are complete no matter how the dump is split into blocks."""
+    trajectory = "tests/test_example/459_01.lammpstrj"
+    with open(trajectory, "rb") as infile:
+        content = infile.read()
+    parser = stream.DumpParser()
+    parsed = []
+    for start in range(0, len(content), 4099):
+        parsed += parser.feed(content[start : start + 4099])
+    parsed += parser.finish()
+    frame = read.frames(trajectory)
+    assert len(parsed) == len(frame) == stream.count_frames(trajectory)
+    assert np.array_equal(
+        np.array([data.particles["Position"].array for data in parsed], dtype=np.float32), frame
+    )
+
+
+def test_dump_parser_columns():
+    """Columns that are not read may hold text, a text column that is read is named in the error."""
+    header = (
+        "ITEM: TIMESTEP\n0\nITEM: NUMBER OF ATOMS\n2\nITEM: BOX BOUNDS pp pp pp\n" + "0 10\n" * 3
+    )
+    parser = stream.DumpParser()
+    (data,) = parser.feed(
+        (header + "ITEM: ATOMS id element type x y z\n2 Cu 1 4 5 6\n1 Ag 2 1 2 3\n").encode()
+    )
+    assert np.array_equal(data.particles["Position"].array, [[1, 2, 3], [4, 5, 6]])
+    assert np.array_equal(data.particles["Particle Type"].array, [2, 1])
+    parser = stream.DumpParser()
+    with pytest.raises(ValueError, match="column x"):
+        parser.feed((header + "ITEM: ATOMS id type x y z\n1 1 a 2 3\n2 1 4 5 6\n").encode())
+
+
+def test_keep_open(tmp_path):
+    """Kept open pipelines are reused until the file changes and give the same frames."""
+    compressed_file = str(tmp_path / "459_01.lammpstrj.gz")
+    with open("tests/test_example/459_01.lammpstrj", "rb") as infile:
+        content = infile.read()
+    with open(compressed_file, "wb") as outfile:
+        outfile.write(gzip.compress(content))
+    frame = read.frames(compressed_file)
+    read.keep_open(1)
+    try:
+        pipeline = read.open_pipeline(compressed_file)
+        assert read.open_pipeline(compressed_file) is pipeline
+        assert np.array_equal(read.frames(compressed_file), frame)
+        assert np.array_equal(read.frames(compressed_file, stride=2), frame[::2])
+        with open(compressed_file, "wb") as outfile:
+            outfile.write(gzip.compress(content[: content.rindex(stream.TIMESTEP_ITEM)]))
+        assert read.open_pipeline(compressed_file) is not pipeline
+        assert np.array_equal(read.frames(compressed_file), frame[:-1])
+    finally:
+        read.keep_open(0)
+
+
+def write_lammps_binary(path, positions, length):
+    """Writes a LAMMPS binary dump with magic string and column names, in two chunks per frame."""
+    columns = b"id type x y z"
+    with open(path, "wb") as outfile:
+        for timestep, frame in enumerate(positions):
+            num_atoms = len(frame)
+            values = np.column_stack(
+                [np.arange(num_atoms, 0, -1), np.ones(num_atoms), frame[::-1]]
+            ).astype("<f8")
+            outfile.write(struct.pack("<q", -8) + b"DUMPATOM" + struct.pack("<ii", 1, 2))
+            outfile.write(
+                struct.pack("<qqi", timestep, num_atoms, 0) + struct.pack("<6i", *[0] * 6)
+            )
+            outfile.write(struct.pack("<6d", 0.0, length, 0.0, length, 0.0, length))
+            outfile.write(struct.pack("<ii", 5, 0) + struct.pack("<b", 0))
+            outfile.write(struct.pack("<i", len(columns)) + columns + struct.pack("<i", 2))
+            half = num_atoms // 2
+            for chunk in (values[:half], values[half:]):
+                outfile.write(struct.pack("<i", chunk.size) + chunk.tobytes())
+
+
+def write_dcd(path, positions, length):
+    """Writes a DCD file with unit cell records like LAMMPS `dump dcd`."""
+    nframes, num_atoms, _ = positions.shape
+
+    def record(payload):
+        return struct.pack("<i", len(payload)) + payload + struct.pack("<i", len(payload))
+
+    icntrl = [0] * 20
+    icntrl[0], icntrl[10], icntrl[19] = nframes, 1, 24
+    with open(path, "wb") as outfile:
+        outfile.write(record(b"CORD" + struct.pack("<20i", *icntrl)))
+        outfile.write(record(struct.pack("<i", 1) + b" " * 80))
+        outfile.write(record(struct.pack("<i", num_atoms)))
+        for frame in positions:
+            outfile.write(record(struct.pack("<6d", length, 90.0, length, 90.0, 90.0, length)))
+            for dim in range(3):
+                outfile.write(record(frame[:, dim].astype("<f4").tobytes()))
+
+
+def write_trr(path, positions, length):
+    """Writes a single precision GROMACS TRR file with box and positions in nm."""
+    num_atoms = positions.shape[1]
+    with open(path, "wb") as outfile:
+        for step, frame in enumerate(positions):
+            sizes = [0, 0, 36, 0, 0, 0, 0, 12 * num_atoms, 0, 0, num_atoms, step, 0]
+            outfile.write(struct.pack(">iii", 1993, 13, 12) + b"GMX_trn_file")
+            outfile.write(struct.pack(">13i", *sizes) + struct.pack(">ff", step, 0.0))
+            outfile.write((np.eye(3) * length / 10).astype(">f4").tobytes())
+            outfile.write((frame / 10).astype(">f4").tobytes())
+
+
+@pytest.mark.parametrize(
+    ("name", "write"),
+    [
+        ("459_01.bin", write_lammps_binary),
+        ("459_01.dcd", write_dcd),
+        ("459_01.trr", write_trr),
+    ],
+)
+def test_binary(tmp_path, name, write):
+    """Binary files are decoded in bulk and frame by frame and give the same index."""
+    frame = read.frames("tests/test_example/459_01.lammpstrj")
+    binary_file = str(tmp_path / name)
+    write(binary_file, frame, 100.0)
+    positions = read.frames(binary_file)
+    assert positions.shape == frame.shape
+    assert np.allclose(positions, frame, atol=1e-4)
+    assert np.allclose(read.frames(binary_file, 3), positions[:3])
+    reader = binary.open_reader(binary_file)
+    assert np.array_equal(reader.frame(4).particles["Position"].array, positions[4])
+    assert np.allclose(np.diag(reader.frame(0).cell[:, :3]), 100.0)
+    pipeline, data = read.trajectory(binary_file)
+    assert np.isclose(online_trj.calculate(pipeline, data), per_trj.calculate(positions))
+
+
+def test_follow(tmp_path):
+    """Frames appended to a growing dump are picked up and give the per frame index."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    with open(trajectory, "rb") as infile:
+        content = infile.read()
+    growing_file = tmp_path / "growing.lammpstrj"
+    growing_file.write_bytes(b"")
+
+    def simulate():
+        # appends the dump in pieces that split frames and atom lines
+        with open(growing_file, "ab") as outfile:
+            for start in range(0, len(content), len(content) // 7):
+                outfile.write(content[start : start + len(content) // 7])
+                outfile.flush()
+                time.sleep(0.05)
+
+    writer = threading.Thread(target=simulate)
+    writer.start()
+    frames = follow.iter_frames(str(growing_file), timeout=1.0, poll=0.01, block_size=4099)
+    running = list(online_frames.calculate_running(frames))
+    writer.join()
+    expected = per_frames.calculate(read.frames(trajectory))
+    assert len(running) == len(expected)
+    assert np.allclose([linde for _, linde in running], expected, equal_nan=True)
+
+
+def test_follow_sentinel(tmp_path):
+    """Following stops as soon as the sentinel file exists."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    sentinel = tmp_path / "stop"
+    sentinel.touch()
+    frames = list(follow.iter_frames(trajectory, timeout=60.0, sentinel=str(sentinel)))
+    assert len(frames) == len(read.frames(trajectory))
+
+
+def test_events(tmp_path):
+    """Streamed events hold the atoms of the dense per atom result above the threshold."""
+    trajectory = "tests/test_example/459_02.lammpstrj"
+    pipeline, data = read.trajectory(trajectory)
+    linde_atoms = online_atoms.calculate(pipeline, data)
+    threshold = float(np.nanmedian(linde_atoms[-1]))
+    found = events.Events(threshold, data.particles.count)
+    online_atoms.calculate(pipeline, data, out=found)
+    last = len(linde_atoms) - 1
+    for frame in (0, last // 2, last):
+        assert np.array_equal(found.above(frame), np.flatnonzero(linde_atoms[frame] > threshold))
+    crossings = found.crossings
+    assert 2 * crossings[:, 2].sum() - len(crossings) == len(found.above(last))
+    saved = events.load(events.save(str(tmp_path / "events.npz"), found))
+    assert np.array_equal(saved.crossings, crossings)
+    with open(events.to_lammps(trajectory, found, str(tmp_path / "events.lammpstrj"))) as dump:
+        lines = dump.read().splitlines()
+    assert lines.count("ITEM: TIMESTEP") == len(linde_atoms)
+    assert int(lines[-len(found.above(last)) - 6]) == len(found.above(last))
+
+
+def test_lttb():
+    """Decimation keeps the end points and the extrema of the curve and draws the result file."""
+    curve = np.sin(np.linspace(0, 20, 100_000)).astype(np.float32)
+    curve[50_000] = 5.0
+    curve[:10] = np.nan
+    kept = plt_plot.lttb(curve, 500)
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == len(curve) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert 50_000 in kept
+    assert np.array_equal(plt_plot.lttb(curve[:100], 500), np.arange(100))
+
+
+@pytest.mark.parametrize("fmt", ["txt", "npy"])
+def test_plot_from_file(tmp_path, monkeypatch, fmt):
+    """Saved per frame and per atom results are read back and plotted as a curve and a heatmap."""
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    save.to_file(f"frames.{fmt}", rng.random(3000).astype(np.float32))
+    with save.rows(f"atoms.{fmt}", (40, 25)) as out:
+        for frame in range(40):
+            out[frame] = rng.random(25).astype(np.float32)
+    with save.from_file(f"atoms.{fmt}") as values:
+        assert values.shape == (40, 25)
+
+    assert plt_plot.from_file(f"frames.{fmt}") == "lindemann_per_frame.pdf"
+    assert plt_plot.from_file(f"atoms.{fmt}") == "lindemann_per_atom.pdf"
+    assert (tmp_path / "lindemann_per_frame.pdf").stat().st_size > 0
+    assert (tmp_path / "lindemann_per_atom.pdf").stat().st_size > 0